@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from unificati_manager.db_diff import apply_diff, catalog_hashes, diff_databases, diff_hashes
+
+
+def _fmt_row(row: Optional[Dict[str, Any]]) -> str:
+    if row is None:
+        return "-"
+    return ", ".join(f"{k}={v!r}" for k, v in row.items())
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Confronta due DB catalogo con alberi di hash per tabella (A -> B).",
+    )
+    parser.add_argument("source", nargs="?", default="", help="DB A (riferimento).")
+    parser.add_argument("target", nargs="?", default="", help="DB B (da confrontare/aggiornare).")
+    parser.add_argument("--tables", nargs="*", default=None, help="Solo queste tabelle.")
+    parser.add_argument("--export-hashes", default="", help="Scrive gli hash di A in un file JSON (niente confronto).")
+    parser.add_argument("--hashes", default="", help="File JSON di hash da usare come lato A (es. da un'altra sede).")
+    parser.add_argument("--apply", action="store_true", help="Applica le differenze a B (B diventa uguale ad A).")
+    parser.add_argument("--limit", type=int, default=50, help="Righe diverse mostrate per tabella (0 = tutte).")
+    args = parser.parse_args()
+    started = time.perf_counter()
+
+    if args.export_hashes:
+        if not args.source:
+            parser.error("--export-hashes richiede il DB A.")
+        hashes = catalog_hashes(str(Path(args.source).resolve()), args.tables)
+        Path(args.export_hashes).write_text(json.dumps(hashes), encoding="utf-8")
+        print(f"Hash di {len(hashes)} tabelle scritti in {args.export_hashes} ({time.perf_counter() - started:.2f} s).")
+        return 0
+
+    if args.hashes:
+        # Con i soli hash di A si ottengono gli intervalli di chiavi diversi, non le righe.
+        target = args.target or args.source
+        if not target:
+            parser.error("--hashes richiede il DB B.")
+        remote = json.loads(Path(args.hashes).read_text(encoding="utf-8"))
+        columns = {table: tree["columns"] for table, tree in remote.items()}
+        local = catalog_hashes(str(Path(target).resolve()), args.tables or list(remote), columns)
+        ranges = diff_hashes(remote, local)
+        for table, table_ranges in ranges.items():
+            print(f"{table}: " + ", ".join(f"{lo}..{hi}" for lo, hi in table_ranges))
+        print(f"\n{len(ranges)} tabelle diverse ({time.perf_counter() - started:.2f} s).")
+        return 1 if ranges else 0
+
+    if not args.source or not args.target:
+        parser.error("servono DB A e DB B.")
+    source = str(Path(args.source).resolve())
+    target = str(Path(args.target).resolve())
+    print("A:", source)
+    print("B:", target)
+    result = diff_databases(source, target, args.tables)
+    shown: Dict[str, int] = {}
+    for table, key, row_a, row_b in result["rows"]:
+        n = shown.get(table, 0)
+        shown[table] = n + 1
+        if args.limit and n >= args.limit:
+            continue
+        kind = "solo A" if row_b is None else "solo B" if row_a is None else "diversa"
+        print(f"\n[{table} {key}] {kind}")
+        if row_a is not None:
+            print(f"  A: {_fmt_row(row_a)}")
+        if row_b is not None:
+            print(f"  B: {_fmt_row(row_b)}")
+    print(f"\nConfronto in {time.perf_counter() - started:.2f} s.")
+    for table, n in shown.items():
+        print(f"  {table}: {n} righe diverse")
+    if not result["rows"]:
+        print("  Nessuna differenza.")
+        return 0
+
+    if args.apply:
+        counts = apply_diff(result["rows"], target)
+        print("\nDelta applicato a B:")
+        for table, (inserted, updated, deleted) in counts.items():
+            print(f"  {table}: +{inserted} ~{updated} -{deleted}")
+        return 0
+    return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import argparse
+import os
+from datetime import datetime
+from pathlib import Path
+
+from unificati_manager.backup_store import BackupStore
+from unificati_manager.config import get_backup_dir, get_backup_store_dir
+
+
+def _fmt_size(size: int) -> str:
+    return f"{size / (1024 * 1024):.1f} MB"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Elenca o ricostruisce gli snapshot dell'archivio backup (3 DB area).",
+    )
+    parser.add_argument("--store", default=str(Path(get_backup_store_dir()).resolve()), help="Path archivio backup.")
+    parser.add_argument("--list", action="store_true", help="Elenca gli snapshot e lo spazio occupato.")
+    parser.add_argument("--snapshot", type=int, default=None, help="Id snapshot da ricostruire (default: ultimo).")
+    parser.add_argument("--target", default="", help="Cartella di destinazione (default: backups/restore_<id>_<data>).")
+    args = parser.parse_args()
+
+    if not os.path.isfile(os.path.join(args.store, "manifest.db")):
+        print("Archivio backup non trovato:", args.store)
+        return 1
+    store = BackupStore(args.store)
+
+    if args.list:
+        for snap in store.list_snapshots():
+            print(f"{snap['id']:>5}  {snap['created_at']}  {snap['reason']:<10}  {snap['files']} file  {_fmt_size(snap['size'])}")
+        stats = store.stats()
+        print(
+            f"\nSnapshot: {stats['snapshots']}  dati: {_fmt_size(stats['logical_bytes'])}"
+            f"  su disco: {_fmt_size(stats['stored_bytes'])}"
+        )
+        return 0
+
+    snapshot_id = args.snapshot
+    if snapshot_id is None:
+        last = store.latest()
+        if last is None:
+            print("Nessuno snapshot in archivio.")
+            return 1
+        snapshot_id = int(last["id"])
+
+    target = args.target or os.path.join(
+        get_backup_dir(), f"restore_{snapshot_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    )
+    target = str(Path(target).resolve())
+    try:
+        paths = store.restore(snapshot_id, target)
+    except (KeyError, ValueError) as exc:
+        print("Restore fallito:", exc)
+        return 1
+
+    print(f"Snapshot {snapshot_id} ricostruito in {target}")
+    for area, path in sorted(paths.items()):
+        print(f"  {area}: {path}")
+    print("\nPer usarlo chiudere l'app e copiare i file nella cartella database.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
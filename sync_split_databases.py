@@ -1,10 +1,9 @@
 from __future__ import annotations
 
 import argparse
-import os
-import sqlite3
+import time
 from pathlib import Path
-from typing import Iterable, Tuple
+from typing import Any, Dict
 
 from unificati_manager.config import (
     get_commerciali_db_path,
@@ -12,32 +11,16 @@ from unificati_manager.config import (
     get_materiali_db_path,
     get_normati_db_path,
 )
-from unificati_manager.db import COMMERCIALI_TABLES, MATERIALI_TABLES, NORMATI_TABLES, Database
-
-
-def _table_count(db_path: str, table: str) -> int:
-    if not os.path.isfile(db_path):
-        return -1
-    conn = sqlite3.connect(db_path)
-    try:
-        cur = conn.cursor()
-        exists = cur.execute(
-            "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?",
-            (table,),
-        ).fetchone()
-        if exists is None:
-            return -1
-        return int(cur.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0])
-    finally:
-        conn.close()
-
-
-def _print_summary(label: str, db_path: str, tables: Iterable[str]) -> None:
-    print(f"\n[{label}] {db_path}")
-    for table in tables:
-        n = _table_count(db_path, table)
-        if n >= 0:
-            print(f"  {table}: {n}")
+from unificati_manager.db import Database
+
+
+def _print_summary(label: str, db_path: str, result: Dict[str, Any]) -> None:
+    print(f"\n[{label}] {db_path} ({result['seconds']:.2f} s)")
+    for table, (inserted, updated, deleted) in result["tables"].items():
+        if inserted or updated or deleted:
+            print(f"  {table}: +{inserted} ~{updated} -{deleted}")
+        else:
+            print(f"  {table}: invariata")
 
 
 def _default_legacy_path() -> str:
@@ -64,6 +47,8 @@ def main() -> int:
     parser.add_argument("--normati", default=_default_normati_path(), help="Path DB destinazione normati.")
     parser.add_argument("--commerciali", default=_default_commerciali_path(), help="Path DB destinazione commerciali.")
     parser.add_argument("--materiali", default=_default_materiali_path(), help="Path DB destinazione materiali.")
+    parser.add_argument("--full", action="store_true", help="Svuota e ricopia tutte le tabelle (default: solo righe cambiate).")
+    parser.add_argument("--serial", action="store_true", help="Un DB alla volta invece di un processo per DB.")
     parser.add_argument("--dry-run", action="store_true", help="Mostra solo i path senza eseguire sync.")
     args = parser.parse_args()
 
@@ -80,17 +65,21 @@ def main() -> int:
     if args.dry_run:
         return 0
 
-    Database.resync_split_databases(
+    started = time.perf_counter()
+    results = Database.resync_split_databases(
         legacy_path=legacy,
         normati_path=normati,
         commerciali_path=commerciali,
         materiali_path=materiali,
+        delta=not args.full,
+        parallel=not args.serial,
     )
-    print("\nSync completato.")
+    mode = "completo" if args.full else "delta"
+    print(f"\nSync ({mode}) completato in {time.perf_counter() - started:.2f} s.")
 
-    _print_summary("NORMATI", normati, ("category", "standard", "subcategory", "item", "manual_version"))
-    _print_summary("COMMERCIALI", commerciali, ("comm_category", "comm_subcategory", "supplier", "comm_item"))
-    _print_summary("MATERIALI", materiali, ("material", "material_property", "semi_item", "semi_item_dimension"))
+    _print_summary("NORMATI", normati, results[normati])
+    _print_summary("COMMERCIALI", commerciali, results[commerciali])
+    _print_summary("MATERIALI", materiali, results[materiali])
     return 0
 
 
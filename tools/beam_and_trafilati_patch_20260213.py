@@ -4,14 +4,25 @@ import argparse
 from datetime import datetime
 from pathlib import Path
 import sys
-from typing import Dict, Iterable, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
 
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
+from unificati_manager import semi_weights
 from unificati_manager.db import Database
+from unificati_manager.sections import (
+    HE_SERIES,
+    IPE_SERIES,
+    L_TRAFILATO_DIMS,
+    T_TRAFILATO_DIMS,
+    UPE_SERIES,
+    UPN_SERIES,
+    U_TRAFILATO_DIMS,
+    fmt_int_series,
+)
 from unificati_manager.utils import normalize_upper
 
 
@@ -19,66 +30,10 @@ DB_PATH = ROOT / "unificati_manager" / "database" / "materiali_semilavorati.db"
 BACKUP_DIR = ROOT / "unificati_manager" / "backups"
 
 
-IPE_SERIES = [80, 100, 120, 140, 160, 180, 200, 220, 240, 270, 300, 330, 360, 400, 450, 500, 550, 600]
-HE_SERIES = [100, 120, 140, 160, 180, 200, 220, 240, 260, 280, 300, 320, 340, 360, 400, 450, 500, 550, 600, 650, 700, 800, 900, 1000]
-UPN_SERIES = [50, 65, 80, 100, 120, 140, 160, 180, 200, 220, 240, 260, 280, 300, 320, 350, 400]
-UPE_SERIES = [80, 100, 120, 140, 160, 180, 200, 220, 240, 270, 300, 330, 360, 400]
-
-L_TRAFILATO_DIMS = [
-    "L20X20X2",
-    "L20X20X3",
-    "L30X20X2",
-    "L30X30X2",
-    "L30X30X3",
-    "L35X35X3",
-    "L35X35X5",
-    "L40X20X2",
-    "L40X30X3",
-    "L40X40X3",
-    "L40X40X5",
-    "L50X30X3",
-    "L50X40X3",
-    "L50X50X3",
-    "L50X50X5",
-    "L60X40X3",
-    "L60X50X5",
-    "L60X60X3",
-    "L60X60X5",
-]
-
-U_TRAFILATO_DIMS = [
-    "U30X15X3",
-    "U40X20X3",
-    "U50X25X4",
-    "U60X30X5",
-    "U80X40X5",
-    "U100X50X6",
-    "U120X60X6",
-    "U140X60X6",
-]
-
-T_TRAFILATO_DIMS = [
-    "T20X20X3",
-    "T25X25X3.5",
-    "T30X30X4",
-    "T35X35X4.5",
-    "T40X40X5",
-    "T45X45X5.5",
-    "T50X50X6",
-    "T60X60X7",
-    "T70X70X8",
-    "T80X80X9",
-]
-
-
 def now_str() -> str:
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
 
-def fmt_int_series(prefix: str, values: Iterable[int]) -> List[str]:
-    return [f"{prefix}{int(v)}" for v in values]
-
-
 BEAM_FAMILIES: Dict[str, Dict[str, object]] = {
     "TRAVE IPE": {
         "code": "TVIP",
@@ -250,23 +205,12 @@ def replace_dimensions(cur, item_id: int, rows: List[Tuple[str, str]]) -> int:
     return inserted
 
 
-def beam_rows(dims: List[str]) -> List[Tuple[str, str]]:
-    return [(d, "") for d in dims]
-
-
-def trafilato_rows(db: Database, type_desc: str, material_id: Optional[int], dims: List[str]) -> List[Tuple[str, str]]:
+def weighted_rows(db: Database, type_desc: str, material_id: Optional[int], dims: List[str]) -> List[Tuple[str, str]]:
     density: Optional[float] = None
     if material_id is not None:
         density = db.read_material_density_g_cm3(int(material_id))
-    out: List[Tuple[str, str]] = []
-    for d in dims:
-        w = ""
-        if density is not None and density > 0:
-            area = db._section_area_mm2(type_desc, d)
-            if area is not None and area > 0:
-                w = f"{(area * density) / 1000.0:.3f}"
-        out.append((d, w))
-    return out
+    weights = semi_weights.weights_per_m((type_desc, density, d) for d in dims)
+    return [(d, f"{w:.3f}" if w is not None and w > 0 else "") for d, w in zip(dims, weights)]
 
 
 def patch(apply_changes: bool) -> int:
@@ -330,7 +274,12 @@ def patch(apply_changes: bool) -> int:
                     notes=str(src["notes"] or ""),
                     is_active=int(src["is_active"] or 1),
                 )
-                rows = beam_rows(list(meta["dims"]))  # type: ignore[arg-type]
+                rows = weighted_rows(
+                    db=db,
+                    type_desc=beam_type_desc,
+                    material_id=int(src["material_id"]) if src["material_id"] is not None else None,
+                    dims=list(meta["dims"]),  # type: ignore[arg-type]
+                )
                 beam_dims_written += replace_dimensions(cur, dst_id, rows)
                 beam_items_created_or_updated += 1
 
@@ -372,7 +321,7 @@ def patch(apply_changes: bool) -> int:
                     notes="SPIGOLI VIVI",
                     is_active=int(src["is_active"] or 1),
                 )
-                rows = trafilato_rows(
+                rows = weighted_rows(
                     db=db,
                     type_desc=trf_type_desc,
                     material_id=int(src["material_id"]) if src["material_id"] is not None else None,
@@ -382,6 +331,7 @@ def patch(apply_changes: bool) -> int:
                 trafilato_items_created_or_updated += 1
 
         if apply_changes:
+            db.refresh_semi_dimension_numbers()
             db.conn.commit()
         else:
             db.conn.rollback()
@@ -371,6 +371,7 @@ def patch(apply_changes: bool) -> int:
                 updated_items += 1
 
         if apply_changes:
+            db.refresh_item_attributes()
             db.conn.commit()
         else:
             db.conn.rollback()
@@ -550,6 +550,7 @@ def patch(apply_changes: bool) -> int:
             per_sub[scode] = (created_sub, updated_sub)
 
         if apply_changes:
+            db.refresh_item_attributes()
             db.conn.commit()
         else:
             db.conn.rollback()
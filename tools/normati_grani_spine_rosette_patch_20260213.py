@@ -654,6 +654,7 @@ def patch(apply_changes: bool) -> int:
             updated_total += updated_sub
 
         if apply_changes:
+            db.refresh_item_attributes()
             db.conn.commit()
         else:
             db.conn.rollback()
@@ -189,6 +189,7 @@ def patch(apply_changes: bool) -> int:
             dedup_removed += dedupe_sub_items(cur, cat_id, sub_id)
 
         if apply_changes:
+            db.refresh_item_attributes()
             db.conn.commit()
         else:
             db.conn.rollback()
@@ -265,6 +265,7 @@ def patch(apply_changes: bool) -> int:
             per_sub_updated[code_n] = u_sub
 
         if apply_changes:
+            db.refresh_item_attributes()
             db.conn.commit()
         else:
             db.conn.rollback()
@@ -2,9 +2,7 @@
 
 import argparse
 from dataclasses import dataclass
-from datetime import datetime
 from pathlib import Path
-import re
 import sys
 from typing import Dict, List, Tuple
 
@@ -13,13 +11,13 @@ ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-from unificati_manager.db import Database
-from unificati_manager.codifica import normalize_mmm, normalize_gggg_normati
+from unificati_manager.patch_engine import ItemDef, PatchPack, run_patch
 from unificati_manager.utils import normalize_upper
 
 
 DB_PATH = ROOT / "unificati_manager" / "database" / "commerciali_normati.db"
-BACKUP_DIR = ROOT / "unificati_manager" / "backups"
+
+CATEGORY_CODE = "100"
 
 
 PARTIAL_SERIES: Dict[int, List[int]] = {
@@ -63,7 +61,7 @@ class SubConfig:
 
 SUBS: List[SubConfig] = [
     SubConfig(
-        sub_code="HEPZ",
+        sub_code="0020",
         thread_kind="PARZ",
         standard_code="ISO 4014",
         notes="GERARCHIA NORME: ISO 4014 > UNI EN ISO 4014 > DIN 931. ACCIAIO: ISO 898-1. ZINCATURA: ISO 4042.",
@@ -71,7 +69,7 @@ SUBS: List[SubConfig] = [
         series=PARTIAL_SERIES,
     ),
     SubConfig(
-        sub_code="HEPA",
+        sub_code="0021",
         thread_kind="PARZ",
         standard_code="ISO 4014",
         notes="GERARCHIA NORME: ISO 4014 > UNI EN ISO 4014 > DIN 931. INOX A2: ISO 3506-1.",
@@ -79,7 +77,7 @@ SUBS: List[SubConfig] = [
         series=PARTIAL_SERIES,
     ),
     SubConfig(
-        sub_code="HETZ",
+        sub_code="0010",
         thread_kind="TOT",
         standard_code="ISO 4017",
         notes="GERARCHIA NORME: ISO 4017 > UNI EN ISO 4017 > DIN 933. ACCIAIO: ISO 898-1. ZINCATURA: ISO 4042.",
@@ -87,7 +85,7 @@ SUBS: List[SubConfig] = [
         series=FULL_SERIES,
     ),
     SubConfig(
-        sub_code="HETA",
+        sub_code="0011",
         thread_kind="TOT",
         standard_code="ISO 4017",
         notes="GERARCHIA NORME: ISO 4017 > UNI EN ISO 4017 > DIN 933. INOX A2: ISO 3506-1.",
@@ -97,227 +95,53 @@ SUBS: List[SubConfig] = [
 ]
 
 
-def now_str() -> str:
-    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-
-def backup_db(db: Database) -> Path:
-    BACKUP_DIR.mkdir(parents=True, exist_ok=True)
-    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    out = BACKUP_DIR / f"unificati_manager_backup_{stamp}_normati_viti_sizes.db"
-    db.backup_to_path(str(out))
-    return out
-
-
-def fetch_vit_ids(cur) -> Tuple[int, str]:
-    cur.execute("SELECT id, code FROM category WHERE code='VIT'")
-    row = cur.fetchone()
-    if row is None:
-        raise RuntimeError("Categoria VIT non trovata. Esegui prima la patch base viti TE.")
-    return int(row["id"]), str(row["code"])
-
-
-def fetch_standard_id(cur, category_id: int, std_code: str) -> int:
-    cur.execute(
-        "SELECT id FROM standard WHERE category_id=? AND code=?",
-        (int(category_id), normalize_upper(std_code)),
-    )
-    row = cur.fetchone()
-    if row is None:
-        raise RuntimeError(f"Norma non trovata in VIT: {std_code}")
-    return int(row["id"])
-
-
-def fetch_subcategory_id(cur, category_id: int, sub_code: str) -> int:
-    cur.execute(
-        "SELECT id FROM subcategory WHERE category_id=? AND code=?",
-        (int(category_id), normalize_gggg_normati(sub_code)),
-    )
-    row = cur.fetchone()
-    if row is None:
-        raise RuntimeError(f"Sotto-categoria non trovata in VIT: {sub_code}")
-    return int(row["id"])
-
-
-def get_next_seq(cur, category_id: int, subcategory_id: int) -> int:
-    cur.execute(
-        "SELECT COALESCE(MAX(seq), -1) + 1 AS next_seq FROM item WHERE category_id=? AND subcategory_id=?",
-        (int(category_id), int(subcategory_id)),
-    )
-    return int(cur.fetchone()["next_seq"])
-
-
-def find_free_code(cur, cat_code: str, sub_code: str, seq_start: int) -> Tuple[str, int]:
-    seq = int(seq_start)
-    while True:
-        code = f"{cat_code}_{sub_code}-{seq:04d}"
-        cur.execute("SELECT id FROM item WHERE code=?", (code,))
-        if cur.fetchone() is None:
-            return code, seq
-        seq += 1
-
-
-def pick_primary_norm(standard_code: str) -> str:
-    s = normalize_upper(standard_code or "")
-    if not s:
-        return ""
-    for prefix in ("ISO", "UNI", "DIN"):
-        m = re.search(rf"\b{prefix}\s*[A-Z0-9./-]+", s)
-        if m:
-            return normalize_upper(m.group(0))
-    return s
-
-
-def build_desc_base(thread_kind: str, diameter: int, length: int, material_label: str) -> str:
-    kind = "PARZ FILETT" if thread_kind == "PARZ" else "TOT FILETT"
-    return normalize_upper(f"VITE TE {kind} M{diameter}X{length} {material_label}")
-
-
 def build_desc(thread_kind: str, diameter: int, length: int, material_label: str, norm_ref: str) -> str:
-    base = build_desc_base(thread_kind, diameter, length, material_label)
-    n = normalize_upper(norm_ref or "")
-    if not n:
-        return base
-    return normalize_upper(base.replace(" M", f" {n} M", 1))
-
-
-def ensure_item(
-    cur,
-    category_id: int,
-    cat_code: str,
-    subcategory_id: int,
-    sub_code: str,
-    standard_id: int,
-    base_description: str,
-    final_description: str,
-    notes: str,
-) -> bool:
-    desc_base_n = normalize_upper(base_description)
-    desc_n = normalize_upper(final_description)
-    cur.execute(
-        """
-        SELECT id
-        FROM item
-        WHERE category_id=? AND subcategory_id=?
-          AND (
-              description=?
-              OR description=?
-              OR description LIKE ?
-          )
-        LIMIT 1
-        """,
-        (
-            int(category_id),
-            int(subcategory_id),
-            desc_n,
-            desc_base_n,
-            f"% {desc_base_n} %",
-        ),
-    )
-    row = cur.fetchone()
-    if row is not None:
-        cur.execute(
-            """
-            UPDATE item
-            SET standard_id=?, description=?, notes=?, is_active=1, updated_at=?
-            WHERE id=?
-            """,
-            (int(standard_id), desc_n, normalize_upper(notes), now_str(), int(row["id"])),
-        )
-        return False
-
-    seq = get_next_seq(cur, category_id, subcategory_id)
-    code, seq = find_free_code(cur, cat_code, sub_code, seq)
-    cur.execute(
-        """
-        INSERT INTO item(code, category_id, subcategory_id, standard_id, seq, description, notes, is_active, created_at, updated_at)
-        VALUES(?, ?, ?, ?, ?, ?, ?, 1, ?, ?)
-        """,
-        (
-            code,
-            int(category_id),
-            int(subcategory_id),
-            int(standard_id),
-            int(seq),
-            desc_n,
-            normalize_upper(notes),
-            now_str(),
-            now_str(),
-        ),
-    )
-    return True
+    kind = "P/F" if thread_kind == "PARZ" else "T/F"
+    return normalize_upper(f"VITE TE {kind} {norm_ref} M{diameter}X{length} {material_label}")
 
 
-def patch(apply_changes: bool) -> int:
-    db = Database(str(DB_PATH), db_profile="NORMATI")
-    try:
-        backup_path = backup_db(db)
-        print(f"Backup: {backup_path}")
-
-        cur = db.conn.cursor()
-        db.conn.commit()
-        if apply_changes:
-            db.conn.execute("BEGIN")
-
-        cat_id, cat_code = fetch_vit_ids(cur)
-        cat_code = normalize_mmm(cat_code)
-
-        created_total = 0
-        updated_total = 0
-        per_sub_created: Dict[str, int] = {}
-        per_sub_updated: Dict[str, int] = {}
-
-        for cfg in SUBS:
-            sub_code = normalize_gggg_normati(cfg.sub_code)
-            sub_id = fetch_subcategory_id(cur, cat_id, sub_code)
-            std_id = fetch_standard_id(cur, cat_id, cfg.standard_code)
-            norm_ref = pick_primary_norm(cfg.standard_code)
-            c_created = 0
-            c_updated = 0
-
-            for dia in sorted(cfg.series.keys()):
-                for length in cfg.series[dia]:
-                    base_desc = build_desc_base(cfg.thread_kind, dia, int(length), cfg.material_label)
-                    desc = build_desc(cfg.thread_kind, dia, int(length), cfg.material_label, norm_ref)
-                    created = ensure_item(
-                        cur=cur,
-                        category_id=cat_id,
-                        cat_code=cat_code,
-                        subcategory_id=sub_id,
-                        sub_code=sub_code,
-                        standard_id=std_id,
-                        base_description=base_desc,
-                        final_description=desc,
+def legacy_descs(thread_kind: str, diameter: int, length: int, material_label: str, norm_ref: str) -> Tuple[str, str]:
+    """Descrizioni delle versioni precedenti della patch (senza norma e con norma prima di M)."""
+    kind = "PARZ FILETT" if thread_kind == "PARZ" else "TOT FILETT"
+    base = normalize_upper(f"VITE TE {kind} M{diameter}X{length} {material_label}")
+    return (base, base.replace(" M", f" {norm_ref} M", 1))
+
+
+def build_pack() -> PatchPack:
+    items: List[ItemDef] = []
+    for cfg in SUBS:
+        for dia in sorted(cfg.series.keys()):
+            for length in cfg.series[dia]:
+                items.append(
+                    ItemDef(
+                        category=CATEGORY_CODE,
+                        subcategory=cfg.sub_code,
+                        description=build_desc(cfg.thread_kind, dia, int(length), cfg.material_label, cfg.standard_code),
+                        standard=cfg.standard_code,
                         notes=cfg.notes,
+                        aliases=legacy_descs(cfg.thread_kind, dia, int(length), cfg.material_label, cfg.standard_code),
                     )
-                    if created:
-                        c_created += 1
-                    else:
-                        c_updated += 1
+                )
+    return PatchPack(name="normati_viti_sizes", items=items)
 
-            per_sub_created[sub_code] = c_created
-            per_sub_updated[sub_code] = c_updated
-            created_total += c_created
-            updated_total += c_updated
 
-        if apply_changes:
-            db.conn.commit()
-        else:
-            db.conn.rollback()
-
-        print(f"Mode: {'APPLY' if apply_changes else 'DRY-RUN'}")
-        print(f"Items created total: {created_total}")
-        print(f"Items updated total: {updated_total}")
-        print("Details by subcategory:")
-        for k in sorted(per_sub_created.keys()):
-            print(f"  - {k}: created={per_sub_created[k]} updated={per_sub_updated[k]}")
-        return 0
-    finally:
-        db.close()
+def patch(apply_changes: bool) -> int:
+    reports = run_patch(
+        str(DB_PATH),
+        "NORMATI",
+        [build_pack()],
+        apply_changes=apply_changes,
+        backup_tag="normati_viti_sizes",
+    )
+    print(f"Mode: {'APPLY' if apply_changes else 'DRY-RUN'}")
+    for report in reports:
+        for line in report.lines():
+            print(line)
+    return 0
 
 
 def main() -> int:
-    parser = argparse.ArgumentParser(description="Populate VIT hex-head screws with size and length series.")
+    parser = argparse.ArgumentParser(description="Populate VITI TE (100) hex-head screws with size and length series.")
     parser.add_argument("--apply", action="store_true", help="Apply changes. Without this flag runs in dry-run mode.")
     args = parser.parse_args()
     return patch(apply_changes=bool(args.apply))
@@ -325,4 +149,3 @@ def main() -> int:
 
 if __name__ == "__main__":
     raise SystemExit(main())
-
@@ -2,22 +2,22 @@
 
 import argparse
 from collections import defaultdict
-from datetime import datetime
 from pathlib import Path
 import re
 import sys
-from typing import Dict, Iterable, List, Optional, Tuple
+from typing import Iterable, List, Optional
 
 
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
+from unificati_manager import semi_weights
 from unificati_manager.db import Database
+from unificati_manager.patch_engine import PatchPack, SemiDimensionsDef, run_patch
 from unificati_manager.utils import normalize_upper
 
 DB_PATH = ROOT / "unificati_manager" / "database" / "materiali_semilavorati.db"
-BACKUP_DIR = ROOT / "unificati_manager" / "backups"
 
 
 TONDI_STD = [
@@ -258,34 +258,15 @@ def generate_dimensions(type_desc: str, legacy_dimensions: str) -> List[str]:
     return []
 
 
-def auto_weight(db: Database, type_desc: str, density: Optional[float], dimension: str) -> str:
-    if density is None or density <= 0:
-        return ""
-    t = normalize_upper(type_desc or "")
-    if t in {"PROFILO L", "PROFILO U", "PROFILO T"}:
-        t = "PROFILATI"
-    if t == "LAMIERE":
-        sp = db._lamiera_thickness_mm(dimension)
-        if sp is None or sp <= 0:
-            return ""
-        return f"{sp * density:.3f}"
-    area = db._section_area_mm2(t, dimension)
-    if area is None or area <= 0:
-        return ""
-    return f"{(area * density) / 1000.0:.3f}"
+def auto_weights(type_desc: str, density: Optional[float], dimensions: List[str]) -> List[str]:
+    weights = semi_weights.weights_per_m((type_desc, density, d) for d in dimensions)
+    return [f"{w:.3f}" if w is not None and w > 0 else "" for w in weights]
 
 
 def patch(apply_changes: bool) -> int:
-    db = Database(str(DB_PATH), db_profile="MATERIALI")
+    db = Database(str(DB_PATH), db_profile="MATERIALI", access_mode="ro")
     try:
-        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        BACKUP_DIR.mkdir(parents=True, exist_ok=True)
-        backup_path = BACKUP_DIR / f"unificati_manager_backup_{stamp}_semi_std.db"
-        db.backup_to_path(str(backup_path))
-        print(f"Backup: {backup_path}")
-
-        cur = db.conn.cursor()
-        cur.execute(
+        rows = db.conn.execute(
             """
             SELECT
                 si.id,
@@ -298,97 +279,67 @@ def patch(apply_changes: bool) -> int:
             JOIN semi_type st ON st.id=si.type_id
             ORDER BY si.id
             """
-        )
-        rows = cur.fetchall()
-
-        density_cache: Dict[int, Optional[float]] = {}
-        updated_items = 0
-        inserted_rows = 0
-        deleted_rows = 0
-        computed_weights = 0
-        skipped_custom = 0
-        skipped_no_generator = 0
-        skipped_not_legacy = 0
-        per_type = defaultdict(int)
-
-        if apply_changes:
-            db.conn.execute("BEGIN")
-
-        for r in rows:
-            semi_id = int(r["id"])
-            type_desc = normalize_upper(str(r["type_desc"] or ""))
-            legacy = normalize_upper(str(r["legacy_dimensions"] or ""))
-            first_dim = normalize_upper(str(r["first_dim"] or ""))
-            dim_count = int(r["dim_count"] or 0)
-            material_id = r["material_id"]
-
-            if dim_count != 1:
-                skipped_not_legacy += 1
-                continue
-            if legacy != first_dim:
-                skipped_custom += 1
-                continue
-            if not is_legacy_ambiguous(legacy):
-                skipped_not_legacy += 1
-                continue
-
-            new_dims = generate_dimensions(type_desc, legacy)
-            if not new_dims:
-                skipped_no_generator += 1
-                continue
-
-            if material_id is not None:
-                mid = int(material_id)
-                if mid not in density_cache:
-                    density_cache[mid] = db.read_material_density_g_cm3(mid)
-                density = density_cache[mid]
-            else:
-                density = None
-
-            to_insert: List[Tuple[int, str, str, int]] = []
-            sort_order = 10
-            for dim in new_dims:
-                w = auto_weight(db, type_desc, density, dim)
-                if w:
-                    computed_weights += 1
-                to_insert.append((semi_id, dim, w, sort_order))
-                sort_order += 10
-
-            if apply_changes:
-                db.conn.execute("DELETE FROM semi_item_dimension WHERE semi_item_id=?", (semi_id,))
-                db.conn.executemany(
-                    """
-                    INSERT INTO semi_item_dimension(semi_item_id, dimension, weight_per_m, sort_order)
-                    VALUES(?, ?, ?, ?)
-                    """,
-                    to_insert,
-                )
-
-            updated_items += 1
-            inserted_rows += len(to_insert)
-            deleted_rows += dim_count
-            per_type[type_desc] += 1
-
-        if apply_changes:
-            db.conn.commit()
-        else:
-            db.conn.rollback()
-
-        print(f"Mode: {'APPLY' if apply_changes else 'DRY-RUN'}")
-        print(f"Updated items: {updated_items}")
-        print(f"Rows deleted: {deleted_rows}")
-        print(f"Rows inserted: {inserted_rows}")
-        print(f"Auto-weights computed: {computed_weights}")
-        print(f"Skipped custom rows: {skipped_custom}")
-        print(f"Skipped no generator: {skipped_no_generator}")
-        print(f"Skipped non-legacy rows: {skipped_not_legacy}")
-        print("Updated by type:")
-        for t in sorted(per_type):
-            print(f"  - {t}: {per_type[t]}")
-        return 0
+        ).fetchall()
+        densities = db.read_material_densities_g_cm3()
     finally:
         db.close()
 
+    dimensions: List[SemiDimensionsDef] = []
+    computed_weights = 0
+    skipped_custom = 0
+    skipped_no_generator = 0
+    skipped_not_legacy = 0
+    per_type = defaultdict(int)
+
+    for r in rows:
+        type_desc = normalize_upper(str(r["type_desc"] or ""))
+        legacy = normalize_upper(str(r["legacy_dimensions"] or ""))
+        first_dim = normalize_upper(str(r["first_dim"] or ""))
+        material_id = r["material_id"]
+
+        if int(r["dim_count"] or 0) != 1:
+            skipped_not_legacy += 1
+            continue
+        if legacy != first_dim:
+            skipped_custom += 1
+            continue
+        if not is_legacy_ambiguous(legacy):
+            skipped_not_legacy += 1
+            continue
+
+        new_dims = generate_dimensions(type_desc, legacy)
+        if not new_dims:
+            skipped_no_generator += 1
+            continue
+
+        density = densities.get(int(material_id)) if material_id is not None else None
+        weights = auto_weights(type_desc, density, new_dims)
+        computed_weights += sum(1 for w in weights if w)
+        dimensions.append(SemiDimensionsDef(int(r["id"]), tuple(zip(new_dims, weights))))
+        per_type[type_desc] += 1
+
+    reports = run_patch(
+        str(DB_PATH),
+        "MATERIALI",
+        [PatchPack(name="semi_std", semi_dimensions=dimensions)],
+        apply_changes=apply_changes,
+        backup_tag="semi_std",
+    )
+
+    print(f"Mode: {'APPLY' if apply_changes else 'DRY-RUN'}")
+    print(f"Updated items: {len(dimensions)}")
+    for report in reports:
+        for line in report.lines():
+            print(line)
+    print(f"Auto-weights computed: {computed_weights}")
+    print(f"Skipped custom rows: {skipped_custom}")
+    print(f"Skipped no generator: {skipped_no_generator}")
+    print(f"Skipped non-legacy rows: {skipped_not_legacy}")
+    print("Updated by type:")
+    for t in sorted(per_type):
+        print(f"  - {t}: {per_type[t]}")
+    return 0
+
 
 def main() -> int:
     parser = argparse.ArgumentParser(description="Populate STD semilavorati dimensions from legacy range rows.")
@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import threading
+import zlib
+from contextlib import closing, contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .config import BACKUP_CHUNK_PAGES
+from .utils import ensure_dir, now_str
+
+# Archivio backup a contenuti indirizzati.
+# Ogni copia DB viene divisa in blocchi di BACKUP_CHUNK_PAGES pagine; ogni blocco
+# e' salvato una sola volta (nome = sha256, contenuto compresso zlib) sotto chunks/.
+# Il manifest SQLite (manifest.db) elenca snapshot, file per area e sequenza di
+# blocchi: ultimo backup, retention e restore non scandiscono la cartella.
+
+MANIFEST_NAME = "manifest.db"
+CHUNKS_FOLDER = "chunks"
+LOCK_NAME = "store.lock"
+# Attesa massima del lock di archivio (un backup completo puo' durare minuti).
+LOCK_TIMEOUT_SECONDS = 600
+
+# (nome file, dimensione, sha256 file, hash blocchi in ordine)
+StoredFile = Tuple[str, int, str, List[str]]
+
+
+def _page_size(path: str) -> int:
+    """Dimensione pagina dall'header SQLite (byte 16-17, 1 = 65536)."""
+    with open(path, "rb") as fh:
+        header = fh.read(100)
+    if len(header) < 18 or not header.startswith(b"SQLite format 3\x00"):
+        return 4096
+    value = int.from_bytes(header[16:18], "big")
+    return 65536 if value == 1 else max(512, value)
+
+
+class BackupStore:
+    # Coda fra i thread del processo, prima del lock su file (vedi `exclusive`).
+    _local_lock = threading.Lock()
+
+    def __init__(self, root: str, chunk_pages: int = BACKUP_CHUNK_PAGES) -> None:
+        self.root = os.path.abspath(root)
+        self.chunk_pages = max(1, int(chunk_pages))
+        self.manifest_path = os.path.join(self.root, MANIFEST_NAME)
+        ensure_dir(os.path.join(self.root, CHUNKS_FOLDER))
+        with closing(self._connect()) as conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS snapshot (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    created_at TEXT NOT NULL,
+                    reason TEXT NOT NULL DEFAULT ''
+                );
+                CREATE TABLE IF NOT EXISTS snapshot_file (
+                    snapshot_id INTEGER NOT NULL,
+                    area TEXT NOT NULL,
+                    file_name TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    sha256 TEXT NOT NULL,
+                    PRIMARY KEY(snapshot_id, area),
+                    FOREIGN KEY(snapshot_id) REFERENCES snapshot(id) ON DELETE CASCADE
+                );
+                CREATE TABLE IF NOT EXISTS snapshot_chunk (
+                    snapshot_id INTEGER NOT NULL,
+                    area TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    chunk_hash TEXT NOT NULL,
+                    PRIMARY KEY(snapshot_id, area, seq),
+                    FOREIGN KEY(snapshot_id) REFERENCES snapshot(id) ON DELETE CASCADE
+                );
+                CREATE INDEX IF NOT EXISTS idx_snapshot_chunk_hash ON snapshot_chunk(chunk_hash);
+                CREATE TABLE IF NOT EXISTS chunk (
+                    hash TEXT PRIMARY KEY,
+                    stored_size INTEGER NOT NULL
+                );
+                """
+            )
+
+    @contextmanager
+    def exclusive(self, timeout: float = LOCK_TIMEOUT_SECONDS) -> Iterator["BackupStore"]:
+        """
+        Un backup alla volta sull'archivio, fra thread e fra processi: `prune` non deve
+        togliere blocchi che un altro backup ha appena trovato gia' presenti (`put_file`)
+        e sta per registrare (`add_snapshot`). Lock = transazione EXCLUSIVE su un file
+        SQLite dedicato: il sistema operativo lo rilascia anche se il processo muore.
+        """
+        with BackupStore._local_lock:
+            conn = sqlite3.connect(os.path.join(self.root, LOCK_NAME), timeout=timeout, isolation_level=None)
+            try:
+                conn.execute("BEGIN EXCLUSIVE")
+                try:
+                    yield self
+                finally:
+                    conn.execute("ROLLBACK")
+            finally:
+                conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.manifest_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys=ON;")
+        return conn
+
+    def _chunk_path(self, digest: str) -> str:
+        return os.path.join(self.root, CHUNKS_FOLDER, digest[:2], f"{digest}.z")
+
+    def _iter_chunks(self, path: str) -> Iterator[bytes]:
+        size = _page_size(path) * self.chunk_pages
+        with open(path, "rb") as fh:
+            while True:
+                data = fh.read(size)
+                if not data:
+                    return
+                yield data
+
+    def put_file(self, path: str, file_name: Optional[str] = None) -> StoredFile:
+        """
+        Divide il file in blocchi e salva solo quelli non ancora presenti.
+        Sicuro da piu' thread: un blocco gia' scritto da altri ha lo stesso contenuto.
+        """
+        whole = hashlib.sha256()
+        hashes: List[str] = []
+        total = 0
+        for data in self._iter_chunks(path):
+            whole.update(data)
+            total += len(data)
+            digest = hashlib.sha256(data).hexdigest()
+            hashes.append(digest)
+            target = self._chunk_path(digest)
+            if os.path.exists(target):
+                continue
+            ensure_dir(os.path.dirname(target))
+            tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as fh:
+                fh.write(zlib.compress(data, 6))
+            os.replace(tmp, target)
+        return (file_name or os.path.basename(path), total, whole.hexdigest(), hashes)
+
+    def add_snapshot(self, reason: str, files: Dict[str, StoredFile]) -> int:
+        """Registra uno snapshot (area -> file gia' salvato con `put_file`)."""
+        with closing(self._connect()) as conn, conn:
+            cur = conn.execute(
+                "INSERT INTO snapshot(created_at, reason) VALUES(?, ?)",
+                (now_str(), reason or ""),
+            )
+            snapshot_id = int(cur.lastrowid)
+            for area, (file_name, size, sha, hashes) in files.items():
+                conn.execute(
+                    "INSERT INTO snapshot_file(snapshot_id, area, file_name, size, sha256) VALUES(?, ?, ?, ?, ?)",
+                    (snapshot_id, area, file_name, int(size), sha),
+                )
+                conn.executemany(
+                    "INSERT INTO snapshot_chunk(snapshot_id, area, seq, chunk_hash) VALUES(?, ?, ?, ?)",
+                    [(snapshot_id, area, seq, digest) for seq, digest in enumerate(hashes)],
+                )
+                conn.executemany(
+                    "INSERT OR IGNORE INTO chunk(hash, stored_size) VALUES(?, ?)",
+                    [(digest, os.path.getsize(self._chunk_path(digest))) for digest in set(hashes)],
+                )
+            return snapshot_id
+
+    def latest(self, min_files: int = 1) -> Optional[Dict[str, Any]]:
+        """Ultimo snapshot con almeno `min_files` file (es. 3 = backup completo, non di una sola area)."""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                """
+                SELECT s.id, s.created_at, s.reason
+                FROM snapshot s
+                WHERE (SELECT COUNT(*) FROM snapshot_file f WHERE f.snapshot_id=s.id) >= ?
+                ORDER BY s.id DESC
+                LIMIT 1
+                """,
+                (max(1, int(min_files)),),
+            ).fetchone()
+        return dict(row) if row is not None else None
+
+    def list_snapshots(self) -> List[Dict[str, Any]]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                """
+                SELECT s.id, s.created_at, s.reason,
+                       COUNT(f.area) AS files, COALESCE(SUM(f.size), 0) AS size
+                FROM snapshot s
+                LEFT JOIN snapshot_file f ON f.snapshot_id=s.id
+                GROUP BY s.id
+                ORDER BY s.id DESC
+                """
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def stats(self) -> Dict[str, int]:
+        """Snapshot, byte logici (somma dei file) e byte realmente occupati dai blocchi."""
+        with closing(self._connect()) as conn:
+            snapshots = int(conn.execute("SELECT COUNT(*) FROM snapshot").fetchone()[0])
+            logical = int(conn.execute("SELECT COALESCE(SUM(size), 0) FROM snapshot_file").fetchone()[0])
+            stored = int(conn.execute("SELECT COALESCE(SUM(stored_size), 0) FROM chunk").fetchone()[0])
+        return {"snapshots": snapshots, "logical_bytes": logical, "stored_bytes": stored}
+
+    def restore(self, snapshot_id: int, target_dir: str) -> Dict[str, str]:
+        """Ricostruisce i file dello snapshot in `target_dir` (verifica sha256). Ritorna area -> percorso."""
+        with closing(self._connect()) as conn:
+            files = conn.execute(
+                "SELECT area, file_name, size, sha256 FROM snapshot_file WHERE snapshot_id=? ORDER BY area",
+                (int(snapshot_id),),
+            ).fetchall()
+            if not files:
+                raise KeyError(f"Snapshot {snapshot_id} non trovato.")
+            chunks = {
+                f["area"]: [
+                    str(r[0])
+                    for r in conn.execute(
+                        "SELECT chunk_hash FROM snapshot_chunk WHERE snapshot_id=? AND area=? ORDER BY seq",
+                        (int(snapshot_id), f["area"]),
+                    )
+                ]
+                for f in files
+            }
+        ensure_dir(target_dir)
+        out: Dict[str, str] = {}
+        for f in files:
+            path = os.path.join(target_dir, str(f["file_name"]))
+            part_path = path + ".part"
+            whole = hashlib.sha256()
+            with open(part_path, "wb") as fh:
+                for digest in chunks[f["area"]]:
+                    with open(self._chunk_path(digest), "rb") as src:
+                        data = zlib.decompress(src.read())
+                    whole.update(data)
+                    fh.write(data)
+            if whole.hexdigest() != f["sha256"]:
+                os.remove(part_path)
+                raise ValueError(f"Snapshot {snapshot_id}: verifica fallita per {f['file_name']}.")
+            os.replace(part_path, path)
+            out[str(f["area"])] = path
+        return out
+
+    def prune(self, keep_last: int) -> int:
+        """Tiene gli ultimi `keep_last` snapshot e rimuove i blocchi non piu' usati. Ritorna gli snapshot rimossi."""
+        with closing(self._connect()) as conn, conn:
+            cur = conn.execute(
+                "DELETE FROM snapshot WHERE id NOT IN (SELECT id FROM snapshot ORDER BY id DESC LIMIT ?)",
+                (max(1, int(keep_last)),),
+            )
+            removed = cur.rowcount
+            orphans = [
+                str(r[0])
+                for r in conn.execute(
+                    """
+                    SELECT hash FROM chunk c
+                    WHERE NOT EXISTS (SELECT 1 FROM snapshot_chunk sc WHERE sc.chunk_hash=c.hash)
+                    """
+                )
+            ]
+            conn.executemany("DELETE FROM chunk WHERE hash=?", [(h,) for h in orphans])
+        for digest in orphans:
+            try:
+                os.remove(self._chunk_path(digest))
+            except OSError:
+                pass
+        return max(0, removed)
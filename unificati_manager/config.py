@@ -17,6 +17,11 @@ BACKUP_FOLDER = "backups"
 BACKUP_FILE_PREFIX = "unificati_manager_backup"
 BACKUP_KEEP_LAST = 30
 BACKUP_INTERVAL_HOURS = 24
+# Backup su thread di lavoro, a passi di N pagine (il DB resta usabile durante la copia).
+BACKUP_PAGES_PER_STEP = 256
+# Archivio backup deduplicato (backups/store): blocchi di N pagine, salvati una volta e compressi.
+BACKUP_STORE_FOLDER = "store"
+BACKUP_CHUNK_PAGES = 16
 AUTO_BACKUP_ON_STARTUP = True
 AUTO_BACKUP_ON_CLOSE = False
 
@@ -30,6 +35,35 @@ SEED_NORMATI_DEFAULTS = False
 SEED_COMMERCIALI_DEFAULTS = False
 SEED_SUPPLIERS_DEFAULTS = False
 
+# Prefetch in idle della prossima area (tab costruiti al primo utilizzo). 0 = disattivato.
+AREA_PREFETCH_DELAY_MS = 1500
+
+# Ricerche a pagine (liste articoli/semilavorati).
+SEARCH_PAGE_SIZE = 200
+SEARCH_COUNT_CAP = 5000
+
+# Cache risultati letture nel service layer (0 = disattivata).
+# Risultati con piu' righe del limite non vengono messi in cache.
+QUERY_CACHE_MAX_ENTRIES = 256
+QUERY_CACHE_MAX_ROWS_PER_ENTRY = 20000
+
+# Connessioni di sola lettura per area tenute aperte per i thread di lavoro
+# (ricerca in background, letture fuori dal thread Tk).
+READER_POOL_SIZE = 4
+
+# Scritture su un thread dedicato: le operazioni arrivate entro la finestra
+# (fino al massimo indicato) vanno in un'unica transazione con un solo commit.
+WRITE_GROUP_WINDOW_MS = 5
+WRITE_GROUP_MAX_OPS = 500
+
+# Journal modifiche (change_log) per area: la compattazione toglie le voci piu'
+# vecchie di N giorni e, per ogni riga, quelle superate da una modifica successiva.
+CHANGE_LOG_KEEP_DAYS = 90
+
+# Confronto DB (db_diff): foglie di N chiavi primarie, N figli per nodo dell'albero di hash.
+DIFF_LEAF_KEYS = 64
+DIFF_FANOUT = 16
+
 DATE_FMT = "%Y-%m-%d %H:%M:%S"
 
 
@@ -63,3 +97,7 @@ def get_materiali_db_path() -> str:
 
 def get_backup_dir() -> str:
     return os.path.join(get_app_dir(), BACKUP_FOLDER)
+
+
+def get_backup_store_dir() -> str:
+    return os.path.join(get_backup_dir(), BACKUP_STORE_FOLDER)
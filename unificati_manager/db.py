@@ -1,23 +1,41 @@
 ﻿from __future__ import annotations
 
+import base64
+import json
+import logging
 import math
 import os
+import queue
 import re
 import sqlite3
+import threading
+import time
 import uuid
-from datetime import datetime
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
 
+from . import item_attrs, semi_weights
 from .utils import now_str, normalize_upper
 from .codifica import normalize_mmm, normalize_gggg_normati, normalize_cccc, normalize_ssss
 from .config import (
+    BACKUP_PAGES_PER_STEP,
+    CHANGE_LOG_KEEP_DAYS,
     DATE_FMT,
+    READER_POOL_SIZE,
+    SEARCH_COUNT_CAP,
+    SEARCH_PAGE_SIZE,
     SEED_COMMERCIALI_DEFAULTS,
     SEED_NORMATI_DEFAULTS,
     SEED_SUPPLIERS_DEFAULTS,
+    WRITE_GROUP_MAX_OPS,
+    WRITE_GROUP_WINDOW_MS,
 )
 
+_LOG = logging.getLogger(__name__)
+
 DEFAULT_NORMATI_CATEGORIES = [
     ("Viti", "001"),
     ("Rondelle / Rosette", "002"),
@@ -110,6 +128,21 @@ DEFAULT_MATERIAL_PROPERTY_ALIASES = [
     ("MECH", "RES_TRAZIONE", "CARICO DI ROTTURA RM"),
 ]
 
+# Separatori normalizzati in spazio per la ricerca "a parola intera".
+SEARCH_SEPARATORS = ("/", "-", ",", ";", ".", "(", ")", "[", "]", "{", "}", "\"", ":", "_")
+
+# Colonne dei risultati ordinabili lato SQL negli elenchi a pagine (order_by).
+ITEM_SORT_COLUMNS = ("preferred", "code", "cat_code", "sub_code", "description", "updated_at")
+SEMI_ITEM_SORT_COLUMNS = (
+    "has_preferred_dimension",
+    "type_desc",
+    "state_desc",
+    "mat_label",
+    "description",
+    "dim_display",
+    "updated_at",
+)
+
 WRITER_LOCK_SCOPE_MAIN = "MAIN"
 WRITER_LOCK_SCOPE_NORMATI = "NORMATI"
 WRITER_LOCK_SCOPE_COMMERCIALI = "COMMERCIALI"
@@ -159,6 +192,213 @@ MATERIALI_TABLES = (
 )
 
 
+class ReaderPool:
+    """
+    Connessioni di sola lettura sullo stesso file, aperte al primo uso e riusate
+    dai thread di lavoro. Un thread che chiede di nuovo una connessione mentre ne
+    tiene gia' una riceve la stessa; al rilascio torna libera per gli altri thread.
+    Restano aperte al massimo `size` connessioni libere, le altre vengono chiuse.
+    `close()` della connessione ottenuta la restituisce al pool.
+    """
+
+    def __init__(self, path: str, db_profile: str, size: int = READER_POOL_SIZE) -> None:
+        self.path = path
+        self.db_profile = db_profile
+        self.size = max(0, int(size))
+        self._lock = threading.Lock()
+        self._idle: List["Database"] = []
+        self._held: Dict[int, Tuple["Database", int]] = {}
+        self._closed = False
+
+    def acquire(self) -> "Database":
+        tid = threading.get_ident()
+        with self._lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("Pool connessioni di lettura chiuso.")
+            held = self._held.get(tid)
+            if held is not None:
+                self._held[tid] = (held[0], held[1] + 1)
+                return held[0]
+            reader = self._idle.pop() if self._idle else None
+        if reader is None:
+            reader = Database(
+                self.path,
+                db_profile=self.db_profile,
+                access_mode="ro",
+                session_role="reader",
+                check_same_thread=False,
+            )
+        with self._lock:
+            self._held[tid] = (reader, 1)
+        reader._on_close = self.release
+        return reader
+
+    def release(self, reader: "Database") -> None:
+        with self._lock:
+            for tid, (db, depth) in list(self._held.items()):
+                if db is reader:
+                    if depth > 1:
+                        self._held[tid] = (db, depth - 1)
+                        reader._on_close = self.release
+                        return
+                    del self._held[tid]
+                    break
+            keep = not self._closed and len(self._idle) < self.size
+            if keep:
+                self._idle.append(reader)
+        if not keep:
+            reader.close()
+
+    @contextmanager
+    def reader(self) -> Iterator["Database"]:
+        db = self.acquire()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def close(self) -> None:
+        """Chiude le connessioni libere; quelle in uso si chiudono al rilascio."""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for db in idle:
+            db.close()
+
+
+class WriteExecutor:
+    """
+    Thread unico di scrittura: possiede una propria connessione rw sul file e
+    svuota una coda di operazioni `fn(db)`. Le operazioni arrivate entro
+    `window_ms` (al massimo `max_ops`) vanno in un'unica transazione, quindi un
+    solo commit (fsync WAL) per tutto il gruppo. Ogni operazione gira in un
+    SAVEPOINT: un errore annulla solo quella e arriva al chiamante nel Future.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        db_profile: str,
+        window_ms: int = WRITE_GROUP_WINDOW_MS,
+        max_ops: int = WRITE_GROUP_MAX_OPS,
+    ) -> None:
+        self.path = path
+        self.db_profile = db_profile
+        self.window = max(0, int(window_ms)) / 1000.0
+        self.max_ops = max(1, int(max_ops))
+        self.batches = 0
+        self.ops = 0
+        self._queue: "queue.Queue[Optional[Tuple[Future, Callable[[Database], Any]]]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn: Callable[["Database"], Any]) -> Future:
+        """Accoda `fn(db)` sul thread di scrittura; il Future si risolve dopo il commit."""
+        future: Future = Future()
+        with self._lock:
+            if self._error is not None:
+                future.set_exception(self._error)
+                return future
+            if self._closed:
+                raise sqlite3.ProgrammingError("Thread di scrittura chiuso.")
+            self._queue.put((future, fn))
+        return future
+
+    def call(self, method_name: str, *args: Any, **kwargs: Any) -> Future:
+        return self.submit(lambda db: getattr(db, method_name)(*args, **kwargs))
+
+    def flush(self) -> None:
+        """Attende che tutte le operazioni gia' accodate siano scritte."""
+        if threading.current_thread() is self._thread:
+            return
+        try:
+            self.submit(lambda db: None).result()
+        except sqlite3.ProgrammingError:
+            pass
+
+    def close(self, wait: bool = True) -> None:
+        """Chiude dopo aver scritto le operazioni gia' accodate."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        if wait and threading.current_thread() is not self._thread:
+            self._thread.join()
+
+    def _run(self) -> None:
+        try:
+            db = Database(self.path, db_profile=self.db_profile, access_mode="rw", session_role="editor")
+        except BaseException as exc:
+            with self._lock:
+                self._error = exc
+                self._closed = True
+            self._fail_pending(exc)
+            return
+        try:
+            stop = False
+            while not stop:
+                item = self._queue.get()
+                if item is None:
+                    break
+                batch = [item]
+                deadline = time.monotonic() + self.window
+                while len(batch) < self.max_ops:
+                    try:
+                        item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stop = True
+                        break
+                    batch.append(item)
+                self._run_batch(db, batch)
+        finally:
+            db.close()
+
+    def _run_batch(self, db: "Database", batch: List[Tuple[Future, Callable[["Database"], Any]]]) -> None:
+        done: List[Tuple[Future, Any, Optional[BaseException]]] = []
+        try:
+            with db.transaction():
+                for future, fn in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        with db.transaction():
+                            value = fn(db)
+                    except Exception as exc:
+                        done.append((future, None, exc))
+                    else:
+                        done.append((future, value, None))
+        except Exception as exc:
+            # Transazione di gruppo non scritta: falliscono tutte le operazioni.
+            for future, _fn in batch:
+                if not future.done():
+                    if not future.running():
+                        future.set_running_or_notify_cancel()
+                    future.set_exception(exc)
+            return
+        self.batches += 1
+        self.ops += len(done)
+        for future, value, error in done:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(value)
+
+    def _fail_pending(self, exc: BaseException) -> None:
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not None and item[0].set_running_or_notify_cancel():
+                item[0].set_exception(exc)
+
+
 class Database:
     def __init__(
         self,
@@ -171,6 +411,7 @@ class Database:
         writer_lock_token: Optional[str] = None,
         writer_lock_scope: str = WRITER_LOCK_SCOPE_MAIN,
         writer_lock_timeout_seconds: int = 120,
+        check_same_thread: bool = True,
     ) -> None:
         self.path = os.path.abspath(path)
         self.db_profile = self._normalize_db_profile(db_profile)
@@ -185,13 +426,23 @@ class Database:
         self.writer_lock_token = writer_lock_token
         self.writer_lock_scope = self._normalize_writer_lock_scope(writer_lock_scope)
         self.writer_lock_timeout_seconds = max(15, int(writer_lock_timeout_seconds or 120))
+        self._search_index_ready: Dict[str, bool] = {}
+        # >0 durante migrazioni: i metodi non fanno commit, lo fa il chiamante alla fine.
+        self._commit_depth = 0
+        self._owner_thread = threading.get_ident()
+        self._check_same_thread = check_same_thread
+        self._reader_pool: Optional[ReaderPool] = None
+        self._write_executor: Optional[WriteExecutor] = None
+        self._pool_lock = threading.Lock()
+        # Impostato da ReaderPool: close() restituisce la connessione al pool.
+        self._on_close: Optional[Callable[["Database"], None]] = None
 
         if self.is_read_only:
             uri = f"{Path(self.path).as_uri()}?mode=ro"
-            self.conn = sqlite3.connect(uri, timeout=30, uri=True)
+            self.conn = sqlite3.connect(uri, timeout=30, uri=True, check_same_thread=check_same_thread)
         else:
             os.makedirs(os.path.dirname(self.path), exist_ok=True)
-            self.conn = sqlite3.connect(self.path, timeout=30)
+            self.conn = sqlite3.connect(self.path, timeout=30, check_same_thread=check_same_thread)
         self.conn.row_factory = sqlite3.Row
         self.conn.execute("PRAGMA foreign_keys=ON;")
         self.conn.execute("PRAGMA busy_timeout=30000;")
@@ -200,40 +451,337 @@ class Database:
             self.conn.execute("PRAGMA journal_mode=WAL;")
             self.conn.execute("PRAGMA synchronous=NORMAL;")
         if not self.is_read_only:
-            self._init_schema()
-            self._seed_defaults()
-            if self.has_materiali:
-                self._backfill_semi_dimensions_from_legacy_field()
-                self._normalize_semi_dimension_preferred_flags()
-            if self.has_manual:
-                self._ensure_manual_v1000_entry()
-                self._ensure_manual_v1001_entry()
-                self._ensure_manual_v1002_entry()
-                self._ensure_manual_v1003_entry()
-                self._ensure_manual_v1004_entry()
-                self._ensure_manual_v1005_entry()
-                self._ensure_manual_v1006_entry()
+            self._migrate()
+
+    # Registro migrazioni schema (solo in coda, ogni passo deve essere idempotente).
+    # PRAGMA user_version = versione * 8 + bit delle aree gia' inizializzate nel file.
+    _MIGRATIONS: Tuple[Tuple[int, str, str], ...] = (
+        (1, "schema base, seed, allineamenti semilavorati, manuale v10.00-v10.06", "_migration_0001_baseline"),
+        (2, "colonne numeriche dimensioni semilavorati", "_migration_0002_semi_dimension_numbers"),
+        (3, "attributi tipizzati articoli normati", "_migration_0003_item_attributes"),
+        (4, "journal modifiche", "_migration_0004_change_log"),
+        (5, "progressivi codici", "_migration_0005_code_sequences"),
+    )
+
+    def _schema_profile_bits(self) -> int:
+        return (1 if self.has_normati else 0) | (2 if self.has_commerciali else 0) | (4 if self.has_materiali else 0)
+
+    def _read_schema_state(self) -> Tuple[int, int]:
+        raw = int(self.conn.execute("PRAGMA user_version").fetchone()[0])
+        return raw // 8, raw % 8
+
+    def _migrate(self) -> None:
+        """
+        Applica le migrazioni mancanti in un'unica transazione. Un DB gia' aggiornato
+        costa una sola lettura di PRAGMA user_version.
+        """
+        bits = self._schema_profile_bits()
+        target = self._MIGRATIONS[-1][0]
+        version, done_bits = self._read_schema_state()
+        if version >= target and done_bits & bits == bits:
+            return
+
+        started = time.perf_counter()
+        with self.transaction():
+            # Riletto sotto lock: un'altra sessione potrebbe aver appena migrato.
+            version, done_bits = self._read_schema_state()
+            if done_bits & bits != bits:
+                # Area nuova per questo file: tutti i passi (idempotenti) vanno rieseguiti.
+                version = 0
+            for number, desc, method in self._MIGRATIONS:
+                if number <= version:
+                    continue
+                step_started = time.perf_counter()
+                getattr(self, method)()
+                _LOG.info(
+                    "%s: migrazione %04d (%s) in %.1f ms",
+                    os.path.basename(self.path),
+                    number,
+                    desc,
+                    (time.perf_counter() - step_started) * 1000.0,
+                )
+            new_version = max(version, target)
+            self.conn.execute(f"PRAGMA user_version={int(new_version) * 8 + (done_bits | bits)}")
+        _LOG.info(
+            "%s: schema aggiornato a v%d in %.1f ms",
+            os.path.basename(self.path),
+            max(version, target),
+            (time.perf_counter() - started) * 1000.0,
+        )
+
+    def _migration_0001_baseline(self) -> None:
+        self._init_schema()
+        self._seed_defaults()
+        if self.has_materiali:
+            self._backfill_semi_dimensions_from_legacy_field()
+            self._normalize_semi_dimension_preferred_flags()
+        if self.has_manual:
+            self._ensure_manual_v1000_entry()
+            self._ensure_manual_v1001_entry()
+            self._ensure_manual_v1002_entry()
+            self._ensure_manual_v1003_entry()
+            self._ensure_manual_v1004_entry()
+            self._ensure_manual_v1005_entry()
+            self._ensure_manual_v1006_entry()
+
+    def _migration_0002_semi_dimension_numbers(self) -> None:
+        if not self.has_materiali:
+            return
+        for col, decl in self._SEMI_DIMENSION_NUMBER_COLUMNS:
+            self._ensure_column("semi_item_dimension", col, decl)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_semi_dim_shape_d ON semi_item_dimension(shape, d1, d2, d3)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_semi_dim_shape_thk ON semi_item_dimension(shape, thickness)")
+        self.refresh_semi_dimension_numbers(only_missing=False)
+
+    def _migration_0003_item_attributes(self) -> None:
+        if not self.has_normati:
+            return
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS item_attr (
+                item_id INTEGER PRIMARY KEY,
+                diameter REAL,
+                length REAL,
+                width REAL,
+                height REAL,
+                prop_class TEXT,
+                finish TEXT,
+                standard TEXT,
+                FOREIGN KEY(item_id) REFERENCES item(id) ON DELETE CASCADE
+            )
+            """
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_item_attr_d_l ON item_attr(diameter, length)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_item_attr_l ON item_attr(length)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_item_attr_class_d ON item_attr(prop_class, diameter, length)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_item_attr_w_h ON item_attr(width, height, length)")
+        # Descrizione cambiata fuori da update_item (tool di patch): la riga torna da interpretare.
+        self.conn.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_item_attr_au AFTER UPDATE OF description ON item BEGIN
+            DELETE FROM item_attr WHERE item_id=NEW.id;
+            END
+            """
+        )
+        self.refresh_item_attributes(only_missing=False)
+
+    def _migration_0004_change_log(self) -> None:
+        # seq AUTOINCREMENT: mai riusato, resta monotono anche dopo la compattazione.
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS change_log (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                table_name TEXT NOT NULL,
+                row_id INTEGER NOT NULL,
+                op TEXT NOT NULL,
+                changed_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%S', 'now', 'localtime'))
+            )
+            """
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_change_log_row ON change_log(table_name, row_id, seq)")
+        # Ultima seq eliminata dalla compattazione per eta' (sotto non si puo' piu' leggere il delta).
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS change_log_state (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+            """
+        )
+        for table in self._journal_tables():
+            if not self._table_exists(self.conn, table):
+                continue
+            self.conn.execute(
+                f"""
+                CREATE TRIGGER IF NOT EXISTS trg_log_{table}_ai AFTER INSERT ON {table} BEGIN
+                INSERT INTO change_log(table_name, row_id, op) VALUES('{table}', NEW.rowid, 'I');
+                END
+                """
+            )
+            # rowid cambiato da un UPDATE: la vecchia riga risulta eliminata.
+            self.conn.execute(
+                f"""
+                CREATE TRIGGER IF NOT EXISTS trg_log_{table}_au AFTER UPDATE ON {table} BEGIN
+                INSERT INTO change_log(table_name, row_id, op) SELECT '{table}', OLD.rowid, 'D' WHERE OLD.rowid<>NEW.rowid;
+                INSERT INTO change_log(table_name, row_id, op) VALUES('{table}', NEW.rowid, 'U');
+                END
+                """
+            )
+            self.conn.execute(
+                f"""
+                CREATE TRIGGER IF NOT EXISTS trg_log_{table}_ad AFTER DELETE ON {table} BEGIN
+                INSERT INTO change_log(table_name, row_id, op) VALUES('{table}', OLD.rowid, 'D');
+                END
+                """
+            )
+
+    def _migration_0005_code_sequences(self) -> None:
+        # Prossimo progressivo libero per (tabella articoli, categoria, sotto-categoria):
+        # le riserve a blocchi lo avanzano con una sola scrittura.
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS code_sequence (
+                item_table TEXT NOT NULL,
+                category_id INTEGER NOT NULL,
+                subcategory_id INTEGER NOT NULL,
+                next_seq INTEGER NOT NULL,
+                PRIMARY KEY(item_table, category_id, subcategory_id)
+            ) WITHOUT ROWID
+            """
+        )
+        for table in self._sequence_tables():
+            # MAX(seq) e buchi per sotto-categoria letti dall'indice, senza scansione.
+            self.conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{table}_cat_sub_seq ON {table}(category_id, subcategory_id, seq)"
+            )
+            self.conn.execute(
+                f"""
+                INSERT OR IGNORE INTO code_sequence(item_table, category_id, subcategory_id, next_seq)
+                SELECT '{table}', category_id, subcategory_id, MAX(seq) + 1
+                FROM {table}
+                GROUP BY category_id, subcategory_id
+                """
+            )
+
+    def _sequence_tables(self) -> Tuple[str, ...]:
+        tables: Tuple[str, ...] = ()
+        if self.has_normati:
+            tables += ("item",)
+        if self.has_commerciali:
+            tables += ("comm_item",)
+        return tables
+
+    def _journal_tables(self) -> Tuple[str, ...]:
+        tables: Tuple[str, ...] = ()
+        if self.has_normati:
+            tables += NORMATI_TABLES
+        if self.has_commerciali:
+            tables += COMMERCIALI_TABLES
+        if self.has_materiali:
+            tables += MATERIALI_TABLES
+        return tables
+
+    def _commit(self) -> None:
+        if self._commit_depth == 0:
+            self.conn.commit()
+
+    @contextmanager
+    def transaction(self) -> Iterator["Database"]:
+        """
+        Unita' di lavoro: i metodi chiamati nel blocco non fanno commit, il commit
+        (o il rollback se il blocco solleva) avviene una sola volta all'uscita.
+        Blocchi annidati = SAVEPOINT, annullabili da soli.
+        """
+        if self._commit_depth == 0 and self._write_executor is not None:
+            # Prima le scritture gia' accodate sul thread di scrittura.
+            self._write_executor.flush()
+        savepoint = f"uow_{self._commit_depth}" if self.conn.in_transaction else None
+        if savepoint is None:
+            self.conn.execute("BEGIN IMMEDIATE")
+        else:
+            self.conn.execute(f"SAVEPOINT {savepoint}")
+        self._commit_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._commit_depth -= 1
+            if savepoint is None:
+                self.conn.rollback()
+            else:
+                self.conn.execute(f"ROLLBACK TO {savepoint}")
+                self.conn.execute(f"RELEASE {savepoint}")
+            raise
+        self._commit_depth -= 1
+        if savepoint is None:
+            self.conn.commit()
+        else:
+            self.conn.execute(f"RELEASE {savepoint}")
 
     def close(self) -> None:
+        if self._on_close is not None:
+            on_close, self._on_close = self._on_close, None
+            on_close(self)
+            return
+        if self._write_executor is not None:
+            self._write_executor.close()
+        if self._reader_pool is not None:
+            self._reader_pool.close()
         try:
             self.conn.close()
         except Exception:
             pass
 
+    def on_owner_thread(self) -> bool:
+        """True se chiamato dal thread che ha aperto la connessione (thread Tk per l'app)."""
+        return threading.get_ident() == self._owner_thread
+
+    def adopt_owner_thread(self) -> None:
+        """Il thread chiamante diventa proprietario della connessione (aperta altrove con check_same_thread=False)."""
+        if self._check_same_thread:
+            raise RuntimeError("Connessione legata al thread che l'ha aperta.")
+        self._owner_thread = threading.get_ident()
+
+    def reader_pool(self) -> ReaderPool:
+        """Pool di connessioni di sola lettura sullo stesso file (aperto al primo uso)."""
+        with self._pool_lock:
+            if self._reader_pool is None:
+                self._reader_pool = ReaderPool(self.path, self.db_profile)
+            return self._reader_pool
+
+    def write_executor(self) -> WriteExecutor:
+        """Thread di scrittura con commit di gruppo sullo stesso file (avviato al primo uso)."""
+        if self.is_read_only:
+            raise PermissionError("Sessione in sola lettura: scrittura non consentita.")
+        with self._pool_lock:
+            if self._write_executor is None:
+                self._write_executor = WriteExecutor(self.path, self.db_profile)
+            return self._write_executor
+
     @staticmethod
     def _auto_code(prefix: str) -> str:
         return f"{normalize_upper(prefix)}_{uuid.uuid4().hex[:10].upper()}"
 
     def backup_to_path(self, target_path: str) -> None:
+        self.backup_file(self.path, target_path)
+
+    @staticmethod
+    def backup_file(
+        source_path: str,
+        target_path: str,
+        pages: int = BACKUP_PAGES_PER_STEP,
+        progress: Optional[Callable[[int, int], None]] = None,
+    ) -> None:
+        """
+        Copia consistente di un DB con l'API backup a passi di `pages` pagine, da una
+        connessione propria (usabile da qualsiasi thread): tra un passo e l'altro
+        lettori e writer non restano bloccati. Scrive su `<target>.part` e rinomina
+        solo a copia completa. `progress(rimanenti, totali)`: se solleva, la copia si interrompe.
+        """
         target_dir = os.path.dirname(os.path.abspath(target_path))
         if target_dir:
             os.makedirs(target_dir, exist_ok=True)
-        dst = sqlite3.connect(target_path)
+        part_path = target_path + ".part"
+        src = sqlite3.connect(f"{Path(os.path.abspath(source_path)).as_uri()}?mode=ro", timeout=30, uri=True)
         try:
-            self.conn.backup(dst)
-            dst.commit()
+            dst = sqlite3.connect(part_path)
+            try:
+                src.backup(
+                    dst,
+                    pages=int(pages) if pages and pages > 0 else -1,
+                    progress=(lambda _status, remaining, total: progress(remaining, total)) if progress else None,
+                    sleep=0.05,
+                )
+            finally:
+                dst.close()
+            os.replace(part_path, target_path)
+        except BaseException:
+            try:
+                os.remove(part_path)
+            except OSError:
+                pass
+            raise
         finally:
-            dst.close()
+            src.close()
 
     @staticmethod
     def _table_exists(conn: sqlite3.Connection, table: str) -> bool:
@@ -248,43 +796,131 @@ class Database:
         return [str(r[1]) for r in cur.fetchall()]
 
     @staticmethod
-    def _copy_tables_from_legacy(src_path: str, dst_path: str, tables: Tuple[str, ...]) -> None:
-        if not os.path.isfile(src_path):
-            return
-        dst_conn = sqlite3.connect(dst_path)
-        try:
-            dst_conn.execute("ATTACH DATABASE ? AS legacy", (os.path.abspath(src_path),))
-            dst_conn.execute("PRAGMA foreign_keys=OFF;")
-            for table in tables:
-                if not Database._table_exists(dst_conn, table):
-                    continue
-                legacy_exists = dst_conn.execute(
-                    "SELECT 1 FROM legacy.sqlite_master WHERE type='table' AND name=?",
-                    (table,),
-                ).fetchone()
-                if legacy_exists is None:
-                    continue
-                src_cols = [str(r[1]) for r in dst_conn.execute(f"PRAGMA legacy.table_info({table})").fetchall()]
-                dst_cols = Database._table_columns(dst_conn, table)
-                cols = [c for c in dst_cols if c in src_cols]
-                if not cols:
-                    continue
-                cols_csv = ", ".join(cols)
-                dst_conn.execute(f"DELETE FROM {table}")
-                dst_conn.execute(
-                    f"INSERT INTO {table}({cols_csv}) SELECT {cols_csv} FROM legacy.{table}"
+    def _table_primary_key(conn: sqlite3.Connection, table: str) -> Optional[str]:
+        pk = [str(r[1]) for r in conn.execute(f"PRAGMA table_info({table})").fetchall() if int(r[5]) > 0]
+        return pk[0] if len(pk) == 1 else None
+
+    def _sync_tables_from_legacy(self, tables: Tuple[str, ...], delta: bool) -> Dict[str, Dict[str, List[Any]]]:
+        """
+        Allinea le tabelle al DB `legacy` gia' collegato (ATTACH). In modalita' delta le
+        righe sono confrontate per chiave primaria e contenuto delle colonne comuni e si
+        scrivono solo INSERT/UPDATE/DELETE necessari; altrimenti svuota e ricopia.
+        Ritorna tabella -> {"inserted", "updated", "deleted": id}.
+        """
+        out: Dict[str, Dict[str, List[Any]]] = {}
+        cur = self.conn.cursor()
+        for table in tables:
+            if not self._table_exists(self.conn, table):
+                continue
+            legacy_exists = cur.execute(
+                "SELECT 1 FROM legacy.sqlite_master WHERE type='table' AND name=?",
+                (table,),
+            ).fetchone()
+            if legacy_exists is None:
+                continue
+            src_cols = [str(r[1]) for r in cur.execute(f"PRAGMA legacy.table_info({table})").fetchall()]
+            cols = [c for c in self._table_columns(self.conn, table) if c in src_cols]
+            if not cols:
+                continue
+            cols_csv = ", ".join(cols)
+            pk = self._table_primary_key(self.conn, table)
+            if not delta or pk is None or pk not in cols:
+                old_ids = [int(r[0]) for r in cur.execute(f"SELECT rowid FROM main.{table}").fetchall()]
+                cur.execute(f"DELETE FROM main.{table}")
+                cur.execute(f"INSERT INTO main.{table}({cols_csv}) SELECT {cols_csv} FROM legacy.{table}")
+                new_ids = [int(r[0]) for r in cur.execute(f"SELECT rowid FROM main.{table}").fetchall()]
+                out[table] = {"inserted": new_ids, "updated": [], "deleted": old_ids}
+                continue
+
+            data_cols = [c for c in cols if c != pk]
+            differs = " OR ".join(f"l.{c} IS NOT m.{c}" for c in data_cols) or "0"
+            deleted = [
+                r[0]
+                for r in cur.execute(f"SELECT {pk} FROM main.{table} EXCEPT SELECT {pk} FROM legacy.{table}")
+            ]
+            inserted = [
+                r[0]
+                for r in cur.execute(f"SELECT {pk} FROM legacy.{table} EXCEPT SELECT {pk} FROM main.{table}")
+            ]
+            updated = [
+                r[0]
+                for r in cur.execute(
+                    f"SELECT l.{pk} FROM legacy.{table} l JOIN main.{table} m ON m.{pk}=l.{pk} WHERE {differs}"
                 )
-            dst_conn.commit()
-        finally:
-            try:
-                dst_conn.execute("PRAGMA foreign_keys=ON;")
-            except Exception:
-                pass
+            ]
+            if deleted:
+                cur.execute(f"DELETE FROM main.{table} WHERE {pk} NOT IN (SELECT {pk} FROM legacy.{table})")
+            if updated:
+                set_cols = ", ".join(data_cols)
+                cur.execute(
+                    f"""
+                    UPDATE main.{table} AS m SET ({set_cols}) = (
+                        SELECT {set_cols} FROM legacy.{table} l WHERE l.{pk}=m.{pk}
+                    )
+                    WHERE EXISTS (SELECT 1 FROM legacy.{table} l WHERE l.{pk}=m.{pk} AND ({differs}))
+                    """
+                )
+            if inserted:
+                cur.execute(
+                    f"""
+                    INSERT INTO main.{table}({cols_csv})
+                    SELECT {cols_csv} FROM legacy.{table}
+                    WHERE {pk} NOT IN (SELECT {pk} FROM main.{table})
+                    """
+                )
+            out[table] = {"inserted": inserted, "updated": updated, "deleted": deleted}
+        return out
+
+    @staticmethod
+    def _sync_target_from_legacy(
+        legacy_path: str,
+        path: str,
+        profile: str,
+        tables: Tuple[str, ...],
+        delta: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        Sync di un DB area dal legacy in un'unica transazione (tabelle e dati ricavati).
+        Eseguibile in un processo di lavoro. Ritorna {"tables": tabella -> (inseriti, modificati,
+        eliminati), "seconds": durata}.
+        """
+        started = time.perf_counter()
+        db = Database(
+            path,
+            db_profile=profile,
+            access_mode="rw",
+            session_role="editor",
+            writer_lock_scope=WRITER_LOCK_SCOPE_MAIN,
+        )
+        try:
+            # Fuori transazione: PRAGMA foreign_keys e ATTACH non valgono dentro un BEGIN.
+            db.conn.execute("PRAGMA foreign_keys=OFF;")
+            db.conn.execute("ATTACH DATABASE ? AS legacy", (os.path.abspath(legacy_path),))
             try:
-                dst_conn.execute("DETACH DATABASE legacy")
-            except Exception:
-                pass
-            dst_conn.close()
+                with db.transaction():
+                    # Journal: le righe cambiate (delta) o una voce 'R' per tabella ricopiata,
+                    # non una voce per ogni riga toccata da copia e dati ricavati.
+                    with db.suspended_change_log():
+                        changes = db._sync_tables_from_legacy(tables, delta)
+                        db._refresh_derived_data(
+                            {t: c["inserted"] + c["updated"] for t, c in changes.items()} if delta else None
+                        )
+                        if delta:
+                            db._log_changes(changes)
+                        else:
+                            db._log_resync(tuple(changes))
+                    db.compact_change_log()
+            finally:
+                db.conn.execute("DETACH DATABASE legacy")
+                db.conn.execute("PRAGMA foreign_keys=ON;")
+        finally:
+            db.close()
+        return {
+            "tables": {
+                t: (len(c["inserted"]), len(c["updated"]), len(c["deleted"])) for t, c in changes.items()
+            },
+            "seconds": time.perf_counter() - started,
+        }
 
     @staticmethod
     def bootstrap_split_databases(
@@ -306,24 +942,16 @@ class Database:
             abs_path = os.path.abspath(path)
             if os.path.isfile(abs_path):
                 continue
-            init_db = Database(
-                abs_path,
-                db_profile=profile,
-                access_mode="rw",
-                session_role="editor",
-                writer_lock_scope=WRITER_LOCK_SCOPE_MAIN,
-            )
-            init_db.close()
             if os.path.isfile(legacy_abs):
-                Database._copy_tables_from_legacy(legacy_abs, abs_path, tables)
-                post_db = Database(
+                Database._sync_target_from_legacy(legacy_abs, abs_path, profile, tables, delta=False)
+            else:
+                Database(
                     abs_path,
                     db_profile=profile,
                     access_mode="rw",
                     session_role="editor",
                     writer_lock_scope=WRITER_LOCK_SCOPE_MAIN,
-                )
-                post_db.close()
+                ).close()
 
     @staticmethod
     def resync_split_databases(
@@ -331,7 +959,14 @@ class Database:
         normati_path: str,
         commerciali_path: str,
         materiali_path: str,
-    ) -> None:
+        delta: bool = False,
+        parallel: bool = True,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Riallinea i 3 DB area dal legacy. `delta`: solo le righe cambiate (vedi
+        `_sync_tables_from_legacy`). `parallel`: un processo di lavoro per DB.
+        Ritorna percorso DB -> risultato di `_sync_target_from_legacy`.
+        """
         legacy_abs = os.path.abspath(legacy_path or "")
         if not os.path.isfile(legacy_abs):
             raise FileNotFoundError(f"Legacy DB non trovato: {legacy_abs}")
@@ -341,24 +976,243 @@ class Database:
             (os.path.abspath(commerciali_path), DB_PROFILE_COMMERCIALI, COMMERCIALI_TABLES),
             (os.path.abspath(materiali_path), DB_PROFILE_MATERIALI, MATERIALI_TABLES),
         ]
-        for abs_path, profile, tables in targets:
-            init_db = Database(
-                abs_path,
-                db_profile=profile,
-                access_mode="rw",
-                session_role="editor",
-                writer_lock_scope=WRITER_LOCK_SCOPE_MAIN,
-            )
-            init_db.close()
-            Database._copy_tables_from_legacy(legacy_abs, abs_path, tables)
-            post_db = Database(
-                abs_path,
-                db_profile=profile,
-                access_mode="rw",
-                session_role="editor",
-                writer_lock_scope=WRITER_LOCK_SCOPE_MAIN,
-            )
-            post_db.close()
+        if not parallel:
+            return {
+                abs_path: Database._sync_target_from_legacy(legacy_abs, abs_path, profile, tables, delta)
+                for abs_path, profile, tables in targets
+            }
+        with ProcessPoolExecutor(max_workers=len(targets)) as pool:
+            futures = {
+                abs_path: pool.submit(Database._sync_target_from_legacy, legacy_abs, abs_path, profile, tables, delta)
+                for abs_path, profile, tables in targets
+            }
+            return {abs_path: f.result() for abs_path, f in futures.items()}
+
+    def _refresh_derived_data(self, changed: Optional[Dict[str, List[Any]]] = None) -> None:
+        """
+        Dati ricavati dalle tabelle copiate: attributi articoli e colonne numeriche dimensioni.
+        Con `changed` (tabella -> id inseriti o modificati) solo le righe toccate.
+        Dati ricavati, non modifiche dell'utente: nessuna voce nel journal.
+        """
+        cur = self.conn.cursor()
+        with self.transaction(), self.suspended_change_log():
+            if self.has_normati:
+                if changed is None:
+                    self.refresh_item_attributes(only_missing=False)
+                else:
+                    cur.executemany("DELETE FROM item_attr WHERE item_id=?", [(i,) for i in changed.get("item", [])])
+                    cur.execute("DELETE FROM item_attr WHERE item_id NOT IN (SELECT id FROM item)")
+                    self.refresh_item_attributes()
+            if self.has_materiali:
+                if changed is not None:
+                    # Tipo o semilavorato cambiato: la forma delle sue dimensioni va reinterpretata.
+                    cur.executemany(
+                        "UPDATE semi_item_dimension SET shape=NULL WHERE id=?",
+                        [(i,) for i in changed.get("semi_item_dimension", [])],
+                    )
+                    cur.executemany(
+                        "UPDATE semi_item_dimension SET shape=NULL WHERE semi_item_id=?",
+                        [(i,) for i in changed.get("semi_item", [])],
+                    )
+                    cur.executemany(
+                        "UPDATE semi_item_dimension SET shape=NULL WHERE semi_item_id IN (SELECT id FROM semi_item WHERE type_id=?)",
+                        [(i,) for i in changed.get("semi_type", [])],
+                    )
+                self.refresh_semi_dimension_numbers()
+
+    # -------- Journal modifiche --------
+    def last_change_seq(self) -> int:
+        """Seq dell'ultima modifica registrata (0 = nessuna): punto di partenza per `changes_since`."""
+        row = self.conn.execute("SELECT seq FROM sqlite_sequence WHERE name='change_log'").fetchone()
+        return int(row[0]) if row is not None else 0
+
+    @contextmanager
+    def suspended_change_log(self) -> Iterator[None]:
+        """
+        Manutenzione massiva (sync dal legacy, dati ricavati): i trigger del journal sono
+        sospesi come in `bulk_item_inserts`, le voci le scrive il chiamante (`_log_changes`,
+        `_log_resync`) o nessuna. Solo dentro `transaction()`; blocchi annidati senza effetto.
+        """
+        if not self.conn.in_transaction:
+            raise RuntimeError("suspended_change_log richiede una transazione aperta.")
+        suspended = {
+            str(r["name"]): str(r["sql"])
+            for r in self.conn.execute("SELECT name, sql FROM sqlite_master WHERE type='trigger' AND name GLOB 'trg_log_*'")
+        }
+        for name in suspended:
+            self.conn.execute(f"DROP TRIGGER {name}")
+        try:
+            yield
+        finally:
+            for sql in suspended.values():
+                self.conn.execute(sql)
+
+    def _log_changes(self, changes: Dict[str, Dict[str, List[Any]]]) -> None:
+        """Voci del journal per le righe di un sync delta: tabella -> {"inserted", "updated", "deleted": id}."""
+        journal = set(self._journal_tables())
+        self.conn.executemany(
+            "INSERT INTO change_log(table_name, row_id, op) VALUES(?, ?, ?)",
+            [
+                (table, int(row_id), op)
+                for table, c in changes.items()
+                if table in journal
+                for key, op in (("deleted", "D"), ("inserted", "I"), ("updated", "U"))
+                for row_id in c.get(key, [])
+            ],
+        )
+
+    def _log_resync(self, tables: Sequence[str]) -> None:
+        """Tabelle ricopiate in blocco: una voce 'R' (row_id 0) per tabella, chi legge il delta la rilegge."""
+        journal = set(self._journal_tables())
+        self.conn.executemany(
+            "INSERT INTO change_log(table_name, row_id, op) VALUES(?, 0, 'R')",
+            [(table,) for table in tables if table in journal],
+        )
+
+    def _change_log_floor(self) -> int:
+        row = self.conn.execute("SELECT value FROM change_log_state WHERE key='floor_seq'").fetchone()
+        return int(row[0]) if row is not None else 0
+
+    def changes_since(
+        self,
+        since_seq: int,
+        tables: Optional[Sequence[str]] = None,
+        limit: int = 0,
+    ) -> List[Dict[str, Any]]:
+        """
+        Modifiche con seq > since_seq in ordine: seq, table_name, row_id, op (I/U/D), changed_at.
+        op R (row_id 0) = tabella ricopiata in blocco dal sync: va riletta per intero.
+        Dopo una compattazione una riga puo' comparire solo con l'ultima operazione (U = inserita o modificata).
+        ValueError se il delta da since_seq non e' piu' disponibile: serve una rilettura completa.
+        """
+        since = int(since_seq)
+        floor = self._change_log_floor()
+        if since < floor:
+            raise ValueError(f"Journal modifiche compattato fino a seq {floor}: rileggere le tabelle.")
+        sql = "SELECT seq, table_name, row_id, op, changed_at FROM change_log WHERE seq>?"
+        params: List[Any] = [since]
+        if tables:
+            sql += f" AND table_name IN ({', '.join('?' * len(tables))})"
+            params.extend(tables)
+        sql += " ORDER BY seq"
+        if limit and limit > 0:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        return [dict(r) for r in self.conn.execute(sql, params).fetchall()]
+
+    def compact_change_log(self, keep_days: int = CHANGE_LOG_KEEP_DAYS) -> int:
+        """
+        Toglie le voci piu' vecchie di `keep_days` giorni, per ogni riga quelle seguite
+        da una modifica piu' recente e per ogni tabella quelle precedenti la sua ultima
+        voce 'R'. Ritorna le voci eliminate.
+        """
+        cur = self.conn.cursor()
+        cutoff = (datetime.now() - timedelta(days=max(0, int(keep_days)))).strftime(DATE_FMT)
+        row = cur.execute("SELECT MAX(seq) FROM change_log WHERE changed_at<?", (cutoff,)).fetchone()
+        removed = 0
+        if row is not None and row[0] is not None:
+            floor = int(row[0])
+            removed += cur.execute("DELETE FROM change_log WHERE seq<=?", (floor,)).rowcount
+            cur.execute(
+                "INSERT INTO change_log_state(key, value) VALUES('floor_seq', ?) "
+                "ON CONFLICT(key) DO UPDATE SET value=MAX(value, excluded.value)",
+                (floor,),
+            )
+        removed += cur.execute(
+            """
+            DELETE FROM change_log
+            WHERE seq < (
+                SELECT MAX(c.seq) FROM change_log c
+                WHERE c.table_name=change_log.table_name AND c.row_id=change_log.row_id
+            )
+            """
+        ).rowcount
+        removed += cur.execute(
+            """
+            DELETE FROM change_log
+            WHERE seq < (
+                SELECT MAX(r.seq) FROM change_log r
+                WHERE r.table_name=change_log.table_name AND r.row_id=0 AND r.op='R'
+            )
+            """
+        ).rowcount
+        self._commit()
+        return removed
+
+    # -------- Progressivi codici --------
+    def _peek_seq(self, item_table: str, category_id: int, subcategory_id: int) -> int:
+        """Prossimo progressivo senza riservarlo (solo lettura)."""
+        row = self.conn.execute(
+            f"""
+            SELECT MAX(
+                (SELECT COALESCE(MAX(seq), -1) + 1 FROM {item_table} WHERE category_id=? AND subcategory_id=?),
+                COALESCE(
+                    (SELECT next_seq FROM code_sequence WHERE item_table=? AND category_id=? AND subcategory_id=?),
+                    0
+                )
+            )
+            """,
+            (int(category_id), int(subcategory_id), item_table, int(category_id), int(subcategory_id)),
+        ).fetchone()
+        return int(row[0])
+
+    def _seq_gaps(self, item_table: str, category_id: int, subcategory_id: int, count: int) -> List[int]:
+        """Fino a `count` progressivi non usati sotto il massimo, dai buchi tra seq consecutive (LAG)."""
+        out: List[int] = []
+        cur = self.conn.execute(
+            f"""
+            SELECT prev_seq + 1, seq
+            FROM (
+                SELECT seq, LAG(seq, 1, -1) OVER (ORDER BY seq) AS prev_seq
+                FROM {item_table}
+                WHERE category_id=? AND subcategory_id=?
+            )
+            WHERE seq - prev_seq > 1
+            ORDER BY seq
+            """,
+            (int(category_id), int(subcategory_id)),
+        )
+        for first_free, next_used in cur:
+            out.extend(range(int(first_free), min(int(next_used), int(first_free) + count - len(out))))
+            if len(out) >= count:
+                break
+        return out
+
+    def _reserve_seqs(
+        self,
+        item_table: str,
+        category_id: int,
+        subcategory_id: int,
+        count: int = 1,
+        fill_gaps: bool = False,
+    ) -> List[int]:
+        """
+        Riserva `count` progressivi in modo atomico (una transazione BEGIN IMMEDIATE):
+        due scrittori non ricevono mai lo stesso blocco. Il blocco parte dal massimo tra
+        contatore e MAX(seq)+1, quindi resta corretto anche dopo inserimenti che non
+        passano di qui (sync da legacy, tool). Con `fill_gaps` riusa prima i buchi sotto
+        il massimo: solo per scrittore unico (import), un buco puo' essere un progressivo
+        riservato da un'altra postazione e non ancora salvato.
+        """
+        if item_table not in ("item", "comm_item"):
+            raise ValueError(f"Tabella articoli non valida: {item_table}")
+        count = max(1, int(count))
+        key = (item_table, int(category_id), int(subcategory_id))
+        with self.transaction():
+            out = self._seq_gaps(*key, count) if fill_gaps else []
+            need = count - len(out)
+            if need > 0:
+                start = self._peek_seq(*key)
+                self.conn.execute(
+                    """
+                    INSERT INTO code_sequence(item_table, category_id, subcategory_id, next_seq)
+                    VALUES(?, ?, ?, ?)
+                    ON CONFLICT(item_table, category_id, subcategory_id) DO UPDATE SET next_seq=excluded.next_seq
+                    """,
+                    (*key, start + need),
+                )
+                out.extend(range(start, start + need))
+        return out
 
     @staticmethod
     def _parse_lock_ts(text: str) -> Optional[datetime]:
@@ -548,7 +1402,7 @@ class Database:
             """,
             (now_str(), self.writer_lock_scope, tok),
         )
-        self.conn.commit()
+        self._commit()
         return cur.rowcount > 0
 
     def release_writer_lock(self) -> bool:
@@ -559,7 +1413,7 @@ class Database:
             return False
         cur = self.conn.cursor()
         cur.execute("DELETE FROM app_writer_lock WHERE lock_key=? AND token=?", (self.writer_lock_scope, tok))
-        self.conn.commit()
+        self._commit()
         return cur.rowcount > 0
 
     def _ensure_column(self, table: str, col: str, decl: str) -> None:
@@ -571,7 +1425,7 @@ class Database:
             return
         if col not in cols:
             self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {col} {decl}")
-            self.conn.commit()
+            self._commit()
 
     def _init_schema(self) -> None:
         cur = self.conn.cursor()
@@ -637,6 +1491,7 @@ class Database:
             )
             cur.execute("CREATE INDEX IF NOT EXISTS idx_item_cat_sub ON item(category_id, subcategory_id)")
             cur.execute("CREATE INDEX IF NOT EXISTS idx_item_code ON item(code)")
+            self._ensure_item_search_index()
 
         if self.has_commerciali:
             # Commerciali non normati
@@ -696,6 +1551,11 @@ class Database:
             )
             cur.execute("CREATE INDEX IF NOT EXISTS idx_comm_item_cat_sub ON comm_item(category_id, subcategory_id)")
             cur.execute("CREATE INDEX IF NOT EXISTS idx_comm_item_code ON comm_item(code)")
+            cur.execute(
+                "CREATE INDEX IF NOT EXISTS idx_comm_item_sup_code_key "
+                f"ON comm_item({self._compact_code_expr('supplier_item_code')})"
+            )
+            self._ensure_comm_item_search_index()
 
         if self.has_materiali:
             # Materiali / Trattamenti / Semilavorati
@@ -871,7 +1731,7 @@ class Database:
             """
         )
 
-        self.conn.commit()
+        self._commit()
 
         # migrations for older DBs
         if self.has_normati:
@@ -893,10 +1753,174 @@ class Database:
                     WHERE preferred=1
                     """
                 )
-                self.conn.commit()
+                self._commit()
             except sqlite3.OperationalError:
                 pass
 
+    @staticmethod
+    def _search_source_sql(base_sql: str, fields: Tuple[str, ...], where_sql: str) -> str:
+        """SELECT che produce le righe di un indice di ricerca (valori + testo normalizzato)."""
+        values = ",\n                   ".join(f"UPPER(COALESCE({f},''))" for f in fields)
+        norm = " || ' ' || ".join(Database._normalized_search_expr(f) for f in fields)
+        return f"""
+            SELECT i.id,
+                   {values},
+                   {norm}
+            {base_sql}
+            WHERE {where_sql}
+        """
+
+    def _create_search_index(
+        self,
+        index_table: str,
+        columns: Tuple[str, ...],
+        base_sql: str,
+        fields: Tuple[str, ...],
+        triggers: List[Tuple[str, str, Optional[str], Optional[str]]],
+    ) -> None:
+        """
+        Indice FTS5 (tokenizer trigram) di supporto alle ricerche articoli.
+        Colonne = valori dei campi in MAIUSCOLO + colonna `norm` con i separatori gia'
+        normalizzati in spazio (stessa regola di `_normalized_search_expr`), cosi' il
+        match a parola intera diventa una frase " TOKEN " sull'indice.
+        `triggers`: (suffisso, evento, righe da rimuovere, righe da reinserire).
+        """
+        if self._table_exists(self.conn, index_table):
+            return
+        try:
+            self.conn.execute(
+                f"CREATE VIRTUAL TABLE {index_table} USING fts5({', '.join(columns)}, norm, tokenize='trigram')"
+            )
+        except sqlite3.OperationalError:
+            # SQLite senza FTS5/trigram: la ricerca resta sul percorso LIKE.
+            return
+
+        insert_sql = f"INSERT INTO {index_table}(rowid, {', '.join(columns)}, norm)"
+        for suffix, event_sql, delete_where, insert_where in triggers:
+            body: List[str] = []
+            if delete_where:
+                body.append(f"DELETE FROM {index_table} WHERE {delete_where};")
+            if insert_where:
+                body.append(f"{insert_sql} {self._search_source_sql(base_sql, fields, insert_where)};")
+            self.conn.execute(
+                f"CREATE TRIGGER IF NOT EXISTS trg_{index_table}_{suffix} {event_sql} BEGIN\n"
+                + "\n".join(body)
+                + "\nEND"
+            )
+        self.conn.execute(f"{insert_sql} {self._search_source_sql(base_sql, fields, '1=1')}")
+        self._commit()
+
+    _ITEM_SEARCH_BASE_SQL = """
+            FROM item i
+            LEFT JOIN category c ON c.id=i.category_id
+            LEFT JOIN subcategory sc ON sc.id=i.subcategory_id
+            """
+    _ITEM_SEARCH_FIELDS = ("i.code", "i.description", "c.code", "sc.code")
+
+    def _ensure_item_search_index(self) -> None:
+        self._create_search_index(
+            "item_search",
+            ("code", "description", "cat_code", "sub_code"),
+            self._ITEM_SEARCH_BASE_SQL,
+            self._ITEM_SEARCH_FIELDS,
+            [
+                ("ai", "AFTER INSERT ON item", None, "i.id=NEW.id"),
+                ("au", "AFTER UPDATE ON item", "rowid=OLD.id", "i.id=NEW.id"),
+                ("ad", "AFTER DELETE ON item", "rowid=OLD.id", None),
+                (
+                    "cat_au",
+                    "AFTER UPDATE OF code ON category",
+                    "rowid IN (SELECT id FROM item WHERE category_id=NEW.id)",
+                    "i.category_id=NEW.id",
+                ),
+                (
+                    "sub_au",
+                    "AFTER UPDATE OF code ON subcategory",
+                    "rowid IN (SELECT id FROM item WHERE subcategory_id=NEW.id)",
+                    "i.subcategory_id=NEW.id",
+                ),
+            ],
+        )
+
+    @contextmanager
+    def bulk_item_inserts(self) -> Iterator[None]:
+        """
+        Inserimenti massivi in `item` (patch dati): i trigger per riga di indice ricerca e
+        journal sono sospesi e le righe nuove aggiunte all'uscita con un INSERT ... SELECT
+        per tabella. Solo dentro `transaction()`: sospensione e ripristino stanno nella
+        stessa transazione, nessun'altra connessione vede il DB senza trigger.
+        """
+        if not self.conn.in_transaction:
+            raise RuntimeError("bulk_item_inserts richiede una transazione aperta.")
+        suspended = {
+            str(r["name"]): str(r["sql"])
+            for r in self.conn.execute(
+                "SELECT name, sql FROM sqlite_master WHERE type='trigger' AND name IN ('trg_item_search_ai', 'trg_log_item_ai')"
+            )
+        }
+        last_id = int(self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM item").fetchone()[0])
+        for name in suspended:
+            self.conn.execute(f"DROP TRIGGER {name}")
+        try:
+            yield
+            if "trg_log_item_ai" in suspended:
+                self.conn.execute(
+                    "INSERT INTO change_log(table_name, row_id, op) SELECT 'item', id, 'I' FROM item WHERE id>? ORDER BY id",
+                    (last_id,),
+                )
+            if "trg_item_search_ai" in suspended:
+                self.conn.execute(
+                    "INSERT INTO item_search(rowid, code, description, cat_code, sub_code, norm) "
+                    + self._search_source_sql(self._ITEM_SEARCH_BASE_SQL, self._ITEM_SEARCH_FIELDS, "i.id>?"),
+                    (last_id,),
+                )
+        finally:
+            for sql in suspended.values():
+                self.conn.execute(sql)
+
+    def _ensure_comm_item_search_index(self) -> None:
+        self._create_search_index(
+            "comm_item_search",
+            ("code", "description", "cat_code", "sub_code", "sup_code", "supplier_item_code", "supplier_item_desc"),
+            """
+            FROM comm_item i
+            LEFT JOIN comm_category c ON c.id=i.category_id
+            LEFT JOIN comm_subcategory sc ON sc.id=i.subcategory_id
+            LEFT JOIN supplier s ON s.id=i.supplier_id
+            """,
+            ("i.code", "i.description", "c.code", "sc.code", "s.code", "i.supplier_item_code", "i.supplier_item_desc"),
+            [
+                ("ai", "AFTER INSERT ON comm_item", None, "i.id=NEW.id"),
+                ("au", "AFTER UPDATE ON comm_item", "rowid=OLD.id", "i.id=NEW.id"),
+                ("ad", "AFTER DELETE ON comm_item", "rowid=OLD.id", None),
+                (
+                    "cat_au",
+                    "AFTER UPDATE OF code ON comm_category",
+                    "rowid IN (SELECT id FROM comm_item WHERE category_id=NEW.id)",
+                    "i.category_id=NEW.id",
+                ),
+                (
+                    "sub_au",
+                    "AFTER UPDATE OF code ON comm_subcategory",
+                    "rowid IN (SELECT id FROM comm_item WHERE subcategory_id=NEW.id)",
+                    "i.subcategory_id=NEW.id",
+                ),
+                (
+                    "sup_au",
+                    "AFTER UPDATE OF code ON supplier",
+                    "rowid IN (SELECT id FROM comm_item WHERE supplier_id=NEW.id)",
+                    "i.supplier_id=NEW.id",
+                ),
+            ],
+        )
+
+    def _has_search_index(self, table: str) -> bool:
+        cached = self._search_index_ready.get(table)
+        if cached is None:
+            cached = self._table_exists(self.conn, table)
+            self._search_index_ready[table] = cached
+        return cached
+
     def _seed_defaults(self) -> None:
         cur = self.conn.cursor()
 
@@ -904,7 +1928,7 @@ class Database:
             # Normati
             for desc, mmm in DEFAULT_NORMATI_CATEGORIES:
                 cur.execute("INSERT OR IGNORE INTO category(code, description) VALUES(?, ?)", (mmm, normalize_upper(desc)))
-            self.conn.commit()
+            self._commit()
 
             cur.execute("SELECT id, code FROM category")
             cat_map = {r["code"]: int(r["id"]) for r in cur.fetchall()}
@@ -916,7 +1940,7 @@ class Database:
                         "INSERT OR IGNORE INTO standard(category_id, code, description) VALUES(?, ?, ?)",
                         (cid, normalize_upper(code), normalize_upper(desc)),
                     )
-            self.conn.commit()
+            self._commit()
 
             cur.execute("SELECT id, category_id, code FROM standard")
             std_map = {(int(r["category_id"]), r["code"]): int(r["id"]) for r in cur.fetchall()}
@@ -930,13 +1954,13 @@ class Database:
                     "INSERT OR IGNORE INTO subcategory(category_id, code, description, standard_id, desc_template) VALUES(?, ?, ?, ?, ?)",
                     (cid, normalize_gggg_normati(gggg), normalize_upper(desc), sid, ""),
                 )
-            self.conn.commit()
+            self._commit()
 
         if self.has_commerciali and SEED_COMMERCIALI_DEFAULTS:
             # Commerciali
             for desc, code in DEFAULT_COMM_CATEGORIES:
                 cur.execute("INSERT OR IGNORE INTO comm_category(code, description) VALUES(?, ?)", (normalize_cccc(code), normalize_upper(desc)))
-            self.conn.commit()
+            self._commit()
 
             cur.execute("SELECT id, code FROM comm_category")
             comm_cat_map = {r["code"]: int(r["id"]) for r in cur.fetchall()}
@@ -948,12 +1972,12 @@ class Database:
                         "INSERT OR IGNORE INTO comm_subcategory(category_id, code, description) VALUES(?, ?, ?)",
                         (cid, normalize_ssss(code), normalize_upper(desc)),
                     )
-            self.conn.commit()
+            self._commit()
 
         if self.has_commerciali and SEED_SUPPLIERS_DEFAULTS:
             for code, desc in DEFAULT_SUPPLIERS:
                 cur.execute("INSERT OR IGNORE INTO supplier(code, description) VALUES(?, ?)", (normalize_upper(code), normalize_upper(desc)))
-            self.conn.commit()
+            self._commit()
 
 
         if self.has_materiali:
@@ -1001,7 +2025,7 @@ class Database:
                     "INSERT OR IGNORE INTO semi_state(code, description) VALUES(?, ?)",
                     (normalize_upper(code), normalize_upper(desc)),
                 )
-            self.conn.commit()
+            self._commit()
             self._seed_material_taxonomy_from_materials()
             self.ensure_default_material_properties_all()
 
@@ -1012,7 +2036,7 @@ class Database:
         families = [normalize_upper(str(r["family"])) for r in cur.fetchall()]
         for fam in families:
             cur.execute("INSERT OR IGNORE INTO material_family(description) VALUES(?)", (fam,))
-        self.conn.commit()
+        self._commit()
 
         cur.execute("SELECT id, description FROM material_family")
         fam_map = {normalize_upper(str(r["description"])): int(r["id"]) for r in cur.fetchall()}
@@ -1033,7 +2057,7 @@ class Database:
                     "INSERT OR IGNORE INTO material_subfamily(family_id, description) VALUES(?, ?)",
                     (fid, sub),
                 )
-        self.conn.commit()
+        self._commit()
 
     def _backfill_semi_dimensions_from_legacy_field(self) -> int:
         """
@@ -1068,7 +2092,7 @@ class Database:
             )
             touched += 1
         if touched:
-            self.conn.commit()
+            self._commit()
         return touched
 
     def _normalize_semi_dimension_preferred_flags(self) -> int:
@@ -1110,7 +2134,7 @@ class Database:
             )
             touched += cur.rowcount
         if touched:
-            self.conn.commit()
+            self._commit()
         return touched
 
     def _ensure_manual_v1000_entry(self) -> None:
@@ -1130,7 +2154,7 @@ class Database:
             ),
         )
         if cur.rowcount > 0:
-            self.conn.commit()
+            self._commit()
 
     def _ensure_manual_v1001_entry(self) -> None:
         """Registra upgrade lock per area e WAL."""
@@ -1149,7 +2173,7 @@ class Database:
             ),
         )
         if cur.rowcount > 0:
-            self.conn.commit()
+            self._commit()
 
     def _ensure_manual_v1002_entry(self) -> None:
         """Registra upgrade UI: blocco scritture fuori area editor."""
@@ -1168,7 +2192,7 @@ class Database:
             ),
         )
         if cur.rowcount > 0:
-            self.conn.commit()
+            self._commit()
 
     def _ensure_manual_v1003_entry(self) -> None:
         """Registra upgrade UI: nasconde tab fuori area editor."""
@@ -1187,7 +2211,7 @@ class Database:
             ),
         )
         if cur.rowcount > 0:
-            self.conn.commit()
+            self._commit()
 
     def _ensure_manual_v1004_entry(self) -> None:
         """Registra upgrade: split fisico database in 3 file area-specific."""
@@ -1206,7 +2230,7 @@ class Database:
             ),
         )
         if cur.rowcount > 0:
-            self.conn.commit()
+            self._commit()
 
     def _ensure_manual_v1005_entry(self) -> None:
         """Registra upgrade: tooling scripts su DB split + comando re-sync."""
@@ -1225,7 +2249,7 @@ class Database:
             ),
         )
         if cur.rowcount > 0:
-            self.conn.commit()
+            self._commit()
 
     def _ensure_manual_v1006_entry(self) -> None:
         """Registra upgrade UI: logout sessione con nuovo login ruolo."""
@@ -1244,7 +2268,7 @@ class Database:
             ),
         )
         if cur.rowcount > 0:
-            self.conn.commit()
+            self._commit()
 
     def _ensure_default_material_properties_with_cursor(self, cur: sqlite3.Cursor, material_id: int) -> int:
         """Insert template property rows and normalize common legacy aliases."""
@@ -1363,7 +2387,7 @@ class Database:
     def ensure_default_material_properties(self, material_id: int) -> int:
         cur = self.conn.cursor()
         touched = self._ensure_default_material_properties_with_cursor(cur, material_id)
-        self.conn.commit()
+        self._commit()
         return touched
 
     def ensure_default_material_properties_all(self) -> int:
@@ -1373,7 +2397,7 @@ class Database:
         touched = 0
         for r in rows:
             touched += self._ensure_default_material_properties_with_cursor(cur, int(r["id"]))
-        self.conn.commit()
+        self._commit()
         return touched
 
     # -------- Normati fetch --------
@@ -1403,12 +2427,13 @@ class Database:
         return cur.fetchall()
 
     def get_next_seq(self, category_id: int, subcategory_id: int) -> int:
-        cur = self.conn.cursor()
-        cur.execute(
-            "SELECT COALESCE(MAX(seq), -1) + 1 AS next_seq FROM item WHERE category_id=? AND subcategory_id=?",
-            (int(category_id), int(subcategory_id)),
-        )
-        return int(cur.fetchone()["next_seq"])
+        """Anteprima del prossimo progressivo: per assegnarlo usare `reserve_item_seqs`."""
+        return self._peek_seq("item", category_id, subcategory_id)
+
+    def reserve_item_seqs(
+        self, category_id: int, subcategory_id: int, count: int = 1, fill_gaps: bool = False
+    ) -> List[int]:
+        return self._reserve_seqs("item", category_id, subcategory_id, count, fill_gaps)
 
     @staticmethod
     def _parse_search_tokens(q: str) -> List[Tuple[str, bool]]:
@@ -1437,15 +2462,62 @@ class Database:
             or re.fullmatch(r"(?:KM|GUK)\d+", t)
         )
 
-    @staticmethod
-    def _normalized_search_expr(field_sql: str) -> str:
+    @staticmethod
+    def _normalized_search_expr(field_sql: str) -> str:
+        """
+        Normalizza separatori in spazio per permettere match a parola intera.
+        """
+        expr = f"UPPER(COALESCE({field_sql},''))"
+        for ch in SEARCH_SEPARATORS:
+            expr = f"REPLACE({expr}, '{ch}', ' ')"
+        return f"(' ' || {expr} || ' ')"
+
+    @staticmethod
+    def _compact_code_expr(field_sql: str) -> str:
+        """
+        Chiave compatta di un codice (maiuscolo, senza separatori/spazi): stessa
+        espressione dell'indice idx_comm_item_sup_code_key, deve restare identica.
+        """
+        expr = f"UPPER(COALESCE({field_sql},''))"
+        for ch in SEARCH_SEPARATORS + (" ",):
+            expr = f"REPLACE({expr}, '{ch}', '')"
+        return expr
+
+    @staticmethod
+    def _compact_code(value: str) -> str:
+        out = normalize_upper(value or "")
+        for ch in SEARCH_SEPARATORS + (" ",):
+            out = out.replace(ch, "")
+        return out
+
+    def _use_exact_word(self, token: str, quoted: bool) -> bool:
+        # Regola 3: token quoted (senza spazi) => match esatto parola.
+        # Regola 1: token dimensionale => match esatto parola.
+        return (quoted and " " not in token) or self._is_dimension_like_token(token)
+
+    def _split_fts_tokens(
+        self,
+        tokens: List[Tuple[str, bool]],
+        fields: List[str],
+    ) -> Tuple[List[str], List[Tuple[str, bool]]]:
         """
-        Normalizza separatori in spazio per permettere match a parola intera.
+        Divide i token tra quelli risolvibili sull'indice FTS5 trigram e quelli
+        che restano sul percorso LIKE (substring con meno di 3 caratteri).
+        Ritorna (termini MATCH, token residui).
         """
-        expr = f"UPPER(COALESCE({field_sql},''))"
-        for ch in ["/", "-", ",", ";", ".", "(", ")", "[", "]", "{", "}", "\"", ":", "_"]:
-            expr = f"REPLACE({expr}, '{ch}', ' ')"
-        return f"(' ' || {expr} || ' ')"
+        terms: List[str] = []
+        rest: List[Tuple[str, bool]] = []
+        cols = "{" + " ".join(fields) + "}"
+        for tok, quoted in tokens:
+            phrase_tok = tok.replace('"', '""')
+            if self._use_exact_word(tok, quoted):
+                # Parola intera: frase " TOKEN " sul testo normalizzato.
+                terms.append(f'norm : " {phrase_tok} "')
+            elif len(tok) >= 3:
+                terms.append(f'{cols} : "{phrase_tok}"')
+            else:
+                rest.append((tok, quoted))
+        return terms, rest
 
     def _append_token_where(
         self,
@@ -1459,10 +2531,7 @@ class Database:
         if not tok:
             return
 
-        has_space = " " in tok
-        # Regola 3: token quoted (senza spazi) => match esatto parola.
-        # Regola 1: token dimensionale => match esatto parola.
-        use_exact_word = (quoted and not has_space) or self._is_dimension_like_token(tok)
+        use_exact_word = self._use_exact_word(tok, quoted)
         esc = self._escape_like(tok)
 
         parts: List[str] = []
@@ -1476,15 +2545,261 @@ class Database:
                 params.append(f"%{esc}%")
         where.append("(" + " OR ".join(parts) + ")")
 
+    def _run_search(self, index_table: Optional[str], tokens: List[Tuple[str, bool]], build, run):
+        """
+        Esegue `run(sql, params)` sulla query costruita da `build(use_fts)`:
+        prima sull'indice FTS (se presente), con fallback sul percorso LIKE.
+        """
+        if index_table and tokens and self._has_search_index(index_table):
+            try:
+                return run(*build(True))
+            except sqlite3.OperationalError:
+                # Query FTS non valida o indice non leggibile: fallback LIKE.
+                pass
+        return run(*build(False))
+
+    def _fetch_search_rows(
+        self,
+        sql: str,
+        params: List[Any],
+        pref_col: str = "preferred",
+        limit: Optional[int] = None,
+        after: Optional[Tuple[Any, ...]] = None,
+        order: Optional[Tuple[str, bool]] = None,
+    ):
+        """
+        Ordine comune delle ricerche: preferiti, ultimi modificati, id.
+        `after` = chiave (pref, updated_at, id) dell'ultima riga gia' letta (keyset).
+        Con `order` = (colonna, decrescente) l'ordine e' colonna + id e `after` = (valore, id).
+        """
+        params = list(params)
+        sql = f"SELECT * FROM ({sql}) AS res"
+        if order is not None:
+            col, descending = order
+            key = f"COALESCE({col}, '') COLLATE NOCASE"
+            if after is not None:
+                sql += f" WHERE ({key}, id) {'<' if descending else '>'} (?, ?)"
+                params.extend(after)
+            direction = "DESC" if descending else "ASC"
+            sql += f" ORDER BY {key} {direction}, id {direction}"
+        else:
+            if after is not None:
+                sql += f" WHERE ({pref_col}, updated_at, id) < (?, ?, ?)"
+                params.extend(after)
+            sql += f" ORDER BY {pref_col} DESC, updated_at DESC, id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        return self.conn.execute(sql, tuple(params)).fetchall()
+
+    def _count_search_rows(self, sql: str, params: List[Any], cap: int) -> Tuple[int, bool]:
+        """Conteggio limitato a `cap` righe: ritorna (totale, troncato)."""
+        cur = self.conn.execute(f"SELECT COUNT(*) AS n FROM ({sql} LIMIT ?)", tuple(params) + (int(cap) + 1,))
+        n = int(cur.fetchone()["n"])
+        return min(n, int(cap)), n > int(cap)
+
+    @staticmethod
+    def _encode_search_cursor(row: sqlite3.Row, pref_col: str, order: Optional[Tuple[str, bool]] = None) -> str:
+        if order is not None:
+            value = row[order[0]]
+            key = ["" if value is None else value, int(row["id"])]
+        else:
+            key = [int(row[pref_col] or 0), row["updated_at"], int(row["id"])]
+        return base64.urlsafe_b64encode(json.dumps(key).encode("utf-8")).decode("ascii")
+
+    @staticmethod
+    def _decode_search_cursor(cursor: Optional[str], order: Optional[Tuple[str, bool]] = None) -> Optional[Tuple[Any, ...]]:
+        if not cursor:
+            return None
+        try:
+            key = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8"))
+            if order is not None:
+                value, item_id = key
+                return value, int(item_id)
+            pref, updated_at, item_id = key
+            return int(pref), str(updated_at), int(item_id)
+        except Exception as exc:
+            raise ValueError("Cursore di ricerca non valido.") from exc
+
+    @staticmethod
+    def _search_order(order_by: Optional[str], descending: bool, columns: Sequence[str]) -> Optional[Tuple[str, bool]]:
+        """(colonna, decrescente) per `_search_page`; None = ordine predefinito delle ricerche."""
+        if not order_by:
+            return None
+        if order_by not in columns:
+            raise ValueError(f"Colonna di ordinamento non valida: {order_by}")
+        return order_by, bool(descending)
+
+    def _search_page(
+        self,
+        index_table: Optional[str],
+        tokens: List[Tuple[str, bool]],
+        build,
+        pref_col: str,
+        page_size: Optional[int],
+        cursor: Optional[str],
+        order: Optional[Tuple[str, bool]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Pagina di risultati (keyset). Il totale stimato viene calcolato solo
+        sulla prima pagina (cursor vuoto), limitato a SEARCH_COUNT_CAP.
+        `order` ordina sull'intero risultato (non solo sulle righe gia' lette).
+        """
+        after = self._decode_search_cursor(cursor, order)
+        limit = max(1, int(page_size or SEARCH_PAGE_SIZE))
+        rows = self._run_search(
+            index_table,
+            tokens,
+            build,
+            lambda sql, params: self._fetch_search_rows(sql, params, pref_col, limit + 1, after, order),
+        )
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        total: Optional[int] = None
+        total_capped = False
+        if after is None:
+            if has_more:
+                total, total_capped = self._run_search(
+                    index_table,
+                    tokens,
+                    build,
+                    lambda sql, params: self._count_search_rows(sql, params, SEARCH_COUNT_CAP),
+                )
+            else:
+                total = len(rows)
+        return {
+            "rows": rows,
+            "next_cursor": self._encode_search_cursor(rows[-1], pref_col, order) if has_more and rows else None,
+            "total": total,
+            "total_capped": total_capped,
+        }
+
+    def _search_has_id(self, index_table: Optional[str], tokens: List[Tuple[str, bool]], build, item_id: int) -> bool:
+        """True se l'articolo `item_id` e' tra i risultati della ricerca costruita da `build`."""
+        return self._run_search(
+            index_table,
+            tokens,
+            build,
+            lambda sql, params: self.conn.execute(
+                f"SELECT 1 FROM ({sql}) AS res WHERE id=? LIMIT 1", tuple(params) + (int(item_id),)
+            ).fetchone()
+            is not None,
+        )
+
     def search_items(
         self,
         q: str = "",
         category_id: Optional[int] = None,
         subcategory_id: Optional[int] = None,
         only_preferred: bool = False,
+        attrs: Optional[Dict[str, Any]] = None,
     ):
-        q = (q or "").strip()
-        cur = self.conn.cursor()
+        """
+        `attrs`: filtri strutturati su item_attr, es. {"diameter": 8, "length": (16, 40), "prop_class": "8.8"};
+        gli stessi filtri si possono scrivere nella query (D=8 L=16..40 CL=8.8).
+        """
+        tokens, filters = self._split_item_filters(q, attrs)
+        return self._run_search(
+            "item_search",
+            tokens,
+            lambda use_fts: self._search_items_sql(tokens, category_id, subcategory_id, only_preferred, use_fts, filters),
+            self._fetch_search_rows,
+        )
+
+    def search_items_page(
+        self,
+        q: str = "",
+        category_id: Optional[int] = None,
+        subcategory_id: Optional[int] = None,
+        only_preferred: bool = False,
+        page_size: int = SEARCH_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        attrs: Optional[Dict[str, Any]] = None,
+        order_by: Optional[str] = None,
+        descending: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Come `search_items`, ma a pagine: {rows, next_cursor, total, total_capped}.
+        `order_by` (una di ITEM_SORT_COLUMNS) sostituisce l'ordine preferiti/aggiornati.
+        """
+        tokens, filters = self._split_item_filters(q, attrs)
+        return self._search_page(
+            "item_search",
+            tokens,
+            lambda use_fts: self._search_items_sql(tokens, category_id, subcategory_id, only_preferred, use_fts, filters),
+            "preferred",
+            page_size,
+            cursor,
+            self._search_order(order_by, descending, ITEM_SORT_COLUMNS),
+        )
+
+    def item_matches_search(
+        self,
+        item_id: int,
+        q: str = "",
+        category_id: Optional[int] = None,
+        subcategory_id: Optional[int] = None,
+        only_preferred: bool = False,
+        attrs: Optional[Dict[str, Any]] = None,
+    ) -> bool:
+        """Stessi criteri di `search_items`, verificati sul solo articolo (aggiornamento di una riga in elenco)."""
+        tokens, filters = self._split_item_filters(q, attrs)
+        return self._search_has_id(
+            "item_search",
+            tokens,
+            lambda use_fts: self._search_items_sql(tokens, category_id, subcategory_id, only_preferred, use_fts, filters),
+            item_id,
+        )
+
+    def _split_item_filters(
+        self, q: str, attrs: Optional[Dict[str, Any]]
+    ) -> Tuple[List[Tuple[str, bool]], Dict[str, Any]]:
+        tokens, filters = item_attrs.split_filter_tokens(self._parse_search_tokens((q or "").strip()))
+        filters.update({k: v for k, v in (attrs or {}).items() if v not in (None, "")})
+        return tokens, filters
+
+    @staticmethod
+    def _item_attr_where(filters: Dict[str, Any]) -> Tuple[Optional[str], List[Any]]:
+        """
+        Filtri strutturati -> sottoquery su item_attr: uguaglianze e intervalli
+        risolti sugli indici (diameter, length), (prop_class, diameter, length)...
+        """
+        clauses: List[str] = []
+        params: List[Any] = []
+        for col in item_attrs.NUMERIC_FILTERS:
+            value = filters.get(col)
+            if value is None:
+                continue
+            low, high = value if isinstance(value, (tuple, list)) else (value, value)
+            if low is not None:
+                clauses.append(f"a.{col}>=?")
+                params.append(float(low))
+            if high is not None:
+                clauses.append(f"a.{col}<=?")
+                params.append(float(high))
+        if filters.get("prop_class"):
+            clauses.append("a.prop_class=?")
+            params.append(normalize_upper(str(filters["prop_class"])).strip().replace(",", "."))
+        if filters.get("finish"):
+            clauses.append("a.finish LIKE ?")
+            params.append(f"%{normalize_upper(str(filters['finish'])).strip()}%")
+        if filters.get("standard"):
+            # Norme multiple unite con ' / ': match sulla sigla intera.
+            clauses.append("(' / ' || a.standard || ' / ') LIKE ?")
+            params.append(f"% / {item_attrs.normalize_standard(str(filters['standard']))} / %")
+        if not clauses:
+            return None, []
+        return "i.id IN (SELECT a.item_id FROM item_attr a WHERE " + " AND ".join(clauses) + ")", params
+
+    def _search_items_sql(
+        self,
+        tokens: List[Tuple[str, bool]],
+        category_id: Optional[int],
+        subcategory_id: Optional[int],
+        only_preferred: bool,
+        use_fts: bool,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[str, List[Any]]:
         params: List[Any] = []
         where: List[str] = []
         sql = """
@@ -1495,8 +2810,14 @@ class Database:
             JOIN category c ON c.id=i.category_id
             JOIN subcategory sc ON sc.id=i.subcategory_id
         """
-        tokens = self._parse_search_tokens(q)
-        for tok, quoted in tokens:
+        like_tokens = tokens
+        if use_fts:
+            terms, like_tokens = self._split_fts_tokens(tokens, ["code", "description", "cat_code", "sub_code"])
+            if terms:
+                # Regola 2: token in AND anche sull'indice.
+                where.append("i.id IN (SELECT rowid FROM item_search WHERE item_search MATCH ?)")
+                params.append(" AND ".join(terms))
+        for tok, quoted in like_tokens:
             # Regola 2: token in AND (ogni token aggiunge una clausola).
             self._append_token_where(
                 fields_sql=["i.code", "i.description", "c.code", "sc.code"],
@@ -1513,11 +2834,13 @@ class Database:
             params.append(int(subcategory_id))
         if only_preferred:
             where.append("COALESCE(i.preferred, 0)=1")
+        attr_where, attr_params = self._item_attr_where(filters or {})
+        if attr_where:
+            where.append(attr_where)
+            params.extend(attr_params)
         if where:
             sql += " WHERE " + " AND ".join(where)
-        sql += " ORDER BY COALESCE(i.preferred, 0) DESC, i.updated_at DESC"
-        cur.execute(sql, tuple(params))
-        return cur.fetchall()
+        return sql, params
 
     def read_item(self, item_id: int):
         cur = self.conn.cursor()
@@ -1547,17 +2870,17 @@ class Database:
             raise ValueError("CODICE categoria normati non valido: servono 3 numeri.")
         cur = self.conn.cursor()
         cur.execute("INSERT INTO category(code, description) VALUES(?, ?)", (code_n, normalize_upper(description)))
-        self.conn.commit()
+        self._commit()
 
     def update_category(self, category_id: int, description: str) -> None:
         cur = self.conn.cursor()
         cur.execute("UPDATE category SET description=? WHERE id=?", (normalize_upper(description), int(category_id)))
-        self.conn.commit()
+        self._commit()
 
     def delete_category(self, category_id: int) -> None:
         cur = self.conn.cursor()
         cur.execute("DELETE FROM category WHERE id=?", (int(category_id),))
-        self.conn.commit()
+        self._commit()
 
     def create_standard(self, category_id: int, code: str, description: str) -> None:
         cur = self.conn.cursor()
@@ -1565,17 +2888,17 @@ class Database:
             "INSERT INTO standard(category_id, code, description) VALUES(?, ?, ?)",
             (int(category_id), normalize_upper(code), normalize_upper(description)),
         )
-        self.conn.commit()
+        self._commit()
 
     def update_standard(self, standard_id: int, description: str) -> None:
         cur = self.conn.cursor()
         cur.execute("UPDATE standard SET description=? WHERE id=?", (normalize_upper(description), int(standard_id)))
-        self.conn.commit()
+        self._commit()
 
     def delete_standard(self, standard_id: int) -> None:
         cur = self.conn.cursor()
         cur.execute("DELETE FROM standard WHERE id=?", (int(standard_id),))
-        self.conn.commit()
+        self._commit()
 
     def create_subcategory(self, category_id: int, code: str, description: str, standard_id: Optional[int], desc_template: str) -> None:
         code_n = normalize_gggg_normati(code)
@@ -1586,7 +2909,7 @@ class Database:
             "INSERT INTO subcategory(category_id, code, description, standard_id, desc_template) VALUES(?, ?, ?, ?, ?)",
             (int(category_id), code_n, normalize_upper(description), int(standard_id) if standard_id else None, normalize_upper(desc_template)),
         )
-        self.conn.commit()
+        self._commit()
 
     def update_subcategory(self, subcategory_id: int, description: str, standard_id: Optional[int], desc_template: str) -> None:
         cur = self.conn.cursor()
@@ -1594,12 +2917,12 @@ class Database:
             "UPDATE subcategory SET description=?, standard_id=?, desc_template=? WHERE id=?",
             (normalize_upper(description), int(standard_id) if standard_id else None, normalize_upper(desc_template), int(subcategory_id)),
         )
-        self.conn.commit()
+        self._commit()
 
     def delete_subcategory(self, subcategory_id: int) -> None:
         cur = self.conn.cursor()
         cur.execute("DELETE FROM subcategory WHERE id=?", (int(subcategory_id),))
-        self.conn.commit()
+        self._commit()
 
     def create_item(self, payload: Dict[str, Any]) -> int:
         cur = self.conn.cursor()
@@ -1622,8 +2945,10 @@ class Database:
                 now_str(),
             ),
         )
-        self.conn.commit()
-        return int(cur.lastrowid)
+        item_id = int(cur.lastrowid)
+        self.refresh_item_attributes(item_id=item_id, only_missing=False)
+        self._commit()
+        return item_id
 
     def update_item(self, item_id: int, payload: Dict[str, Any]) -> None:
         cur = self.conn.cursor()
@@ -1645,12 +2970,48 @@ class Database:
                 int(item_id),
             ),
         )
-        self.conn.commit()
+        self.refresh_item_attributes(item_id=int(item_id), only_missing=False)
+        self._commit()
 
     def delete_item(self, item_id: int) -> None:
         cur = self.conn.cursor()
         cur.execute("DELETE FROM item WHERE id=?", (int(item_id),))
-        self.conn.commit()
+        self._commit()
+
+    def refresh_item_attributes(self, item_id: Optional[int] = None, only_missing: bool = True) -> int:
+        """
+        Interpreta le descrizioni articolo negli attributi di item_attr.
+        Con `only_missing` solo gli articoli non ancora interpretati (es. inseriti dai tool di patch).
+        """
+        where = []
+        params: List[Any] = []
+        if item_id is not None:
+            where.append("i.id=?")
+            params.append(int(item_id))
+        if only_missing:
+            where.append("NOT EXISTS (SELECT 1 FROM item_attr a WHERE a.item_id=i.id)")
+        cur = self.conn.cursor()
+        if not where:
+            # Ricalcolo completo: via anche le righe rimaste da articoli non piu' presenti.
+            cur.execute("DELETE FROM item_attr")
+        cur.execute(
+            f"SELECT i.id, i.description FROM item i {'WHERE ' + ' AND '.join(where) if where else ''}",
+            params,
+        )
+        rows = [
+            (int(r["id"]), *item_attrs.parse_item_attributes(str(r["description"] or "")))
+            for r in cur.fetchall()
+        ]
+        if rows:
+            cur.executemany(
+                f"""
+                INSERT OR REPLACE INTO item_attr(item_id, {', '.join(item_attrs.ATTR_COLUMNS)})
+                VALUES({', '.join('?' * (len(item_attrs.ATTR_COLUMNS) + 1))})
+                """,
+                rows,
+            )
+            self._commit()
+        return len(rows)
 
     # -------- Commerciali fetch --------
     def fetch_comm_categories(self):
@@ -1669,12 +3030,57 @@ class Database:
         return cur.fetchall()
 
     def get_next_comm_seq(self, category_id: int, subcategory_id: int) -> int:
-        cur = self.conn.cursor()
-        cur.execute(
-            "SELECT COALESCE(MAX(seq), -1) + 1 AS next_seq FROM comm_item WHERE category_id=? AND subcategory_id=?",
-            (int(category_id), int(subcategory_id)),
+        """Anteprima del prossimo progressivo: per assegnarlo usare `reserve_comm_seqs`."""
+        return self._peek_seq("comm_item", category_id, subcategory_id)
+
+    def reserve_comm_seqs(
+        self, category_id: int, subcategory_id: int, count: int = 1, fill_gaps: bool = False
+    ) -> List[int]:
+        return self._reserve_seqs("comm_item", category_id, subcategory_id, count, fill_gaps)
+
+    def _comm_supplier_code_key(
+        self,
+        tokens: List[Tuple[str, bool]],
+        category_id: Optional[int],
+        subcategory_id: Optional[int],
+        supplier_id: Optional[int],
+        only_preferred: bool,
+    ) -> Optional[str]:
+        """
+        Un solo token che sembra un codice fornitore (contiene cifre) e trova
+        corrispondenze esatte sulla chiave compatta indicizzata: chiave da usare
+        per mettere in testa quei risultati (vedi `_boost_comm_supplier_code`).
+        """
+        if len(tokens) != 1:
+            return None
+        key = self._compact_code(tokens[0][0])
+        if len(key) < 4 or not any(ch.isdigit() for ch in key):
+            return None
+        sql, params = self._search_comm_items_sql(
+            [], category_id, subcategory_id, supplier_id, only_preferred, supplier_code_key=key
         )
-        return int(cur.fetchone()["next_seq"])
+        hit = self.conn.execute(f"SELECT 1 FROM ({sql}) LIMIT 1", tuple(params)).fetchone()
+        return key if hit is not None else None
+
+    def _boost_comm_supplier_code(self, key: str, filters: Tuple[Any, ...], build):
+        """
+        Avvolge `build(use_fts)`: le corrispondenze esatte sul codice fornitore
+        vengono prima (search_rank = 2 + preferred), poi i risultati normali
+        senza duplicati (search_rank = preferred). Nessun risultato viene perso.
+        """
+        exact_sql, exact_params = self._search_comm_items_sql([], *filters, supplier_code_key=key)
+
+        def boosted(use_fts: bool) -> Tuple[str, List[Any]]:
+            sql, params = build(use_fts)
+            combined = f"""
+                SELECT e.*, 2 + e.preferred AS search_rank FROM ({exact_sql}) AS e
+                UNION ALL
+                SELECT r.*, r.preferred AS search_rank FROM ({sql}) AS r
+                WHERE r.id NOT IN (SELECT id FROM ({exact_sql}))
+            """
+            return combined, list(exact_params) + list(params) + list(exact_params)
+
+        return boosted
 
     def search_comm_items(
         self,
@@ -1684,8 +3090,65 @@ class Database:
         supplier_id: Optional[int] = None,
         only_preferred: bool = False,
     ):
-        q = (q or "").strip()
-        cur = self.conn.cursor()
+        tokens = self._parse_search_tokens((q or "").strip())
+        build, pref_col = self._comm_search_build(tokens, (category_id, subcategory_id, supplier_id, only_preferred))
+        return self._run_search(
+            "comm_item_search",
+            tokens,
+            build,
+            lambda sql, params: self._fetch_search_rows(sql, params, pref_col),
+        )
+
+    def search_comm_items_page(
+        self,
+        q: str = "",
+        category_id: Optional[int] = None,
+        subcategory_id: Optional[int] = None,
+        supplier_id: Optional[int] = None,
+        only_preferred: bool = False,
+        page_size: int = SEARCH_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        order_by: Optional[str] = None,
+        descending: bool = False,
+    ) -> Dict[str, Any]:
+        """Come `search_comm_items`, ma a pagine; `order_by` come in `search_items_page`."""
+        tokens = self._parse_search_tokens((q or "").strip())
+        build, pref_col = self._comm_search_build(tokens, (category_id, subcategory_id, supplier_id, only_preferred))
+        order = self._search_order(order_by, descending, ITEM_SORT_COLUMNS)
+        return self._search_page("comm_item_search", tokens, build, pref_col, page_size, cursor, order)
+
+    def comm_item_matches_search(
+        self,
+        item_id: int,
+        q: str = "",
+        category_id: Optional[int] = None,
+        subcategory_id: Optional[int] = None,
+        supplier_id: Optional[int] = None,
+        only_preferred: bool = False,
+    ) -> bool:
+        """Stessi criteri di `search_comm_items`, verificati sul solo articolo (aggiornamento di una riga in elenco)."""
+        tokens = self._parse_search_tokens((q or "").strip())
+        build, _pref_col = self._comm_search_build(tokens, (category_id, subcategory_id, supplier_id, only_preferred))
+        return self._search_has_id("comm_item_search", tokens, build, item_id)
+
+    def _comm_search_build(self, tokens: List[Tuple[str, bool]], filters: Tuple[Any, ...]):
+        """(build, colonna di ordinamento) della ricerca commerciali, con il rilancio sul codice fornitore."""
+        build = lambda use_fts: self._search_comm_items_sql(tokens, *filters, use_fts=use_fts)
+        key = self._comm_supplier_code_key(tokens, *filters)
+        if key:
+            return self._boost_comm_supplier_code(key, filters, build), "search_rank"
+        return build, "preferred"
+
+    def _search_comm_items_sql(
+        self,
+        tokens: List[Tuple[str, bool]],
+        category_id: Optional[int],
+        subcategory_id: Optional[int],
+        supplier_id: Optional[int],
+        only_preferred: bool,
+        use_fts: bool = False,
+        supplier_code_key: Optional[str] = None,
+    ) -> Tuple[str, List[Any]]:
         params: List[Any] = []
         where: List[str] = []
         sql = """
@@ -1699,8 +3162,20 @@ class Database:
             JOIN comm_subcategory sc ON sc.id=i.subcategory_id
             LEFT JOIN supplier s ON s.id=i.supplier_id
         """
-        tokens = self._parse_search_tokens(q)
-        for tok, quoted in tokens:
+        if supplier_code_key:
+            where.append(f"{self._compact_code_expr('i.supplier_item_code')}=?")
+            params.append(supplier_code_key)
+        like_tokens = tokens
+        if use_fts:
+            terms, like_tokens = self._split_fts_tokens(
+                tokens,
+                ["code", "description", "cat_code", "sub_code", "sup_code", "supplier_item_code", "supplier_item_desc"],
+            )
+            if terms:
+                # Regola 2: token in AND anche sull'indice.
+                where.append("i.id IN (SELECT rowid FROM comm_item_search WHERE comm_item_search MATCH ?)")
+                params.append(" AND ".join(terms))
+        for tok, quoted in like_tokens:
             # Regola 2: token in AND (ogni token aggiunge una clausola).
             self._append_token_where(
                 fields_sql=[
@@ -1730,9 +3205,7 @@ class Database:
             where.append("COALESCE(i.preferred, 0)=1")
         if where:
             sql += " WHERE " + " AND ".join(where)
-        sql += " ORDER BY COALESCE(i.preferred, 0) DESC, i.updated_at DESC"
-        cur.execute(sql, tuple(params))
-        return cur.fetchall()
+        return sql, params
 
     def read_comm_item(self, item_id: int):
         cur = self.conn.cursor()
@@ -1761,17 +3234,17 @@ class Database:
             raise ValueError("CODICE categoria commerciali non valido: servono 4 numeri.")
         cur = self.conn.cursor()
         cur.execute("INSERT INTO comm_category(code, description) VALUES(?, ?)", (code_n, normalize_upper(description)))
-        self.conn.commit()
+        self._commit()
 
     def update_comm_category(self, category_id: int, description: str) -> None:
         cur = self.conn.cursor()
         cur.execute("UPDATE comm_category SET description=? WHERE id=?", (normalize_upper(description), int(category_id)))
-        self.conn.commit()
+        self._commit()
 
     def delete_comm_category(self, category_id: int) -> None:
         cur = self.conn.cursor()
         cur.execute("DELETE FROM comm_category WHERE id=?", (int(category_id),))
-        self.conn.commit()
+        self._commit()
 
     def create_comm_subcategory(self, category_id: int, code: str, description: str) -> None:
         code_n = normalize_ssss(code)
@@ -1782,32 +3255,32 @@ class Database:
             "INSERT INTO comm_subcategory(category_id, code, description) VALUES(?, ?, ?)",
             (int(category_id), code_n, normalize_upper(description)),
         )
-        self.conn.commit()
+        self._commit()
 
     def update_comm_subcategory(self, subcategory_id: int, description: str) -> None:
         cur = self.conn.cursor()
         cur.execute("UPDATE comm_subcategory SET description=? WHERE id=?", (normalize_upper(description), int(subcategory_id)))
-        self.conn.commit()
+        self._commit()
 
     def delete_comm_subcategory(self, subcategory_id: int) -> None:
         cur = self.conn.cursor()
         cur.execute("DELETE FROM comm_subcategory WHERE id=?", (int(subcategory_id),))
-        self.conn.commit()
+        self._commit()
 
     def create_supplier(self, code: str, description: str) -> None:
         cur = self.conn.cursor()
         cur.execute("INSERT INTO supplier(code, description) VALUES(?, ?)", (normalize_upper(code), normalize_upper(description)))
-        self.conn.commit()
+        self._commit()
 
     def update_supplier(self, supplier_id: int, description: str) -> None:
         cur = self.conn.cursor()
         cur.execute("UPDATE supplier SET description=? WHERE id=?", (normalize_upper(description), int(supplier_id)))
-        self.conn.commit()
+        self._commit()
 
     def delete_supplier(self, supplier_id: int) -> None:
         cur = self.conn.cursor()
         cur.execute("DELETE FROM supplier WHERE id=?", (int(supplier_id),))
-        self.conn.commit()
+        self._commit()
 
     def create_comm_item(self, payload: Dict[str, Any]) -> int:
         cur = self.conn.cursor()
@@ -1835,7 +3308,7 @@ class Database:
                 now_str(),
             ),
         )
-        self.conn.commit()
+        self._commit()
         return int(cur.lastrowid)
 
     def update_comm_item(self, item_id: int, payload: Dict[str, Any]) -> None:
@@ -1863,12 +3336,12 @@ class Database:
                 int(item_id),
             ),
         )
-        self.conn.commit()
+        self._commit()
 
     def delete_comm_item(self, item_id: int) -> None:
         cur = self.conn.cursor()
         cur.execute("DELETE FROM comm_item WHERE id=?", (int(item_id),))
-        self.conn.commit()
+        self._commit()
 
 
     # -------- Materiali / Trattamenti / Semilavorati --------
@@ -1891,7 +3364,7 @@ class Database:
     def create_material_family(self, description: str) -> int:
         cur = self.conn.cursor()
         cur.execute("INSERT INTO material_family(description) VALUES(?)", (normalize_upper(description),))
-        self.conn.commit()
+        self._commit()
         return int(cur.lastrowid)
 
     def update_material_family(self, family_id: int, description: str) -> None:
@@ -1904,7 +3377,7 @@ class Database:
         new_desc = normalize_upper(description)
         cur.execute("UPDATE material_family SET description=? WHERE id=?", (new_desc, int(family_id)))
         cur.execute("UPDATE material SET family=? WHERE family=?", (new_desc, old_desc))
-        self.conn.commit()
+        self._commit()
 
     def delete_material_family(self, family_id: int) -> None:
         cur = self.conn.cursor()
@@ -1925,7 +3398,7 @@ class Database:
             raise ValueError("Impossibile eliminare: elimina prima le sottofamiglie.")
 
         cur.execute("DELETE FROM material_family WHERE id=?", (int(family_id),))
-        self.conn.commit()
+        self._commit()
 
     def create_material_subfamily(self, family_id: int, description: str) -> int:
         cur = self.conn.cursor()
@@ -1933,7 +3406,7 @@ class Database:
             "INSERT INTO material_subfamily(family_id, description) VALUES(?, ?)",
             (int(family_id), normalize_upper(description)),
         )
-        self.conn.commit()
+        self._commit()
         return int(cur.lastrowid)
 
     def update_material_subfamily(self, subfamily_id: int, description: str) -> None:
@@ -1958,7 +3431,7 @@ class Database:
             "UPDATE material SET description=? WHERE family=? AND description=?",
             (new_sub, fam_desc, old_sub),
         )
-        self.conn.commit()
+        self._commit()
 
     def delete_material_subfamily(self, subfamily_id: int) -> None:
         cur = self.conn.cursor()
@@ -1984,7 +3457,7 @@ class Database:
         if in_use > 0:
             raise ValueError("Impossibile eliminare: sottofamiglia usata da materiali esistenti.")
         cur.execute("DELETE FROM material_subfamily WHERE id=?", (int(subfamily_id),))
-        self.conn.commit()
+        self._commit()
 
     def ensure_material_taxonomy_entry(self, family: str, subfamily: str) -> None:
         fam = normalize_upper(family)
@@ -2000,7 +3473,7 @@ class Database:
                 "INSERT OR IGNORE INTO material_subfamily(family_id, description) VALUES(?, ?)",
                 (int(row["id"]), sub),
             )
-        self.conn.commit()
+        self._commit()
 
     def search_materials(self, q: str = ""):
         q = (q or "").strip()
@@ -2020,6 +3493,16 @@ class Database:
             cur.execute("SELECT id, code, family, description, updated_at FROM material ORDER BY updated_at DESC")
         return cur.fetchall()
 
+    def material_matches_search(self, material_id: int, q: str = "") -> bool:
+        """Stessi criteri di `search_materials`, verificati sul solo materiale (aggiornamento di una riga in elenco)."""
+        q = (q or "").strip()
+        like = f"%{q}%"
+        row = self.conn.execute(
+            "SELECT 1 FROM material WHERE id=? AND (?='' OR code LIKE ? OR family LIKE ? OR description LIKE ?)",
+            (int(material_id), q, like, like, like),
+        ).fetchone()
+        return row is not None
+
     def read_material(self, material_id: int):
         cur = self.conn.cursor()
         cur.execute("SELECT * FROM material WHERE id=?", (int(material_id),))
@@ -2038,7 +3521,7 @@ class Database:
         )
         new_id = int(cur.lastrowid)
         self._ensure_default_material_properties_with_cursor(cur, new_id)
-        self.conn.commit()
+        self._commit()
         return new_id
 
     def update_material(self, material_id: int, family: str, description: str, standard: str, notes: str) -> None:
@@ -2048,12 +3531,12 @@ class Database:
             "UPDATE material SET family=?, description=?, standard=?, notes=?, updated_at=? WHERE id=?",
             (normalize_upper(family), normalize_upper(description), normalize_upper(standard), normalize_upper(notes), now_str(), int(material_id)),
         )
-        self.conn.commit()
+        self._commit()
 
     def delete_material(self, material_id: int) -> None:
         cur = self.conn.cursor()
         cur.execute("DELETE FROM material WHERE id=?", (int(material_id),))
-        self.conn.commit()
+        self._commit()
 
     def fetch_material_properties(self, material_id: int, prop_group: str):
         cur = self.conn.cursor()
@@ -2068,6 +3551,79 @@ class Database:
         )
         return cur.fetchall()
 
+    def fetch_material_property_groups(self, material_id: int) -> Dict[str, List[sqlite3.Row]]:
+        """Proprieta di un materiale per tutti i gruppi (CHEM/PHYS/MECH) in una sola query."""
+        cur = self.conn.cursor()
+        cur.execute(
+            """
+            SELECT id, prop_group, state_code, name, unit, value, min_value, max_value, notes, sort_order
+            FROM material_property
+            WHERE material_id=?
+            ORDER BY prop_group, state_code, sort_order, name
+            """,
+            (int(material_id),),
+        )
+        out: Dict[str, List[sqlite3.Row]] = {}
+        for r in cur.fetchall():
+            out.setdefault(str(r["prop_group"] or ""), []).append(r)
+        return out
+
+    def fetch_material_property_summaries(
+        self,
+        material_ids: Optional[List[int]] = None,
+        max_items: int = 3,
+    ) -> Dict[int, Dict[str, str]]:
+        """
+        Riepilogo compatto per materiale e gruppo: "NOME=VALORE | NOME | ..." con le
+        prime `max_items` proprieta con nome (stesso ordine di fetch_material_properties)
+        e "..." se il gruppo ne contiene di piu'. Una sola passata con window function
+        (tutti i materiali o solo `material_ids`).
+        """
+        sql = """
+            SELECT material_id, prop_group, name, value, n_total
+            FROM (
+                SELECT material_id, prop_group,
+                       TRIM(COALESCE(name, '')) AS name,
+                       TRIM(COALESCE(value, '')) AS value,
+                       COUNT(*) OVER (PARTITION BY material_id, prop_group) AS n_total,
+                       SUM(CASE WHEN TRIM(COALESCE(name, ''))<>'' THEN 1 ELSE 0 END) OVER (
+                           PARTITION BY material_id, prop_group
+                           ORDER BY state_code, sort_order, name, id
+                           ROWS UNBOUNDED PRECEDING
+                       ) AS rn
+                FROM material_property
+                {where}
+            )
+            WHERE name<>'' AND rn<=?
+            ORDER BY material_id, prop_group, rn
+        """
+        chunks: List[Tuple[str, List[Any]]] = []
+        if material_ids is None:
+            chunks.append(("", []))
+        else:
+            ids = sorted({int(x) for x in material_ids})
+            for i in range(0, len(ids), 500):
+                part = ids[i : i + 500]
+                chunks.append((f"WHERE material_id IN ({','.join('?' * len(part))})", part))
+
+        parts: Dict[Tuple[int, str], List[str]] = {}
+        totals: Dict[Tuple[int, str], int] = {}
+        cur = self.conn.cursor()
+        for where_sql, params in chunks:
+            cur.execute(sql.format(where=where_sql), tuple(params) + (int(max_items),))
+            for r in cur.fetchall():
+                key = (int(r["material_id"]), str(r["prop_group"] or ""))
+                parts.setdefault(key, []).append(r["name"] if not r["value"] else f"{r['name']}={r['value']}")
+                totals[key] = int(r["n_total"])
+
+        out: Dict[int, Dict[str, str]] = {}
+        for (material_id, group), tokens in parts.items():
+            text = " | ".join(tokens)
+            if totals[(material_id, group)] > max_items:
+                text += " | ..."
+            out.setdefault(material_id, {})[group] = text
+        return out
+
     def read_material_property_notes(self, prop_id: int) -> str:
         cur = self.conn.cursor()
         cur.execute("SELECT notes FROM material_property WHERE id=?", (int(prop_id),))
@@ -2106,7 +3662,7 @@ class Database:
                 int(sort_order),
             ),
         )
-        self.conn.commit()
+        self._commit()
         return int(cur.lastrowid)
 
     def update_material_property(
@@ -2138,12 +3694,12 @@ class Database:
                 int(prop_id),
             ),
         )
-        self.conn.commit()
+        self._commit()
 
     def delete_material_property(self, prop_id: int) -> None:
         cur = self.conn.cursor()
         cur.execute("DELETE FROM material_property WHERE id=?", (int(prop_id),))
-        self.conn.commit()
+        self._commit()
 
     # -------- Trattamenti --------
     def fetch_heat_treatments(self):
@@ -2179,7 +3735,7 @@ class Database:
             "INSERT INTO heat_treatment(code, description, characteristics, standard, notes, is_active, created_at, updated_at) VALUES(?, ?, ?, ?, ?, 1, ?, ?)",
             (normalize_upper(code), normalize_upper(description), normalize_upper(characteristics), normalize_upper(standard), normalize_upper(notes), now_str(), now_str()),
         )
-        self.conn.commit()
+        self._commit()
         return int(cur.lastrowid)
 
     def update_heat_treatment(self, tid: int, description: str, characteristics: str, standard: str, notes: str) -> None:
@@ -2188,12 +3744,12 @@ class Database:
             "UPDATE heat_treatment SET description=?, characteristics=?, standard=?, notes=?, updated_at=? WHERE id=?",
             (normalize_upper(description), normalize_upper(characteristics), normalize_upper(standard), normalize_upper(notes), now_str(), int(tid)),
         )
-        self.conn.commit()
+        self._commit()
 
     def delete_heat_treatment(self, tid: int) -> None:
         cur = self.conn.cursor()
         cur.execute("DELETE FROM heat_treatment WHERE id=?", (int(tid),))
-        self.conn.commit()
+        self._commit()
 
     def create_surface_treatment(self, code: Optional[str], description: str, characteristics: str, standard: str, notes: str) -> int:
         code = normalize_upper(code) if (code or "").strip() else self._auto_code("SURF")
@@ -2202,7 +3758,7 @@ class Database:
             "INSERT INTO surface_treatment(code, description, characteristics, standard, notes, is_active, created_at, updated_at) VALUES(?, ?, ?, ?, ?, 1, ?, ?)",
             (normalize_upper(code), normalize_upper(description), normalize_upper(characteristics), normalize_upper(standard), normalize_upper(notes), now_str(), now_str()),
         )
-        self.conn.commit()
+        self._commit()
         return int(cur.lastrowid)
 
     def update_surface_treatment(self, tid: int, description: str, characteristics: str, standard: str, notes: str) -> None:
@@ -2211,12 +3767,12 @@ class Database:
             "UPDATE surface_treatment SET description=?, characteristics=?, standard=?, notes=?, updated_at=? WHERE id=?",
             (normalize_upper(description), normalize_upper(characteristics), normalize_upper(standard), normalize_upper(notes), now_str(), int(tid)),
         )
-        self.conn.commit()
+        self._commit()
 
     def delete_surface_treatment(self, tid: int) -> None:
         cur = self.conn.cursor()
         cur.execute("DELETE FROM surface_treatment WHERE id=?", (int(tid),))
-        self.conn.commit()
+        self._commit()
 
     # -------- Manuale versioni --------
     def fetch_manual_versions(self, q: str = ""):
@@ -2277,7 +3833,7 @@ class Database:
             """,
             (ver, rel, upd, now_str(), now_str()),
         )
-        self.conn.commit()
+        self._commit()
         return int(cur.lastrowid)
 
     def update_manual_version(self, entry_id: int, version: str, release_date: str, updates: str) -> None:
@@ -2299,12 +3855,12 @@ class Database:
             """,
             (ver, rel, upd, now_str(), int(entry_id)),
         )
-        self.conn.commit()
+        self._commit()
 
     def delete_manual_version(self, entry_id: int) -> None:
         cur = self.conn.cursor()
         cur.execute("DELETE FROM manual_version WHERE id=?", (int(entry_id),))
-        self.conn.commit()
+        self._commit()
 
     # -------- Semilavorati --------
     def fetch_semi_types(self):
@@ -2321,39 +3877,64 @@ class Database:
         code = normalize_upper(code) if (code or "").strip() else self._auto_code("TYPE")
         cur = self.conn.cursor()
         cur.execute("INSERT INTO semi_type(code, description) VALUES(?, ?)", (normalize_upper(code), normalize_upper(description)))
-        self.conn.commit()
+        self._commit()
         return int(cur.lastrowid)
 
     def update_semi_type(self, tid: int, description: str) -> None:
         cur = self.conn.cursor()
         cur.execute("UPDATE semi_type SET description=? WHERE id=?", (normalize_upper(description), int(tid)))
-        self.conn.commit()
+        self._commit()
 
     def delete_semi_type(self, tid: int) -> None:
         cur = self.conn.cursor()
         cur.execute("DELETE FROM semi_type WHERE id=?", (int(tid),))
-        self.conn.commit()
+        self._commit()
 
     def create_semi_state(self, code: Optional[str], description: str) -> int:
         code = normalize_upper(code) if (code or "").strip() else self._auto_code("STATE")
         cur = self.conn.cursor()
         cur.execute("INSERT INTO semi_state(code, description) VALUES(?, ?)", (normalize_upper(code), normalize_upper(description)))
-        self.conn.commit()
+        self._commit()
         return int(cur.lastrowid)
 
     def update_semi_state(self, sid: int, description: str) -> None:
         cur = self.conn.cursor()
         cur.execute("UPDATE semi_state SET description=? WHERE id=?", (normalize_upper(description), int(sid)))
-        self.conn.commit()
+        self._commit()
 
     def delete_semi_state(self, sid: int) -> None:
         cur = self.conn.cursor()
         cur.execute("DELETE FROM semi_state WHERE id=?", (int(sid),))
-        self.conn.commit()
+        self._commit()
 
     def search_semi_items(self, q: str = "", only_preferred_dimension: bool = False):
+        return self._fetch_search_rows(
+            *self._search_semi_items_sql(q, only_preferred_dimension),
+            pref_col="has_preferred_dimension",
+        )
+
+    def search_semi_items_page(
+        self,
+        q: str = "",
+        only_preferred_dimension: bool = False,
+        page_size: int = SEARCH_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        order_by: Optional[str] = None,
+        descending: bool = False,
+    ) -> Dict[str, Any]:
+        """Come `search_semi_items`, ma a pagine; `order_by` = una di SEMI_ITEM_SORT_COLUMNS."""
+        return self._search_page(
+            None,
+            [],
+            lambda _use_fts: self._search_semi_items_sql(q, only_preferred_dimension),
+            "has_preferred_dimension",
+            page_size,
+            cursor,
+            self._search_order(order_by, descending, SEMI_ITEM_SORT_COLUMNS),
+        )
+
+    def _search_semi_items_sql(self, q: str, only_preferred_dimension: bool) -> Tuple[str, List[Any]]:
         q = (q or "").strip()
-        cur = self.conn.cursor()
         where: List[str] = []
         params: List[Any] = []
         if q:
@@ -2404,9 +3985,7 @@ class Database:
         """
         if where:
             sql += " WHERE " + " AND ".join(where)
-        sql += " ORDER BY CASE WHEN pd.id IS NULL THEN 0 ELSE 1 END DESC, si.updated_at DESC"
-        cur.execute(sql, tuple(params))
-        return cur.fetchall()
+        return sql, params
 
     def fetch_semis_by_material(self, material_id: int):
         cur = self.conn.cursor()
@@ -2467,11 +4046,19 @@ class Database:
                 now_str(),
             ),
         )
-        self.conn.commit()
+        self._commit()
         return int(cur.lastrowid)
 
     def update_semi_item(self, item_id: int, payload: Dict[str, Any]) -> None:
         cur = self.conn.cursor()
+        # Cambio tipo: le dimensioni vanno reinterpretate (stesso testo, forma diversa).
+        cur.execute(
+            """
+            UPDATE semi_item_dimension SET shape=NULL
+            WHERE semi_item_id=? AND (SELECT type_id FROM semi_item WHERE id=?)<>?
+            """,
+            (int(item_id), int(item_id), int(payload["type_id"])),
+        )
         cur.execute(
             """
             UPDATE semi_item
@@ -2491,12 +4078,13 @@ class Database:
                 int(item_id),
             ),
         )
-        self.conn.commit()
+        self.refresh_semi_dimension_numbers(semi_item_id=int(item_id))
+        self._commit()
 
     def delete_semi_item(self, item_id: int) -> None:
         cur = self.conn.cursor()
         cur.execute("DELETE FROM semi_item WHERE id=?", (int(item_id),))
-        self.conn.commit()
+        self._commit()
 
     def fetch_semi_dimensions(self, semi_item_id: int):
         cur = self.conn.cursor()
@@ -2545,8 +4133,10 @@ class Database:
                 pref_val,
             ),
         )
-        self.conn.commit()
-        return int(cur.lastrowid)
+        dim_id = int(cur.lastrowid)
+        self.refresh_semi_dimension_numbers(semi_item_id=int(semi_item_id))
+        self._commit()
+        return dim_id
 
     def update_semi_dimension(
         self,
@@ -2576,7 +4166,7 @@ class Database:
         cur.execute(
             """
             UPDATE semi_item_dimension
-            SET dimension=?, weight_per_m=?, sort_order=?, preferred=?
+            SET dimension=?, weight_per_m=?, sort_order=?, preferred=?, shape=NULL
             WHERE id=?
             """,
             (
@@ -2587,12 +4177,13 @@ class Database:
                 int(dim_id),
             ),
         )
-        self.conn.commit()
+        self.refresh_semi_dimension_numbers(semi_item_id=semi_item_id)
+        self._commit()
 
     def delete_semi_dimension(self, dim_id: int) -> None:
         cur = self.conn.cursor()
         cur.execute("DELETE FROM semi_item_dimension WHERE id=?", (int(dim_id),))
-        self.conn.commit()
+        self._commit()
 
     def clone_semi_dimensions(self, src_item_id: int, dst_item_id: int) -> int:
         cur = self.conn.cursor()
@@ -2627,228 +4218,316 @@ class Database:
             )
             if cur.rowcount > 0:
                 copied += 1
-        self.conn.commit()
+        self.refresh_semi_dimension_numbers(semi_item_id=int(dst_item_id))
+        self._commit()
         return copied
 
+    _SEMI_DIMENSION_NUMBER_COLUMNS = (
+        ("shape", "TEXT"),
+        ("d1", "REAL"),
+        ("d2", "REAL"),
+        ("d3", "REAL"),
+        ("thickness", "REAL"),
+    )
+
+    def refresh_semi_dimension_numbers(self, semi_item_id: Optional[int] = None, only_missing: bool = True) -> int:
+        """
+        Interpreta le dimensioni in colonne numeriche (shape, d1, d2, d3, thickness).
+        Con `only_missing` solo le righe non ancora interpretate (shape NULL).
+        """
+        where = []
+        params: List[Any] = []
+        if semi_item_id is not None:
+            where.append("d.semi_item_id=?")
+            params.append(int(semi_item_id))
+        if only_missing:
+            where.append("d.shape IS NULL")
+        cur = self.conn.cursor()
+        cur.execute(
+            f"""
+            SELECT d.id, d.dimension, st.description AS type_desc
+            FROM semi_item_dimension d
+            JOIN semi_item si ON si.id=d.semi_item_id
+            JOIN semi_type st ON st.id=si.type_id
+            {"WHERE " + " AND ".join(where) if where else ""}
+            """,
+            params,
+        )
+        updates = [
+            (*semi_weights.dimension_columns(str(r["type_desc"] or ""), str(r["dimension"] or "")), int(r["id"]))
+            for r in cur.fetchall()
+        ]
+        if updates:
+            cur.executemany(
+                "UPDATE semi_item_dimension SET shape=?, d1=?, d2=?, d3=?, thickness=? WHERE id=?",
+                updates,
+            )
+            self._commit()
+        return len(updates)
+
+    _SEMI_BASIC_SHAPES = {"TONDI", "ESAGONI", "PIATTI", "TUBI", "TUBOLARI", "LAMIERE"}
+
+    def _semi_dimension_filters(
+        self,
+        type_desc: Optional[str],
+        shape: Optional[str],
+        material: Optional[str],
+        only_preferred: bool,
+    ) -> Tuple[List[str], List[Any]]:
+        where: List[str] = []
+        params: List[Any] = []
+        type_n = normalize_upper((type_desc or "").strip())
+        shape_n = normalize_upper((shape or "").strip())
+        if not shape_n and type_n in self._SEMI_BASIC_SHAPES:
+            # Per i tipi base la forma coincide col tipo: filtro sull'indice (shape, d1...).
+            shape_n = type_n
+        if shape_n:
+            where.append("d.shape=?")
+            params.append(shape_n)
+        else:
+            # Forma qualsiasi, purche' interpretata: l'indice resta utilizzabile.
+            where.append("d.shape>''")
+        if type_n:
+            where.append("st.description=?")
+            params.append(type_n)
+        if material:
+            like = f"%{material.strip()}%"
+            where.append("(COALESCE(m.description,'') LIKE ? OR COALESCE(m.family,'') LIKE ?)")
+            params.extend([like, like])
+        if only_preferred:
+            where.append("COALESCE(d.preferred, 0)=1")
+        return where, params
+
+    _SEMI_DIMENSION_SELECT = """
+        SELECT d.id AS dim_id, d.semi_item_id, d.dimension, d.weight_per_m,
+               COALESCE(d.preferred, 0) AS preferred,
+               d.shape, d.d1, d.d2, d.d3, d.thickness,
+               st.description AS type_desc, ss.description AS state_desc,
+               COALESCE(m.family || ' - ' || m.description, '') AS mat_label,
+               si.description{extra}
+        FROM semi_item_dimension d
+        JOIN semi_item si ON si.id=d.semi_item_id
+        JOIN semi_type st ON st.id=si.type_id
+        JOIN semi_state ss ON ss.id=si.state_id
+        LEFT JOIN material m ON m.id=si.material_id
+    """
+
+    def search_semi_dimensions_range(
+        self,
+        *,
+        type_desc: Optional[str] = None,
+        shape: Optional[str] = None,
+        d1_min: Optional[float] = None,
+        d1_max: Optional[float] = None,
+        d2_min: Optional[float] = None,
+        d2_max: Optional[float] = None,
+        d3_min: Optional[float] = None,
+        d3_max: Optional[float] = None,
+        thickness_min: Optional[float] = None,
+        thickness_max: Optional[float] = None,
+        material: Optional[str] = None,
+        only_preferred: bool = False,
+        limit: Optional[int] = 500,
+    ):
+        """
+        Dimensioni semilavorati per intervallo numerico (es. TONDI d1 20..30 in C40),
+        dall'indice (shape, d1, d2, d3) invece che dal testo.
+        """
+        where, params = self._semi_dimension_filters(type_desc, shape, material, only_preferred)
+        for col, lo, hi in (
+            ("d1", d1_min, d1_max),
+            ("d2", d2_min, d2_max),
+            ("d3", d3_min, d3_max),
+            ("thickness", thickness_min, thickness_max),
+        ):
+            if lo is not None:
+                where.append(f"d.{col}>=?")
+                params.append(float(lo))
+            if hi is not None:
+                where.append(f"d.{col}<=?")
+                params.append(float(hi))
+        sql = self._SEMI_DIMENSION_SELECT.format(extra="") + " WHERE " + " AND ".join(where)
+        sql += " ORDER BY d.shape, d.d1, d.d2, d.d3, d.id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        cur = self.conn.cursor()
+        cur.execute(sql, params)
+        return cur.fetchall()
+
+    def find_nearest_semi_dimensions(
+        self,
+        d1: float,
+        d2: Optional[float] = None,
+        d3: Optional[float] = None,
+        *,
+        type_desc: Optional[str] = None,
+        shape: Optional[str] = None,
+        material: Optional[str] = None,
+        only_preferred: bool = False,
+        limit: int = 10,
+    ):
+        """
+        Dimensioni disponibili piu' vicine alla misura richiesta (distanza euclidea su d1/d2/d3
+        indicati, colonna `distance`). Cerca in una finestra su d1 che si allarga finche' i
+        primi `limit` risultati sono certi: ogni passo e' una scansione d'indice.
+        """
+        target = [(col, float(v)) for col, v in (("d1", d1), ("d2", d2), ("d3", d3)) if v is not None]
+        where, params = self._semi_dimension_filters(type_desc, shape, material, only_preferred)
+        where.extend(f"d.{col} IS NOT NULL" for col, _ in target)
+        joins = self._SEMI_DIMENSION_SELECT.format(extra="")
+        from_sql = joins[joins.index("FROM") :]
+
+        cur = self.conn.cursor()
+        cur.execute(f"SELECT MIN(d.d1) AS lo, MAX(d.d1) AS hi {from_sql} WHERE {' AND '.join(where)}", params)
+        span = cur.fetchone()
+        if span is None or span["lo"] is None:
+            return []
+        lo, hi = float(span["lo"]), float(span["hi"])
+
+        dist2 = " + ".join(f"(d.{col} - ?) * (d.{col} - ?)" for col, _ in target)
+        dist_params: List[Any] = [v for _, v in target for _ in (0, 1)]
+        sql = (
+            self._SEMI_DIMENSION_SELECT.format(extra=f", ({dist2}) AS dist2")
+            + " WHERE "
+            + " AND ".join(where + ["d.d1 BETWEEN ? AND ?"])
+            + " ORDER BY dist2, d.id LIMIT ?"
+        )
+        t1 = float(d1)
+        window = max(abs(t1) * 0.05, 0.5)
+        while True:
+            cur.execute(sql, dist_params + params + [t1 - window, t1 + window, int(limit)])
+            rows = cur.fetchall()
+            covers_all = t1 - window <= lo and t1 + window >= hi
+            # Fuori finestra |d1 - t1| > window, quindi distanza > window: i primi risultati sono definitivi.
+            if covers_all or (len(rows) >= int(limit) and float(rows[-1]["dist2"]) <= window * window):
+                break
+            window *= 4.0
+        return [dict(r, distance=math.sqrt(max(0.0, float(r["dist2"])))) for r in rows]
+
     @staticmethod
     def _extract_numbers(text: str) -> List[float]:
-        vals: List[float] = []
-        for tok in re.findall(r"\d+(?:[.,]\d+)?", text or ""):
-            try:
-                vals.append(float(tok.replace(",", ".")))
-            except Exception:
-                continue
-        return vals
+        return semi_weights.extract_numbers(text)
 
     @staticmethod
     def _is_dimension_ambiguous(text: str) -> bool:
-        s = normalize_upper(text or "")
-        if not s:
-            return True
-        if re.search(r"\d+\s*-\s*\d+", s):
-            return True
-        if "VARIE" in s:
-            return True
-        return False
+        return semi_weights.is_dimension_ambiguous(text)
 
     @staticmethod
     def _section_area_mm2(type_desc: str, dimension: str) -> Optional[float]:
-        t = normalize_upper(type_desc or "")
-        d = normalize_upper(dimension or "")
-        if Database._is_dimension_ambiguous(d):
-            return None
-        nums = Database._extract_numbers(d)
-        if not nums:
-            return None
-
-        if t == "TONDI":
-            dia = nums[0]
-            if dia <= 0:
-                return None
-            return math.pi * (dia ** 2) / 4.0
-
-        if t == "ESAGONI":
-            ch = nums[0]
-            if ch <= 0:
-                return None
-            return (math.sqrt(3.0) / 2.0) * (ch ** 2)
-
-        if t == "PIATTI":
-            if len(nums) < 2:
-                return None
-            b = nums[0]
-            s = nums[1]
-            if b <= 0 or s <= 0:
-                return None
-            return b * s
-
-        if t == "TUBI":
-            if len(nums) < 2:
-                return None
-            d_ext = nums[0]
-            sp = nums[1]
-            if d_ext <= 0 or sp <= 0:
-                return None
-            d_int = d_ext - 2.0 * sp
-            if d_int <= 0:
-                return None
-            return (math.pi / 4.0) * ((d_ext ** 2) - (d_int ** 2))
-
-        if t == "TUBOLARI":
-            if len(nums) < 3:
-                return None
-            b = nums[0]
-            h = nums[1]
-            sp = nums[2]
-            if b <= 0 or h <= 0 or sp <= 0:
-                return None
-            b_int = b - 2.0 * sp
-            h_int = h - 2.0 * sp
-            if b_int <= 0 or h_int <= 0:
-                return None
-            return (b * h) - (b_int * h_int)
-
-        if t in {
-            "PROFILATI",
-            "PROFILO L",
-            "PROFILO U",
-            "PROFILO T",
-            "PROFILO L TRAFILATO",
-            "PROFILO U TRAFILATO",
-            "PROFILO T TRAFILATO",
-        }:
-            s = d.replace(" ", "")
-            # Angolare: L AxBxS (oppure L AxS con ali uguali)
-            if s.startswith("L"):
-                if len(nums) < 2:
-                    return None
-                if len(nums) == 2:
-                    a = nums[0]
-                    b = nums[0]
-                    sp = nums[1]
-                else:
-                    a = nums[0]
-                    b = nums[1]
-                    sp = nums[2]
-                if a <= 0 or b <= 0 or sp <= 0:
-                    return None
-                if sp >= a or sp >= b:
-                    return None
-                return sp * (a + b - sp)
-
-            # U: U HxBxS (spessore unico) oppure U HxBxTFxTW
-            if s.startswith("U"):
-                if len(nums) < 3:
-                    return None
-                h = nums[0]
-                b = nums[1]
-                if h <= 0 or b <= 0:
-                    return None
-                if len(nums) >= 4:
-                    tf = nums[2]
-                    tw = nums[3]
-                    if tf <= 0 or tw <= 0 or (2.0 * tf) >= h or tw >= b:
-                        return None
-                    return (2.0 * b * tf) + ((h - 2.0 * tf) * tw)
-                sp = nums[2]
-                if sp <= 0 or (2.0 * sp) >= h or sp >= b:
-                    return None
-                return sp * (h + 2.0 * b - 2.0 * sp)
-
-            # T: T BxHxS (spessore unico) oppure T BxHxTFxTW
-            if s.startswith("T"):
-                if len(nums) < 3:
-                    return None
-                b = nums[0]
-                h = nums[1]
-                if b <= 0 or h <= 0:
-                    return None
-                if len(nums) >= 4:
-                    tf = nums[2]
-                    tw = nums[3]
-                    if tf <= 0 or tw <= 0 or tf >= h or tw >= b:
-                        return None
-                    return (b * tf) + ((h - tf) * tw)
-                sp = nums[2]
-                if sp <= 0 or sp >= h or sp >= b:
-                    return None
-                return (b * sp) + ((h - sp) * sp)
-
-            return None
-
-        # TRAVI (IPE/HEA/IPN/UPN...) richiedono tabelle dedicate.
-        return None
+        return semi_weights.section_area_mm2(type_desc, dimension)
 
     @staticmethod
     def _lamiera_thickness_mm(dimension: str) -> Optional[float]:
-        d = normalize_upper(dimension or "")
-        if Database._is_dimension_ambiguous(d):
-            return None
-        nums = Database._extract_numbers(d)
-        if not nums:
-            return None
-        # Convenzione: ultimo valore numerico = spessore (es. SP3, 1000X2000X3, 40X10).
-        sp = float(nums[-1])
-        if sp <= 0:
-            return None
-        return sp
+        return semi_weights.lamiera_thickness_mm(dimension)
 
     def read_material_density_g_cm3(self, material_id: int) -> Optional[float]:
+        return self.read_material_densities_g_cm3([int(material_id)]).get(int(material_id))
+
+    def read_material_densities_g_cm3(self, material_ids: Optional[List[int]] = None) -> Dict[int, float]:
+        """Densita' (g/cm3) per materiale con una sola query: primo valore positivo tra value/min/max."""
+        ids = None if material_ids is None else sorted({int(m) for m in material_ids})
+        rows: List[sqlite3.Row] = []
         cur = self.conn.cursor()
-        cur.execute(
-            """
-            SELECT value, min_value, max_value
+        sql = """
+            SELECT material_id, value, min_value, max_value
             FROM material_property
-            WHERE material_id=? AND name='DENSITA'
-            ORDER BY id
-            """,
-            (int(material_id),),
-        )
-        rows = cur.fetchall()
+            WHERE name='DENSITA'{where}
+            ORDER BY material_id, id
+        """
+        if ids is None:
+            cur.execute(sql.format(where=""))
+            rows = cur.fetchall()
+        else:
+            for i in range(0, len(ids), 500):
+                part = ids[i : i + 500]
+                cur.execute(sql.format(where=f" AND material_id IN ({','.join('?' * len(part))})"), part)
+                rows.extend(cur.fetchall())
+        out: Dict[int, float] = {}
         for r in rows:
+            mat_id = int(r["material_id"])
+            if mat_id in out:
+                continue
             for key in ("value", "min_value", "max_value"):
-                raw = str(r[key] or "").strip()
-                if not raw:
-                    continue
-                vals = self._extract_numbers(raw)
-                for v in vals:
-                    if v > 0:
-                        return float(v)
-        return None
+                vals = [v for v in self._extract_numbers(str(r[key] or "").strip()) if v > 0]
+                if vals:
+                    out[mat_id] = float(vals[0])
+                    break
+        return out
+
+    def calculate_semi_weights(self, pairs: List[Tuple[int, str]]) -> List[Optional[float]]:
+        """
+        Pesi automatici per molte coppie (semi_item_id, dimensione), nello stesso ordine:
+        kg/m (kg/m2 per LAMIERE), None se non calcolabile.
+        """
+        pairs = [(int(item_id), dimension) for item_id, dimension in pairs]
+        item_ids = sorted({item_id for item_id, _ in pairs})
+        info: Dict[int, Tuple[Optional[int], str]] = {}
+        cur = self.conn.cursor()
+        for i in range(0, len(item_ids), 500):
+            part = item_ids[i : i + 500]
+            cur.execute(
+                f"""
+                SELECT si.id, si.material_id, st.description AS type_desc
+                FROM semi_item si
+                JOIN semi_type st ON st.id=si.type_id
+                WHERE si.id IN ({','.join('?' * len(part))})
+                """,
+                part,
+            )
+            for r in cur.fetchall():
+                mat_id = int(r["material_id"]) if r["material_id"] is not None else None
+                info[int(r["id"])] = (mat_id, normalize_upper(str(r["type_desc"] or "")))
+        densities = self.read_material_densities_g_cm3([m for m, _ in info.values() if m is not None])
+        items: List[Tuple[str, Optional[float], str]] = []
+        for item_id, dimension in pairs:
+            mat_id, type_desc = info.get(item_id, (None, ""))
+            items.append((type_desc, densities.get(mat_id) if mat_id is not None else None, dimension))
+        return semi_weights.weights_per_m(items)
 
     def calculate_semi_weight_per_m(self, semi_item_id: int, dimension: str) -> Optional[float]:
+        return self.calculate_semi_weights([(int(semi_item_id), dimension)])[0]
+
+    def calculate_semi_dimension_weights(
+        self,
+        semi_item_id: Optional[int] = None,
+        type_id: Optional[int] = None,
+    ) -> Dict[int, Optional[float]]:
+        """Pesi automatici delle righe dimensionali di un semilavorato o di un tipo (tutte se nessun filtro)."""
+        where = []
+        params: List[Any] = []
+        if semi_item_id is not None:
+            where.append("d.semi_item_id=?")
+            params.append(int(semi_item_id))
+        if type_id is not None:
+            where.append("si.type_id=?")
+            params.append(int(type_id))
         cur = self.conn.cursor()
         cur.execute(
-            """
-            SELECT si.material_id, st.description AS type_desc
-            FROM semi_item si
-            JOIN semi_type st ON st.id=si.type_id
-            WHERE si.id=?
+            f"""
+            SELECT d.id, d.semi_item_id, d.dimension
+            FROM semi_item_dimension d
+            JOIN semi_item si ON si.id=d.semi_item_id
+            {"WHERE " + " AND ".join(where) if where else ""}
+            ORDER BY d.id
             """,
-            (int(semi_item_id),),
+            params,
         )
-        row = cur.fetchone()
-        if row is None:
-            return None
-        mat_id = row["material_id"]
-        if mat_id is None:
-            return None
-
-        density = self.read_material_density_g_cm3(int(mat_id))
-        if density is None or density <= 0:
-            return None
-
-        type_desc = normalize_upper(str(row["type_desc"] or ""))
-        if type_desc == "LAMIERE":
-            sp = self._lamiera_thickness_mm(dimension)
-            if sp is None:
-                return None
-            # Formula lamiera: kg/m^2 = spessore_mm * densita_g/cm^3
-            return sp * density
-
-        area = self._section_area_mm2(type_desc, dimension)
-        if area is None or area <= 0:
-            return None
-
-        # Formula: kg/m = area_mm2 * density_g_cm3 / 1000
-        return (area * density) / 1000.0
+        rows = cur.fetchall()
+        weights = self.calculate_semi_weights([(int(r["semi_item_id"]), str(r["dimension"] or "")) for r in rows])
+        return {int(r["id"]): w for r, w in zip(rows, weights)}
+
+    def update_semi_dimension_weights(self, semi_item_id: Optional[int] = None, type_id: Optional[int] = None) -> int:
+        """Ricalcola e salva i pesi automatici (le righe non calcolabili restano invariate). Ritorna le righe aggiornate."""
+        weights = self.calculate_semi_dimension_weights(semi_item_id=semi_item_id, type_id=type_id)
+        updates = [(f"{w:.3f}", dim_id) for dim_id, w in weights.items() if w is not None]
+        if not updates:
+            return 0
+        cur = self.conn.cursor()
+        cur.executemany(
+            "UPDATE semi_item_dimension SET weight_per_m=? WHERE id=? AND COALESCE(weight_per_m, '')<>?",
+            [(w, dim_id, w) for w, dim_id in updates],
+        )
+        changed = cur.rowcount
+        self._commit()
+        return max(0, int(changed))
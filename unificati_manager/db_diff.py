@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .config import DIFF_FANOUT, DIFF_LEAF_KEYS
+from .db import (
+    COMMERCIALI_TABLES,
+    DB_PROFILE_ALL,
+    DB_PROFILE_COMMERCIALI,
+    DB_PROFILE_MATERIALI,
+    DB_PROFILE_NORMATI,
+    MATERIALI_TABLES,
+    NORMATI_TABLES,
+    Database,
+)
+
+# Confronto tra due DB catalogo con alberi di hash (Merkle) per tabella.
+# Foglia = intervallo di DIFF_LEAF_KEYS chiavi primarie (id // DIFF_LEAF_KEYS), hash
+# delle righe in ordine di chiave; ogni livello superiore raggruppa DIFF_FANOUT nodi.
+# Gli alberi sono dict serializzabili (JSON): due sedi si scambiano solo gli hash,
+# si scende solo nei rami diversi e si leggono solo le righe degli intervalli diversi.
+
+CATALOG_TABLES = NORMATI_TABLES + COMMERCIALI_TABLES + MATERIALI_TABLES
+
+# (tabella, chiave, riga in A o None, riga in B o None)
+RowDiff = Tuple[str, Any, Optional[Dict[str, Any]], Optional[Dict[str, Any]]]
+
+
+def _connect_ro(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(f"{Path(path).resolve().as_uri()}?mode=ro", timeout=30, uri=True)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _table_layout(conn: sqlite3.Connection, table: str) -> Optional[Tuple[str, List[str]]]:
+    """(chiave primaria intera, colonne) oppure None se la tabella manca o non ha chiave singola."""
+    info = conn.execute(f"PRAGMA table_info({table})").fetchall()
+    pk = [str(r[1]) for r in info if int(r[5]) > 0]
+    if len(pk) != 1:
+        return None
+    return pk[0], [str(r[1]) for r in info]
+
+
+def _node_hash(children: Sequence[Tuple[int, str]]) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for key, digest in children:
+        h.update(f"{key}:{digest};".encode("ascii"))
+    return h.hexdigest()
+
+
+def _extend_levels(levels: List[Dict[int, str]], height: int) -> List[Dict[int, str]]:
+    """Aggiunge livelli superiori fino a `height` (gli alberi confrontati devono avere la stessa altezza)."""
+    levels = list(levels)
+    while len(levels) < height:
+        parents: Dict[int, List[Tuple[int, str]]] = {}
+        for key in sorted(levels[-1]):
+            parents.setdefault(key // DIFF_FANOUT, []).append((key, levels[-1][key]))
+        levels.append({key: _node_hash(children) for key, children in parents.items()})
+    return levels
+
+
+def _height_for(max_key: int) -> int:
+    height, span = 1, DIFF_LEAF_KEYS
+    while span <= max(0, max_key):
+        height += 1
+        span *= DIFF_FANOUT
+    return height
+
+
+def table_tree(conn: sqlite3.Connection, table: str, columns: Optional[Sequence[str]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Albero di hash di una tabella: {"pk", "columns", "rows", "max_key", "levels"}
+    (levels[0] = foglie, ultimo livello = radice). Una sola lettura in ordine di chiave.
+    """
+    layout = _table_layout(conn, table)
+    if layout is None:
+        return None
+    pk, all_cols = layout
+    cols = [c for c in (columns or all_cols) if c in all_cols]
+    if pk not in cols:
+        cols.insert(0, pk)
+    leaves: Dict[int, str] = {}
+    current: Optional[int] = None
+    h = None
+    rows = 0
+    max_key = 0
+    cur = conn.execute(f"SELECT {', '.join(cols)} FROM {table} ORDER BY {pk}")
+    pk_index = cols.index(pk)
+    for row in cur:
+        key = int(row[pk_index])
+        leaf = key // DIFF_LEAF_KEYS
+        if leaf != current:
+            if h is not None:
+                leaves[current] = h.hexdigest()
+            current, h = leaf, hashlib.blake2b(digest_size=16)
+        h.update(repr(tuple(row)).encode("utf-8"))
+        rows += 1
+        max_key = key
+    if h is not None:
+        leaves[current] = h.hexdigest()
+    return {
+        "pk": pk,
+        "columns": cols,
+        "rows": rows,
+        "max_key": max_key,
+        "levels": _extend_levels([leaves], _height_for(max_key)),
+    }
+
+
+def catalog_hashes(
+    path: str,
+    tables: Optional[Sequence[str]] = None,
+    columns: Optional[Dict[str, Sequence[str]]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """Alberi di hash delle tabelle catalogo presenti nel DB (tabella -> albero)."""
+    out: Dict[str, Dict[str, Any]] = {}
+    with closing(_connect_ro(path)) as conn:
+        existing = {str(r[0]) for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        for table in tables or CATALOG_TABLES:
+            if table not in existing:
+                continue
+            tree = table_tree(conn, table, (columns or {}).get(table))
+            if tree is not None:
+                out[table] = tree
+    return out
+
+
+def _json_levels(tree: Dict[str, Any]) -> List[Dict[int, str]]:
+    # Da JSON le chiavi dei livelli arrivano come stringhe.
+    return [{int(k): v for k, v in level.items()} for level in tree["levels"]]
+
+
+def diff_trees(a: Dict[str, Any], b: Dict[str, Any]) -> List[Tuple[int, int]]:
+    """Intervalli di chiavi [min, max] con contenuto diverso, scendendo solo nei nodi diversi."""
+    if a["columns"] != b["columns"] or a["pk"] != b["pk"]:
+        # Colonne diverse: hash non confrontabili, tutta la tabella e' da verificare.
+        return [(0, max(int(a["max_key"]), int(b["max_key"])))]
+    height = max(len(a["levels"]), len(b["levels"]))
+    levels_a = _extend_levels(_json_levels(a), height)
+    levels_b = _extend_levels(_json_levels(b), height)
+    differing = [k for k in set(levels_a[-1]) | set(levels_b[-1]) if levels_a[-1].get(k) != levels_b[-1].get(k)]
+    for depth in range(height - 2, -1, -1):
+        level_a, level_b = levels_a[depth], levels_b[depth]
+        differing = [
+            child
+            for parent in differing
+            for child in range(parent * DIFF_FANOUT, (parent + 1) * DIFF_FANOUT)
+            if (child in level_a or child in level_b) and level_a.get(child) != level_b.get(child)
+        ]
+    ranges: List[Tuple[int, int]] = []
+    for leaf in sorted(differing):
+        lo, hi = leaf * DIFF_LEAF_KEYS, (leaf + 1) * DIFF_LEAF_KEYS - 1
+        if ranges and ranges[-1][1] + 1 == lo:
+            ranges[-1] = (ranges[-1][0], hi)
+        else:
+            ranges.append((lo, hi))
+    return ranges
+
+
+def diff_hashes(a: Dict[str, Dict[str, Any]], b: Dict[str, Dict[str, Any]]) -> Dict[str, List[Tuple[int, int]]]:
+    """Tabella -> intervalli di chiavi diversi, dai soli alberi di hash (es. scambiati via JSON)."""
+    out: Dict[str, List[Tuple[int, int]]] = {}
+    for table in sorted(set(a) & set(b)):
+        ranges = diff_trees(a[table], b[table])
+        if ranges:
+            out[table] = ranges
+    return out
+
+
+def _rows_in_ranges(
+    conn: sqlite3.Connection, table: str, pk: str, cols: Sequence[str], ranges: Sequence[Tuple[int, int]]
+) -> Dict[Any, Dict[str, Any]]:
+    out: Dict[Any, Dict[str, Any]] = {}
+    sql = f"SELECT {', '.join(cols)} FROM {table} WHERE {pk} BETWEEN ? AND ? ORDER BY {pk}"
+    for lo, hi in ranges:
+        for row in conn.execute(sql, (lo, hi)):
+            out[row[pk]] = dict(row)
+    return out
+
+
+def diff_databases(path_a: str, path_b: str, tables: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """
+    Differenze tra due DB: {"ranges": tabella -> intervalli diversi, "rows": [(tabella, chiave,
+    riga A, riga B)]}. Riga A None = solo in B, riga B None = solo in A.
+    Confronta le colonne comuni alle due versioni di ogni tabella.
+    """
+    with closing(_connect_ro(path_a)) as conn_a, closing(_connect_ro(path_b)) as conn_b:
+        columns: Dict[str, List[str]] = {}
+        for table in tables or CATALOG_TABLES:
+            layout_a = _table_layout(conn_a, table)
+            layout_b = _table_layout(conn_b, table)
+            if layout_a is None or layout_b is None or layout_a[0] != layout_b[0]:
+                continue
+            columns[table] = [c for c in layout_a[1] if c in layout_b[1]]
+        ranges = diff_hashes(
+            catalog_hashes(path_a, list(columns), columns),
+            catalog_hashes(path_b, list(columns), columns),
+        )
+        rows: List[RowDiff] = []
+        for table, table_ranges in ranges.items():
+            pk = _table_layout(conn_a, table)[0]
+            rows_a = _rows_in_ranges(conn_a, table, pk, columns[table], table_ranges)
+            rows_b = _rows_in_ranges(conn_b, table, pk, columns[table], table_ranges)
+            for key in sorted(set(rows_a) | set(rows_b)):
+                row_a, row_b = rows_a.get(key), rows_b.get(key)
+                if row_a != row_b:
+                    rows.append((table, key, row_a, row_b))
+    return {"ranges": ranges, "rows": rows}
+
+
+_PROFILE_BY_BITS = {1: DB_PROFILE_NORMATI, 2: DB_PROFILE_COMMERCIALI, 4: DB_PROFILE_MATERIALI, 7: DB_PROFILE_ALL}
+
+
+def apply_diff(rows: Sequence[RowDiff], target_path: str) -> Dict[str, Tuple[int, int, int]]:
+    """
+    Porta il DB `target_path` (lato B) allo stato del lato A per le righe indicate, in
+    un'unica transazione con i dati ricavati (attributi articoli, colonne dimensioni).
+    Ritorna tabella -> (inseriti, modificati, eliminati).
+    """
+    with closing(sqlite3.connect(target_path, timeout=30)) as conn:
+        bits = int(conn.execute("PRAGMA user_version").fetchone()[0]) % 8
+    profile = _PROFILE_BY_BITS.get(bits)
+    if profile is None:
+        raise ValueError(f"{target_path}: DB non inizializzato dall'app, delta non applicabile.")
+
+    counts: Dict[str, List[int]] = {}
+    changed: Dict[str, List[Any]] = {}
+    db = Database(target_path, db_profile=profile, access_mode="rw", session_role="editor")
+    try:
+        db.conn.execute("PRAGMA foreign_keys=OFF;")
+        with db.transaction():
+            for table, key, row_a, row_b in rows:
+                layout = _table_layout(db.conn, table)
+                if layout is None:
+                    continue
+                pk = layout[0]
+                c = counts.setdefault(table, [0, 0, 0])
+                if row_a is None:
+                    db.conn.execute(f"DELETE FROM {table} WHERE {pk}=?", (key,))
+                    c[2] += 1
+                    continue
+                cols = [col for col in row_a if col in layout[1]]
+                if row_b is None:
+                    db.conn.execute(
+                        f"INSERT INTO {table}({', '.join(cols)}) VALUES({', '.join('?' * len(cols))})",
+                        [row_a[col] for col in cols],
+                    )
+                    c[0] += 1
+                else:
+                    data_cols = [col for col in cols if col != pk]
+                    db.conn.execute(
+                        f"UPDATE {table} SET {', '.join(f'{col}=?' for col in data_cols)} WHERE {pk}=?",
+                        [row_a[col] for col in data_cols] + [key],
+                    )
+                    c[1] += 1
+                changed.setdefault(table, []).append(key)
+            db._refresh_derived_data(changed)
+    finally:
+        db.conn.execute("PRAGMA foreign_keys=ON;")
+        db.close()
+    return {table: (c[0], c[1], c[2]) for table, c in counts.items()}
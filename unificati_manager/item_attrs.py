@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from .utils import normalize_upper
+
+# Attributi tipizzati degli articoli normati, ricavati dalla descrizione.
+# Le descrizioni seguono i template delle sottocategorie, es.:
+#   VITE TE P/F ISO 4014 M12X120 ACCIAIO ZINCATO CL 8.8
+#   LINGUETTA PARALLELA UNI 6604A 14X9 L40 INOX A2
+#   ANELLO ELASTICO SERIE A PER ALBERO UNI 7435 / DIN 471 D76 INOX
+# diametro/lunghezza dal token M../D.., larghezza x altezza (+ L..) per linguette,
+# classe (CL .., A2-70, ..HV), finitura = coda della descrizione senza la classe,
+# norme = tutte le sigle ISO/DIN/UNI/EN presenti.
+
+ATTR_COLUMNS = ("diameter", "length", "width", "height", "prop_class", "finish", "standard")
+
+_NUM = r"\d+(?:[.,]\d+)?"
+_STANDARD_RE = re.compile(r"\b(ISO|DIN|UNI|EN)\s*(\d[0-9A-Z.\-]*)")
+_THREAD_RE = re.compile(rf"\b[MD]({_NUM})(?:X({_NUM}))?\b")
+_KEY_RE = re.compile(rf"\b({_NUM})X({_NUM})(?:\s+L({_NUM}))?\b")
+_LENGTH_RE = re.compile(rf"\bL({_NUM})\b")
+_CLASS_RE = re.compile(r"\bCL\s*(\d+(?:\.\d+)?H?)\b")
+_STAINLESS_RE = re.compile(r"\b(A[1-5])(?:-(\d{2,3}))?\b")
+_HARDNESS_RE = re.compile(r"\b(\d+HV)\b")
+_TOLERANCE_RE = re.compile(r"\b[HMGKJ]\d{1,2}\b")
+
+# Chiavi accettate nei filtri scritti nella ricerca (es. "VITE D=8 L=16..40 CL=8.8").
+FILTER_KEYS = {
+    "D": "diameter",
+    "DIAM": "diameter",
+    "L": "length",
+    "LUNG": "length",
+    "B": "width",
+    "H": "height",
+    "CL": "prop_class",
+    "CLASSE": "prop_class",
+    "FIN": "finish",
+    "NORMA": "standard",
+    "STD": "standard",
+}
+NUMERIC_FILTERS = ("diameter", "length", "width", "height")
+_FILTER_TOKEN_RE = re.compile(r"^([A-Z]+)=(.+)$")
+
+
+def _num(text: Optional[str]) -> Optional[float]:
+    if not text:
+        return None
+    return float(text.replace(",", "."))
+
+
+def normalize_standard(text: str) -> str:
+    """'iso4762' / 'ISO  4762' -> 'ISO 4762'."""
+    s = normalize_upper(text or "").strip()
+    m = _STANDARD_RE.fullmatch(s)
+    return f"{m.group(1)} {m.group(2)}" if m else s
+
+
+@lru_cache(maxsize=16384)
+def parse_item_attributes(description: str) -> Tuple[Any, ...]:
+    """
+    (diametro, lunghezza, larghezza, altezza, classe, finitura, norme) della descrizione.
+    Valori non presenti = None; le norme multiple sono unite con ' / '.
+    """
+    s = normalize_upper(description or "")
+    standards = [f"{m.group(1)} {m.group(2)}" for m in _STANDARD_RE.finditer(s)]
+    # La dimensione si cerca dopo l'ultima norma (le sigle norma contengono numeri).
+    start = max((m.end() for m in _STANDARD_RE.finditer(s)), default=0)
+    rest = s[start:]
+
+    diameter = length = width = height = None
+    tail = rest
+    m = _THREAD_RE.search(rest)
+    if m:
+        diameter, length = _num(m.group(1)), _num(m.group(2))
+        tail = rest[m.end():]
+    else:
+        m = _KEY_RE.search(rest)
+        if m:
+            width, height, length = _num(m.group(1)), _num(m.group(2)), _num(m.group(3))
+            tail = rest[m.end():]
+        else:
+            m = _LENGTH_RE.search(rest)
+            if m:
+                length = _num(m.group(1))
+                tail = rest[m.end():]
+
+    prop_class: Optional[str] = None
+    m = _CLASS_RE.search(tail)
+    if m:
+        prop_class = m.group(1)
+        tail = tail[: m.start()] + tail[m.end():]
+    else:
+        m = _STAINLESS_RE.search(tail) or _HARDNESS_RE.search(tail)
+        if m:
+            prop_class = m.group(0)
+            tail = tail[: m.start()] + tail[m.end():]
+
+    finish = " ".join(_TOLERANCE_RE.sub(" ", tail).split())
+    if not finish and prop_class and prop_class.startswith("A"):
+        finish = "INOX"
+    return (
+        diameter,
+        length,
+        width,
+        height,
+        prop_class,
+        finish or None,
+        " / ".join(standards) or None,
+    )
+
+
+def _parse_range(text: str) -> Optional[Tuple[Optional[float], Optional[float]]]:
+    lo, sep, hi = text.partition("..")
+    try:
+        low = _num(lo.strip())
+        high = _num(hi.strip()) if sep else low
+    except ValueError:
+        return None
+    if low is None and high is None:
+        return None
+    return low, high
+
+
+def split_filter_tokens(tokens: List[Tuple[str, bool]]) -> Tuple[List[Tuple[str, bool]], Dict[str, Any]]:
+    """
+    Separa dai token di ricerca i filtri strutturati CHIAVE=VALORE
+    (numerici anche come intervallo MIN..MAX, MIN.. o ..MAX).
+    Ritorna (token residui, filtri).
+    """
+    rest: List[Tuple[str, bool]] = []
+    filters: Dict[str, Any] = {}
+    for tok, quoted in tokens:
+        m = None if quoted else _FILTER_TOKEN_RE.match(tok)
+        col = FILTER_KEYS.get(m.group(1)) if m else None
+        if col is None:
+            rest.append((tok, quoted))
+            continue
+        value = m.group(2)
+        if col in NUMERIC_FILTERS:
+            rng = _parse_range(value)
+            if rng is None:
+                rest.append((tok, quoted))
+                continue
+            filters[col] = rng
+        else:
+            filters[col] = value
+    return rest, filters
@@ -17,6 +17,7 @@ from .my_style_01.ttk import configure_treeview_style
 
 from .config import (
     APP_NAME,
+    AREA_PREFETCH_DELAY_MS,
     WRITER_HEARTBEAT_SECONDS,
     WRITER_LOCK_TIMEOUT_SECONDS,
     get_backup_dir,
@@ -42,6 +43,17 @@ EDITOR_SCOPE_CHOICES = (
 EDITOR_SCOPE_LABELS = {code: label for code, label in EDITOR_SCOPE_CHOICES}
 EDITOR_SCOPE_VALUES = [code for code, _label in EDITOR_SCOPE_CHOICES]
 
+# Prefetch di un'area: DB che la ospita e letture iniziali dei suoi tab.
+AREA_PREFETCH = {
+    "NORMATI": ("NORMATI", (NormatiArticlesTab.prefetch, NormatiCodingTab.prefetch)),
+    "COMMERCIALI": (
+        "COMMERCIALI",
+        (SuppliersTab.prefetch, CommercialArticlesTab.prefetch, CommercialCodingTab.prefetch),
+    ),
+    "MATERIALI": ("MATERIALI", (MaterialsTab.prefetch, TreatmentsTab.prefetch, SemilavoratiTab.prefetch)),
+    "MANUALE": ("NORMATI", (ManualeTab.prefetch,)),
+}
+
 
 def _scope_label(scope: str) -> str:
     key = (scope or "").strip().upper()
@@ -148,6 +160,13 @@ class App(ctk.CTk):
         self.writer_scope = "MAIN"
         self._writer_heartbeat_job = None
         self._writer_heartbeat_seconds = max(5, int(WRITER_HEARTBEAT_SECONDS))
+        # Tab area costruiti al primo utilizzo: nome tab -> (area, root, builder).
+        self._area_tabs = {}
+        self._built_areas = set()
+        self._area_prefetch_job = None
+        self._area_prefetch_wait = None
+        self._backup_job = None
+        self._backup_watch_job = None
         self.db = None
         self.db_normati = None
         self.db_commerciali = None
@@ -278,72 +297,59 @@ class App(ctk.CTk):
             elif self.writer_scope == "MATERIALI":
                 mode_materiali = "rw"
 
-        db_normati = None
-        db_commerciali = None
-        db_materiali = None
-        try:
-            db_normati = Database(
-                get_normati_db_path(),
-                db_profile="NORMATI",
-                access_mode=mode_normati,
-                session_role="editor" if mode_normati == "rw" else "reader",
-                writer_holder=self.session_user,
-                writer_lock_token=writer_token if writer_db_path and os.path.abspath(writer_db_path) == os.path.abspath(get_normati_db_path()) else None,
-                writer_lock_scope="MAIN",
-                writer_lock_timeout_seconds=WRITER_LOCK_TIMEOUT_SECONDS,
-            )
-            db_commerciali = Database(
-                get_commerciali_db_path(),
-                db_profile="COMMERCIALI",
-                access_mode=mode_commerciali,
-                session_role="editor" if mode_commerciali == "rw" else "reader",
-                writer_holder=self.session_user,
-                writer_lock_token=writer_token if writer_db_path and os.path.abspath(writer_db_path) == os.path.abspath(get_commerciali_db_path()) else None,
-                writer_lock_scope="MAIN",
-                writer_lock_timeout_seconds=WRITER_LOCK_TIMEOUT_SECONDS,
-            )
-            db_materiali = Database(
-                get_materiali_db_path(),
-                db_profile="MATERIALI",
-                access_mode=mode_materiali,
-                session_role="editor" if mode_materiali == "rw" else "reader",
-                writer_holder=self.session_user,
-                writer_lock_token=writer_token if writer_db_path and os.path.abspath(writer_db_path) == os.path.abspath(get_materiali_db_path()) else None,
-                writer_lock_scope="MAIN",
-                writer_lock_timeout_seconds=WRITER_LOCK_TIMEOUT_SECONDS,
-            )
-        except Exception as e:
-            for db_obj in (db_normati, db_commerciali, db_materiali):
-                if db_obj is None:
-                    continue
-                try:
-                    db_obj.close()
-                except Exception:
-                    pass
-            messagebox.showerror("Avvio", f"Impossibile aprire il database: {e}", parent=self)
-            return False
+        def area_opener(path: str, profile: str, mode: str):
+            def _open(**options) -> Database:
+                # `options`: es. check_same_thread=False per l'apertura dal thread di prefetch.
+                return Database(
+                    path,
+                    db_profile=profile,
+                    access_mode=mode,
+                    session_role="editor" if mode == "rw" else "reader",
+                    writer_holder=self.session_user,
+                    writer_lock_token=writer_token if writer_db_path and os.path.abspath(writer_db_path) == os.path.abspath(path) else None,
+                    writer_lock_scope="MAIN",
+                    writer_lock_timeout_seconds=WRITER_LOCK_TIMEOUT_SECONDS,
+                    **options,
+                )
 
-        self.db_normati = db_normati
-        self.db_commerciali = db_commerciali
-        self.db_materiali = db_materiali
+            return _open
+
+        openers = {
+            "NORMATI": area_opener(get_normati_db_path(), "NORMATI", mode_normati),
+            "COMMERCIALI": area_opener(get_commerciali_db_path(), "COMMERCIALI", mode_commerciali),
+            "MATERIALI": area_opener(get_materiali_db_path(), "MATERIALI", mode_materiali),
+        }
+        # Solo il DB in scrittura dell'editor viene aperto subito (lock, heartbeat,
+        # migrazioni); le altre aree si aprono alla prima selezione del tab.
+        sources = dict(openers)
+        if self.session_role == "editor" and self.writer_scope in openers:
+            try:
+                sources[self.writer_scope] = openers[self.writer_scope]()
+            except Exception as e:
+                messagebox.showerror("Avvio", f"Impossibile aprire il database: {e}", parent=self)
+                return False
 
-        if self.writer_scope == "COMMERCIALI":
-            self.db = self.db_commerciali
-        elif self.writer_scope == "MATERIALI":
-            self.db = self.db_materiali
-        else:
-            self.db = self.db_normati
+        self.db_normati = sources["NORMATI"] if isinstance(sources["NORMATI"], Database) else None
+        self.db_commerciali = sources["COMMERCIALI"] if isinstance(sources["COMMERCIALI"], Database) else None
+        self.db_materiali = sources["MATERIALI"] if isinstance(sources["MATERIALI"], Database) else None
+        self.db = self.db_normati or self.db_commerciali or self.db_materiali
 
         self.service = AppService(
-            self.db_normati,
-            self.db_commerciali,
-            self.db_materiali,
+            sources["NORMATI"],
+            sources["COMMERCIALI"],
+            sources["MATERIALI"],
             editor_scope=self.writer_scope,
         )
 
         if self.session_role == "editor":
             try:
-                self.service.create_periodic_backup("startup")
+                # In background: la finestra resta utilizzabile durante la copia.
+                self._backup_job = self.service.start_periodic_backup("startup")
+            except Exception:
+                self._backup_job = None
+            try:
+                # Sul thread di scrittura delle aree gia' aperte, senza attendere.
+                self.service.compact_change_logs()
             except Exception:
                 pass
 
@@ -351,14 +357,43 @@ class App(ctk.CTk):
         self._build_ui()
         self._apply_read_only_ui()
         self._start_writer_heartbeat()
+        self._watch_backup()
         return True
 
+    def _watch_backup(self) -> None:
+        """Avanzamento del backup in corso nel titolo della finestra."""
+        self._backup_watch_job = None
+        job = self._backup_job
+        if job is None:
+            return
+        if job.done():
+            self._backup_job = None
+            self.title(self._window_title())
+            return
+        self.title(f"{self._window_title()} - backup {int(job.progress() * 100)}%")
+        self._backup_watch_job = self.after(250, self._watch_backup)
+
     def _clear_ui(self) -> None:
+        self._cancel_area_prefetch()
+        if self._area_prefetch_wait is not None:
+            # Cambio sessione: l'apertura in corso la attende service.close().
+            try:
+                self.after_cancel(self._area_prefetch_wait)
+            except Exception:
+                pass
+            self._area_prefetch_wait = None
         for child in self.winfo_children():
             child.destroy()
 
     def _shutdown_session(self, backup_reason: str = "") -> None:
         self._cancel_writer_heartbeat()
+        if self._backup_watch_job is not None:
+            try:
+                self.after_cancel(self._backup_watch_job)
+            except Exception:
+                pass
+            self._backup_watch_job = None
+        self._backup_job = None
         active_db = self.db
         service = self.service
 
@@ -401,32 +436,34 @@ class App(ctk.CTk):
         if not self._start_session():
             self.destroy()
 
+    def _is_read_only_session(self) -> bool:
+        return self.db is None or self.db.is_read_only
+
+    def _window_title(self) -> str:
+        role_label = "READ-ONLY" if self._is_read_only_session() else f"EDITOR:{_scope_label(self.writer_scope)}"
+        return f"{APP_NAME} - {STYLE_NAME} - {self.session_user} ({role_label})"
+
     def _apply_read_only_ui(self) -> None:
-        role_label = "READ-ONLY" if self.db.is_read_only else f"EDITOR:{_scope_label(self.writer_scope)}"
-        self.title(f"{APP_NAME} - {STYLE_NAME} - {self.session_user} ({role_label})")
-        if self.db.is_read_only:
-            self._disable_write_buttons_recursive(self)
+        self.title(self._window_title())
+        # I tab non ancora costruiti vengono limitati quando si costruiscono.
+        for area_key, root, _builder in self._area_tabs.values():
+            if area_key in self._built_areas:
+                self._apply_area_restrictions(area_key, root)
+
+    def _apply_area_restrictions(self, area_key: str, root) -> None:
+        if self._is_read_only_session():
+            self._disable_write_buttons_recursive(root)
             return
-        self._apply_editor_scope_restrictions()
-
-    def _apply_editor_scope_restrictions(self) -> None:
         scope = (self.writer_scope or "").strip().upper()
         if scope in {"", "MAIN"}:
             return
-        blocked_roots = []
-        if scope != "NORMATI":
-            blocked_roots.append(getattr(self, "tab_normati_root", None))
-            blocked_roots.append(getattr(self, "tab_man_root", None))
-        if scope != "COMMERCIALI":
-            blocked_roots.append(getattr(self, "tab_comm_root", None))
-        if scope != "MATERIALI":
-            blocked_roots.append(getattr(self, "tab_mat_root", None))
-        for root in blocked_roots:
-            if root is not None:
-                self._disable_write_buttons_recursive(root)
+        # Il manuale e' ospitato sul DB normati.
+        owner = "NORMATI" if area_key == "MANUALE" else area_key
+        if owner != scope:
+            self._disable_write_buttons_recursive(root)
 
     def _is_area_visible(self, area_key: str) -> bool:
-        if self.db.is_read_only:
+        if self._is_read_only_session():
             return True
         scope = (self.writer_scope or "").strip().upper()
         if scope in {"", "MAIN"}:
@@ -437,7 +474,7 @@ class App(ctk.CTk):
         return key == scope
 
     def _disable_write_buttons_recursive(self, root):
-        write_tokens = ("SALVA", "ELIMINA", "GESTISCI FAMIGLIE")
+        write_tokens = ("SALVA", "ELIMINA", "GESTISCI FAMIGLIE", "RICALCOLA")
         for child in root.winfo_children():
             try:
                 text = str(child.cget("text") or "").strip().upper()
@@ -451,7 +488,7 @@ class App(ctk.CTk):
             self._disable_write_buttons_recursive(child)
 
     def _start_writer_heartbeat(self) -> None:
-        if self.db.is_read_only or self.session_role != "editor":
+        if self._is_read_only_session() or self.session_role != "editor":
             return
         self._writer_heartbeat_job = self.after(
             self._writer_heartbeat_seconds * 1000,
@@ -507,7 +544,11 @@ class App(ctk.CTk):
         )
         theme_btn.pack(side="right", padx=5)
 
-        self.main_tabs = ctk.CTkTabview(self)
+        self._cancel_area_prefetch()
+        self._area_tabs = {}
+        self._built_areas = set()
+
+        self.main_tabs = ctk.CTkTabview(self, command=self._on_main_tab_changed)
         self.main_tabs.grid(row=1, column=0, sticky="nsew", padx=10, pady=(5, 10))
 
         self.tab_normati_root = None
@@ -516,72 +557,171 @@ class App(ctk.CTk):
         self.tab_man_root = None
 
         if self._is_area_visible("NORMATI"):
-            tab_normati = self.main_tabs.add("Commerciali Normati")
-            self.tab_normati_root = tab_normati
-            subt_norm = ctk.CTkTabview(tab_normati)
-            subt_norm.pack(fill="both", expand=True)
-            norm_art = subt_norm.add("Articoli")
-            norm_cod = subt_norm.add("Codifica")
+            self.tab_normati_root = self._add_area_tab("Commerciali Normati", "NORMATI", self._build_normati_area)
+        if self._is_area_visible("COMMERCIALI"):
+            self.tab_comm_root = self._add_area_tab("Commerciali", "COMMERCIALI", self._build_commerciali_area)
+        if self._is_area_visible("MATERIALI"):
+            self.tab_mat_root = self._add_area_tab("Materiali - Semilavorati", "MATERIALI", self._build_materiali_area)
+        if self._is_area_visible("MANUALE"):
+            self.tab_man_root = self._add_area_tab("Manuale", "MANUALE", self._build_manuale_area)
+
+        # Prima il disegno della finestra, poi il tab visibile; le altre aree
+        # restano segnaposto fino alla prima selezione (o al prefetch in idle).
+        self.after_idle(self._on_main_tab_changed)
 
-            def norm_refs_changed():
-                self.normati_articles.refresh_reference_data()
+    def _add_area_tab(self, name: str, area_key: str, builder):
+        root = self.main_tabs.add(name)
+        ctk.CTkLabel(root, text="Caricamento...", text_color="gray").pack(expand=True)
+        self._area_tabs[name] = (area_key, root, builder)
+        return root
 
-            self.normati_articles = NormatiArticlesTab(norm_art, self.service)
-            self.normati_articles.pack(fill="both", expand=True)
+    def _on_main_tab_changed(self) -> None:
+        try:
+            name = self.main_tabs.get()
+        except Exception:
+            return
+        self._ensure_area_built(name)
+        self._schedule_area_prefetch()
 
-            self.normati_coding = NormatiCodingTab(norm_cod, self.service, refs_changed_callback=norm_refs_changed)
-            self.normati_coding.pack(fill="both", expand=True)
+    def _ensure_area_built(self, name: str) -> None:
+        entry = self._area_tabs.get(name)
+        if entry is None:
+            return
+        area_key, root, builder = entry
+        if area_key in self._built_areas:
+            return
+        self._built_areas.add(area_key)
+        for child in root.winfo_children():
+            child.destroy()
+        self.configure(cursor="watch")
+        self.update_idletasks()
+        try:
+            builder(root)
+        except Exception as e:
+            messagebox.showerror("Avvio", f"Impossibile aprire l'area {name}: {e}", parent=self)
+            return
+        finally:
+            self.configure(cursor="")
+        self._apply_area_restrictions(area_key, root)
 
-        if self._is_area_visible("COMMERCIALI"):
-            tab_comm = self.main_tabs.add("Commerciali")
-            self.tab_comm_root = tab_comm
-            subt_comm = ctk.CTkTabview(tab_comm)
-            subt_comm.pack(fill="both", expand=True)
-            comm_forn = subt_comm.add("Fornitori")
-            comm_art = subt_comm.add("Articoli")
-            comm_cod = subt_comm.add("Codifica")
+    def _schedule_area_prefetch(self) -> None:
+        self._cancel_area_prefetch()
+        if int(AREA_PREFETCH_DELAY_MS) <= 0:
+            return
+        self._area_prefetch_job = self.after(int(AREA_PREFETCH_DELAY_MS), self._prefetch_next_area)
+
+    def _cancel_area_prefetch(self) -> None:
+        if self._area_prefetch_job is None:
+            return
+        try:
+            self.after_cancel(self._area_prefetch_job)
+        except Exception:
+            pass
+        self._area_prefetch_job = None
+
+    def _prefetch_next_area(self) -> None:
+        """
+        Prepara l'area piu' probabile come prossima: quella dell'editor se non ancora
+        aperta, altrimenti il tab successivo a quello corrente. Apertura del DB e prime
+        letture su un thread di lavoro; sul thread Tk solo i widget, con i dati in cache.
+        """
+        self._area_prefetch_job = None
+        if self._area_prefetch_wait is not None:
+            return
+        names = list(self._area_tabs)
+        pending = [n for n in names if self._area_tabs[n][0] not in self._built_areas]
+        if not pending:
+            return
+        target = next((n for n in pending if self._area_tabs[n][0] == self.writer_scope), None)
+        if target is None:
+            try:
+                current = names.index(self.main_tabs.get())
+            except Exception:
+                current = -1
+            target = next((n for n in names[current + 1 :] + names[: current + 1] if n in pending), pending[0])
+        scope, readers = AREA_PREFETCH[self._area_tabs[target][0]]
 
-            def comm_refs_changed():
-                self.comm_articles.refresh_reference_data()
+        def warm(service: AppService) -> None:
+            for read in readers:
+                read(service)
 
-            def comm_suppliers_changed():
-                self.comm_articles.refresh_suppliers()
+        future = self.service.open_area_async(scope, warm)
+        self._wait_area_prefetch(self.service, scope, target, future)
 
-            self.suppliers_tab = SuppliersTab(comm_forn, self.service, suppliers_changed_callback=comm_suppliers_changed)
-            self.suppliers_tab.pack(fill="both", expand=True)
+    def _wait_area_prefetch(self, service: AppService, scope: str, target: str, future) -> None:
+        if not future.done():
+            self._area_prefetch_wait = self.after(50, lambda: self._wait_area_prefetch(service, scope, target, future))
+            return
+        self._area_prefetch_wait = None
+        if service is not self.service:
+            return
+        # Il thread di lavoro ha finito: la connessione principale torna al thread Tk.
+        service.adopt_area(scope)
+        if future.exception() is None:
+            self._ensure_area_built(target)
+        # Errori di apertura: li mostra la prima selezione del tab.
 
-            self.comm_articles = CommercialArticlesTab(comm_art, self.service)
-            self.comm_articles.pack(fill="both", expand=True)
+    def _build_normati_area(self, tab_normati) -> None:
+        subt_norm = ctk.CTkTabview(tab_normati)
+        subt_norm.pack(fill="both", expand=True)
+        norm_art = subt_norm.add("Articoli")
+        norm_cod = subt_norm.add("Codifica")
 
-            self.comm_coding = CommercialCodingTab(comm_cod, self.service, refs_changed_callback=comm_refs_changed)
-            self.comm_coding.pack(fill="both", expand=True)
+        def norm_refs_changed():
+            self.normati_articles.refresh_reference_data()
 
-        if self._is_area_visible("MATERIALI"):
-            tab_mat = self.main_tabs.add("Materiali - Semilavorati")
-            self.tab_mat_root = tab_mat
-            subt_mat = ctk.CTkTabview(tab_mat)
-            subt_mat.pack(fill="both", expand=True)
-            tab_mats = subt_mat.add("Materiali")
-            tab_tratt = subt_mat.add("Trattamenti termici e superficiali")
-            tab_semi = subt_mat.add("Semilavorati")
+        self.normati_articles = NormatiArticlesTab(norm_art, self.service)
+        self.normati_articles.pack(fill="both", expand=True)
 
-            self.materials_tab = MaterialsTab(tab_mats, self.service)
-            self.materials_tab.pack(fill="both", expand=True)
+        self.normati_coding = NormatiCodingTab(norm_cod, self.service, refs_changed_callback=norm_refs_changed)
+        self.normati_coding.pack(fill="both", expand=True)
 
-            self.treatments_tab = TreatmentsTab(tab_tratt, self.service)
-            self.treatments_tab.pack(fill="both", expand=True)
+    def _build_commerciali_area(self, tab_comm) -> None:
+        subt_comm = ctk.CTkTabview(tab_comm)
+        subt_comm.pack(fill="both", expand=True)
+        comm_forn = subt_comm.add("Fornitori")
+        comm_art = subt_comm.add("Articoli")
+        comm_cod = subt_comm.add("Codifica")
 
-            self.semi_tab = SemilavoratiTab(tab_semi, self.service)
-            self.semi_tab.pack(fill="both", expand=True)
+        def comm_refs_changed():
+            self.comm_articles.refresh_reference_data()
 
-        if self._is_area_visible("MANUALE"):
-            tab_man = self.main_tabs.add("Manuale")
-            self.tab_man_root = tab_man
-            self.manuale_tab = ManualeTab(tab_man, self.service)
-            self.manuale_tab.pack(fill="both", expand=True)
+        def comm_suppliers_changed():
+            self.comm_articles.refresh_suppliers()
+
+        self.suppliers_tab = SuppliersTab(comm_forn, self.service, suppliers_changed_callback=comm_suppliers_changed)
+        self.suppliers_tab.pack(fill="both", expand=True)
+
+        self.comm_articles = CommercialArticlesTab(comm_art, self.service)
+        self.comm_articles.pack(fill="both", expand=True)
+
+        self.comm_coding = CommercialCodingTab(comm_cod, self.service, refs_changed_callback=comm_refs_changed)
+        self.comm_coding.pack(fill="both", expand=True)
+
+    def _build_materiali_area(self, tab_mat) -> None:
+        subt_mat = ctk.CTkTabview(tab_mat)
+        subt_mat.pack(fill="both", expand=True)
+        tab_mats = subt_mat.add("Materiali")
+        tab_tratt = subt_mat.add("Trattamenti termici e superficiali")
+        tab_semi = subt_mat.add("Semilavorati")
+
+        self.materials_tab = MaterialsTab(tab_mats, self.service)
+        self.materials_tab.pack(fill="both", expand=True)
+
+        self.treatments_tab = TreatmentsTab(tab_tratt, self.service)
+        self.treatments_tab.pack(fill="both", expand=True)
+
+        self.semi_tab = SemilavoratiTab(tab_semi, self.service)
+        self.semi_tab.pack(fill="both", expand=True)
+
+    def _build_manuale_area(self, tab_man) -> None:
+        self.manuale_tab = ManualeTab(tab_man, self.service)
+        self.manuale_tab.pack(fill="both", expand=True)
 
     def on_close(self) -> None:
         try:
+            # Finestra nascosta subito: un backup ancora in corso viene completato in chiusura.
+            self.withdraw()
             self._shutdown_session(backup_reason="close")
         finally:
             self.destroy()
@@ -0,0 +1,541 @@
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .backup_store import BackupStore
+from .codifica import normalize_gggg_normati, normalize_mmm
+from .config import get_backup_store_dir
+from .db import Database
+from .utils import ensure_dir, normalize_upper, now_str
+
+# Motore patch dati dichiarative.
+# Un pacchetto elenca lo stato voluto (categorie, norme, sotto-categorie, serie articoli,
+# dimensioni semilavorati, proprieta' materiali); il motore legge lo stato attuale con
+# una query per tabella, calcola il diff e scrive solo INSERT/UPDATE/DELETE necessari
+# con executemany. Rieseguire lo stesso pacchetto non modifica nulla.
+
+
+@dataclass(frozen=True)
+class CategoryDef:
+    code: str
+    description: str
+
+
+@dataclass(frozen=True)
+class StandardDef:
+    category: str
+    code: str
+    description: str
+
+
+@dataclass(frozen=True)
+class SubcategoryDef:
+    category: str
+    code: str
+    description: str
+    standard: str = ""
+    desc_template: str = ""
+
+
+@dataclass(frozen=True)
+class ItemDef:
+    category: str
+    subcategory: str
+    description: str
+    standard: str = ""
+    notes: str = ""
+    # Descrizioni precedenti con cui riconoscere un articolo gia' presente (es. senza norma).
+    aliases: Tuple[str, ...] = ()
+
+
+@dataclass(frozen=True)
+class SemiDimensionsDef:
+    semi_item_id: int
+    # (dimensione, peso kg/m) in ordine: sort_order 10, 20, ...
+    rows: Tuple[Tuple[str, str], ...]
+    # True = le dimensioni non elencate vengono eliminate.
+    replace: bool = True
+
+
+@dataclass(frozen=True)
+class MaterialPropertyDef:
+    material_code: str
+    prop_group: str
+    name: str
+    state_code: str = ""
+    # None = valore attuale invariato (o vuoto se la proprieta' e' nuova).
+    unit: Optional[str] = None
+    value: Optional[str] = None
+    min_value: Optional[str] = None
+    max_value: Optional[str] = None
+    notes: Optional[str] = None
+    sort_order: Optional[int] = None
+
+
+@dataclass
+class PatchPack:
+    name: str
+    categories: List[CategoryDef] = field(default_factory=list)
+    standards: List[StandardDef] = field(default_factory=list)
+    subcategories: List[SubcategoryDef] = field(default_factory=list)
+    # (categoria, sotto-categoria) da eliminare con i loro articoli.
+    remove_subcategories: List[Tuple[str, str]] = field(default_factory=list)
+    items: List[ItemDef] = field(default_factory=list)
+    # Elimina gli articoli con descrizione ripetuta nelle sotto-categorie del pacchetto.
+    dedupe_items: bool = False
+    # Articoli nuovi prima nei buchi di progressivo (vedi `Database.reserve_item_seqs`).
+    fill_code_gaps: bool = False
+    semi_dimensions: List[SemiDimensionsDef] = field(default_factory=list)
+    material_properties: List[MaterialPropertyDef] = field(default_factory=list)
+
+
+@dataclass
+class PatchReport:
+    pack: str
+    # tabella -> [inseriti, modificati, eliminati]
+    counts: Dict[str, List[int]] = field(default_factory=dict)
+    # sotto-categoria -> [articoli creati, aggiornati]
+    items_by_subcategory: Dict[str, List[int]] = field(default_factory=dict)
+
+    def add(self, table: str, inserted: int = 0, updated: int = 0, deleted: int = 0) -> None:
+        c = self.counts.setdefault(table, [0, 0, 0])
+        c[0] += inserted
+        c[1] += updated
+        c[2] += deleted
+
+    @property
+    def changed(self) -> bool:
+        return any(any(c) for c in self.counts.values())
+
+    def lines(self) -> List[str]:
+        out = [f"[{self.pack}]"]
+        for table, (inserted, updated, deleted) in self.counts.items():
+            out.append(f"  {table}: +{inserted} ~{updated} -{deleted}")
+        for sub, (created, updated) in sorted(self.items_by_subcategory.items()):
+            out.append(f"  - {sub}: created={created} updated={updated}")
+        if not self.changed:
+            out.append("  nessuna modifica")
+        return out
+
+
+def _text(value: Any) -> str:
+    return normalize_upper(str(value or "")).strip()
+
+
+class PatchEngine:
+    def __init__(self, db: Database) -> None:
+        self.db = db
+        self.cur = db.conn.cursor()
+
+    def apply(self, pack: PatchPack) -> PatchReport:
+        """Applica il pacchetto sulla connessione del DB (senza commit: lo fa `run_patch`)."""
+        report = PatchReport(pack.name)
+        # tabella -> id modificati, per riallineare solo i dati ricavati toccati
+        self.changed: Dict[str, List[int]] = {}
+        if pack.categories:
+            self._apply_categories(pack, report)
+        if pack.standards:
+            self._apply_standards(pack, report)
+        if pack.subcategories:
+            self._apply_subcategories(pack, report)
+        if pack.remove_subcategories:
+            self._remove_subcategories(pack, report)
+        if pack.items:
+            self._apply_items(pack, report)
+        if pack.semi_dimensions:
+            self._apply_semi_dimensions(pack, report)
+        if pack.material_properties:
+            self._apply_material_properties(pack, report)
+        if report.changed:
+            self.db._refresh_derived_data(self.changed)
+        return report
+
+    # -------- Anagrafiche normati --------
+    def _category_ids(self) -> Dict[str, int]:
+        return {str(r["code"]): int(r["id"]) for r in self.cur.execute("SELECT id, code FROM category")}
+
+    def _category_id(self, code: str) -> int:
+        ids = self._category_ids()
+        key = normalize_mmm(code)
+        if key not in ids:
+            raise RuntimeError(f"Categoria non trovata: {key}")
+        return ids[key]
+
+    def _apply_categories(self, pack: PatchPack, report: PatchReport) -> None:
+        existing = {
+            str(r["code"]): (int(r["id"]), str(r["description"]))
+            for r in self.cur.execute("SELECT id, code, description FROM category")
+        }
+        inserts: List[Tuple[str, str]] = []
+        updates: List[Tuple[str, int]] = []
+        for d in pack.categories:
+            code, desc = normalize_mmm(d.code), _text(d.description)
+            if code not in existing:
+                inserts.append((code, desc))
+            elif existing[code][1] != desc:
+                updates.append((desc, existing[code][0]))
+        self.cur.executemany("INSERT INTO category(code, description) VALUES(?, ?)", inserts)
+        self.cur.executemany("UPDATE category SET description=? WHERE id=?", updates)
+        report.add("category", len(inserts), len(updates))
+
+    def _standard_ids(self) -> Dict[Tuple[int, str], int]:
+        return {
+            (int(r["category_id"]), str(r["code"])): int(r["id"])
+            for r in self.cur.execute("SELECT id, category_id, code FROM standard")
+        }
+
+    def _apply_standards(self, pack: PatchPack, report: PatchReport) -> None:
+        cat_ids = self._category_ids()
+        existing = {
+            (int(r["category_id"]), str(r["code"])): (int(r["id"]), str(r["description"]))
+            for r in self.cur.execute("SELECT id, category_id, code, description FROM standard")
+        }
+        inserts: List[Tuple[int, str, str]] = []
+        updates: List[Tuple[str, int]] = []
+        for d in pack.standards:
+            cat_id = cat_ids.get(normalize_mmm(d.category))
+            if cat_id is None:
+                raise RuntimeError(f"Categoria non trovata per norma {d.code}: {d.category}")
+            key, desc = (cat_id, _text(d.code)), _text(d.description)
+            if key not in existing:
+                inserts.append((cat_id, key[1], desc))
+            elif existing[key][1] != desc:
+                updates.append((desc, existing[key][0]))
+        self.cur.executemany("INSERT INTO standard(category_id, code, description) VALUES(?, ?, ?)", inserts)
+        self.cur.executemany("UPDATE standard SET description=? WHERE id=?", updates)
+        report.add("standard", len(inserts), len(updates))
+
+    def _subcategory_ids(self) -> Dict[Tuple[int, str], int]:
+        return {
+            (int(r["category_id"]), str(r["code"])): int(r["id"])
+            for r in self.cur.execute("SELECT id, category_id, code FROM subcategory")
+        }
+
+    def _apply_subcategories(self, pack: PatchPack, report: PatchReport) -> None:
+        cat_ids = self._category_ids()
+        std_ids = self._standard_ids()
+        existing = {
+            (int(r["category_id"]), str(r["code"])): (
+                int(r["id"]),
+                (str(r["description"]), r["standard_id"], str(r["desc_template"] or "")),
+            )
+            for r in self.cur.execute(
+                "SELECT id, category_id, code, description, standard_id, desc_template FROM subcategory"
+            )
+        }
+        inserts: List[Tuple[Any, ...]] = []
+        updates: List[Tuple[Any, ...]] = []
+        for d in pack.subcategories:
+            cat_id = cat_ids.get(normalize_mmm(d.category))
+            if cat_id is None:
+                raise RuntimeError(f"Categoria non trovata per sotto-categoria {d.code}: {d.category}")
+            std_id = std_ids.get((cat_id, _text(d.standard))) if d.standard else None
+            if d.standard and std_id is None:
+                raise RuntimeError(f"Norma non trovata in {d.category}: {d.standard}")
+            key = (cat_id, normalize_gggg_normati(d.code))
+            values = (_text(d.description), std_id, _text(d.desc_template))
+            if key not in existing:
+                inserts.append((cat_id, key[1], *values))
+            elif existing[key][1] != values:
+                updates.append((*values, existing[key][0]))
+        self.cur.executemany(
+            "INSERT INTO subcategory(category_id, code, description, standard_id, desc_template) VALUES(?, ?, ?, ?, ?)",
+            inserts,
+        )
+        self.cur.executemany(
+            "UPDATE subcategory SET description=?, standard_id=?, desc_template=? WHERE id=?",
+            updates,
+        )
+        report.add("subcategory", len(inserts), len(updates))
+
+    def _remove_subcategories(self, pack: PatchPack, report: PatchReport) -> None:
+        cat_ids = self._category_ids()
+        sub_ids = self._subcategory_ids()
+        targets = [
+            (sub_ids[key],)
+            for key in (
+                (cat_ids.get(normalize_mmm(cat), -1), normalize_gggg_normati(sub))
+                for cat, sub in pack.remove_subcategories
+            )
+            if key in sub_ids
+        ]
+        if not targets:
+            return
+        removed = sum(
+            int(self.cur.execute("DELETE FROM item WHERE subcategory_id=?", target).rowcount) for target in targets
+        )
+        report.add("item", deleted=removed)
+        self.cur.executemany("DELETE FROM subcategory WHERE id=?", targets)
+        report.add("subcategory", deleted=len(targets))
+
+    # -------- Articoli normati --------
+    def _allocate_codes(
+        self, cat_id: int, cat_code: str, sub_id: int, sub_code: str, count: int, fill_gaps: bool
+    ) -> List[Tuple[str, int]]:
+        """`count` coppie (codice, seq) da blocchi riservati nella sequenza della sotto-categoria."""
+        prefix = f"{cat_code}_{sub_code}-"
+        # Codici gia' usati con lo stesso prefisso (anche da articoli spostati di sotto-categoria).
+        taken = {
+            str(r[0])
+            for r in self.cur.execute(
+                "SELECT code FROM item WHERE code>=? AND code<?",
+                (prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)),
+            )
+        }
+        out: List[Tuple[str, int]] = []
+        while len(out) < count:
+            for seq in self.db.reserve_item_seqs(cat_id, sub_id, count - len(out), fill_gaps=fill_gaps):
+                code = f"{prefix}{seq:04d}"
+                if code not in taken:
+                    out.append((code, seq))
+        return out
+
+    def _apply_items(self, pack: PatchPack, report: PatchReport) -> None:
+        cat_ids = self._category_ids()
+        sub_ids = self._subcategory_ids()
+        std_ids = self._standard_ids()
+
+        resolved: List[Tuple[ItemDef, int, str, int, str, Optional[int]]] = []
+        for d in pack.items:
+            cat_code = normalize_mmm(d.category)
+            cat_id = cat_ids.get(cat_code)
+            sub_code = normalize_gggg_normati(d.subcategory)
+            sub_id = sub_ids.get((cat_id, sub_code)) if cat_id is not None else None
+            if cat_id is None or sub_id is None:
+                raise RuntimeError(f"Sotto-categoria non trovata: {cat_code}/{sub_code}")
+            std_id = std_ids.get((cat_id, _text(d.standard))) if d.standard else None
+            if d.standard and std_id is None:
+                raise RuntimeError(f"Norma non trovata in {cat_code}: {d.standard}")
+            resolved.append((d, cat_id, cat_code, sub_id, sub_code, std_id))
+
+        involved = sorted({sub_id for _d, _c, _cc, sub_id, _sc, _s in resolved})
+        marks = ", ".join("?" * len(involved))
+        # (sotto-categoria, descrizione) -> primo articolo (id piu' basso)
+        existing: Dict[Tuple[int, str], Any] = {}
+        for r in self.cur.execute(
+            f"""
+            SELECT id, subcategory_id, description, standard_id, notes, is_active
+            FROM item WHERE subcategory_id IN ({marks})
+            ORDER BY id
+            """,
+            involved,
+        ):
+            existing.setdefault((int(r["subcategory_id"]), str(r["description"])), r)
+
+        now = now_str()
+        updates: List[Tuple[Any, ...]] = []
+        new_by_sub: Dict[int, List[Tuple[ItemDef, int, str, str, Optional[int]]]] = {}
+        seen: set = set()
+        for d, cat_id, cat_code, sub_id, sub_code, std_id in resolved:
+            desc, notes = _text(d.description), _text(d.notes)
+            if (sub_id, desc) in seen:
+                continue
+            seen.add((sub_id, desc))
+            stats = report.items_by_subcategory.setdefault(sub_code, [0, 0])
+            row = None
+            for candidate in (desc, *(_text(a) for a in d.aliases)):
+                row = existing.get((sub_id, candidate))
+                if row is not None:
+                    break
+            if row is None:
+                new_by_sub.setdefault(sub_id, []).append((d, cat_id, cat_code, sub_code, std_id))
+                stats[0] += 1
+                continue
+            current = (str(row["description"]), row["standard_id"], str(row["notes"] or ""), int(row["is_active"]))
+            if current != (desc, std_id, notes, 1):
+                updates.append((desc, std_id, notes, now, int(row["id"])))
+                stats[1] += 1
+
+        inserts: List[Tuple[Any, ...]] = []
+        for sub_id, defs in new_by_sub.items():
+            _d, first_cat_id, cat_code, sub_code, _std = defs[0]
+            for (d, cat_id, _cc, _sc, std_id), (code, seq) in zip(
+                defs,
+                self._allocate_codes(first_cat_id, cat_code, sub_id, sub_code, len(defs), pack.fill_code_gaps),
+            ):
+                inserts.append((code, cat_id, sub_id, std_id, seq, _text(d.description), _text(d.notes), now, now))
+
+        self.cur.executemany(
+            "UPDATE item SET description=?, standard_id=?, notes=?, is_active=1, updated_at=? WHERE id=?",
+            updates,
+        )
+        if inserts:
+            with self.db.bulk_item_inserts():
+                self.cur.executemany(
+                    """
+                    INSERT INTO item(code, category_id, subcategory_id, standard_id, seq, description, notes, is_active, created_at, updated_at)
+                    VALUES(?, ?, ?, ?, ?, ?, ?, 1, ?, ?)
+                    """,
+                    inserts,
+                )
+        deleted = 0
+        if pack.dedupe_items:
+            deleted = self.cur.execute(
+                f"""
+                DELETE FROM item
+                WHERE subcategory_id IN ({marks})
+                  AND id NOT IN (
+                      SELECT MIN(id) FROM item WHERE subcategory_id IN ({marks}) GROUP BY subcategory_id, description
+                  )
+                """,
+                involved + involved,
+            ).rowcount
+        report.add("item", len(inserts), len(updates), deleted)
+        self.changed.setdefault("item", []).extend(u[-1] for u in updates)
+
+    # -------- Semilavorati --------
+    def _apply_semi_dimensions(self, pack: PatchPack, report: PatchReport) -> None:
+        ids = sorted({int(d.semi_item_id) for d in pack.semi_dimensions})
+        existing: Dict[int, Dict[str, Tuple[int, str, int]]] = {}
+        for r in self.cur.execute(
+            f"""
+            SELECT id, semi_item_id, dimension, weight_per_m, sort_order
+            FROM semi_item_dimension WHERE semi_item_id IN ({', '.join('?' * len(ids))})
+            """,
+            ids,
+        ):
+            existing.setdefault(int(r["semi_item_id"]), {})[str(r["dimension"])] = (
+                int(r["id"]),
+                str(r["weight_per_m"] or ""),
+                int(r["sort_order"] or 0),
+            )
+        inserts: List[Tuple[int, str, str, int]] = []
+        updates: List[Tuple[str, int, int]] = []
+        deletes: List[Tuple[int]] = []
+        for d in pack.semi_dimensions:
+            current = existing.get(int(d.semi_item_id), {})
+            wanted: Dict[str, Tuple[str, int]] = {}
+            for n, (dim, weight) in enumerate(d.rows):
+                wanted.setdefault(_text(dim), (str(weight or ""), (n + 1) * 10))
+            for dim, (weight, sort_order) in wanted.items():
+                if dim not in current:
+                    inserts.append((int(d.semi_item_id), dim, weight, sort_order))
+                elif current[dim][1:] != (weight, sort_order):
+                    updates.append((weight, sort_order, current[dim][0]))
+            if d.replace:
+                deletes.extend((row[0],) for dim, row in current.items() if dim not in wanted)
+        self.cur.executemany("DELETE FROM semi_item_dimension WHERE id=?", deletes)
+        self.cur.executemany("UPDATE semi_item_dimension SET weight_per_m=?, sort_order=? WHERE id=?", updates)
+        self.cur.executemany(
+            "INSERT INTO semi_item_dimension(semi_item_id, dimension, weight_per_m, sort_order) VALUES(?, ?, ?, ?)",
+            inserts,
+        )
+        report.add("semi_item_dimension", len(inserts), len(updates), len(deletes))
+        self.changed.setdefault("semi_item_dimension", []).extend(u[-1] for u in updates)
+
+    def _apply_material_properties(self, pack: PatchPack, report: PatchReport) -> None:
+        mat_ids = {str(r["code"]): int(r["id"]) for r in self.cur.execute("SELECT id, code FROM material")}
+        ids = sorted({mat_ids[c] for c in (_text(d.material_code) for d in pack.material_properties) if c in mat_ids})
+        fields = ("unit", "value", "min_value", "max_value", "notes", "sort_order")
+        existing: Dict[Tuple[int, str, str, str], Any] = {
+            (int(r["material_id"]), str(r["prop_group"]), str(r["name"]), str(r["state_code"])): r
+            for r in self.cur.execute(
+                f"""
+                SELECT id, material_id, prop_group, name, state_code, {', '.join(fields)}
+                FROM material_property WHERE material_id IN ({', '.join('?' * len(ids))})
+                """,
+                ids,
+            )
+        }
+        inserts: List[Tuple[Any, ...]] = []
+        updates: List[Tuple[Any, ...]] = []
+        touched: set = set()
+        for d in pack.material_properties:
+            mat_id = mat_ids.get(_text(d.material_code))
+            if mat_id is None:
+                raise RuntimeError(f"Materiale non trovato: {d.material_code}")
+            key = (mat_id, _text(d.prop_group), _text(d.name), _text(d.state_code))
+            row = existing.get(key)
+            given = (d.unit, d.value, d.min_value, d.max_value, d.notes)
+            if row is None:
+                values = tuple(_text(v) for v in given) + (int(d.sort_order or 0),)
+                inserts.append((*key, *values))
+                touched.add(mat_id)
+                continue
+            current = tuple(_text(row[f]) for f in fields[:-1]) + (int(row["sort_order"] or 0),)
+            values = tuple(
+                cur_v if new_v is None else _text(new_v) for cur_v, new_v in zip(current[:-1], given)
+            ) + (current[-1] if d.sort_order is None else int(d.sort_order),)
+            if values != current:
+                updates.append((*values, int(row["id"])))
+                touched.add(mat_id)
+        self.cur.executemany(
+            """
+            INSERT INTO material_property(material_id, prop_group, name, state_code, unit, value, min_value, max_value, notes, sort_order)
+            VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            inserts,
+        )
+        self.cur.executemany(
+            """
+            UPDATE material_property SET unit=?, value=?, min_value=?, max_value=?, notes=?, sort_order=?
+            WHERE id=?
+            """,
+            updates,
+        )
+        now = now_str()
+        self.cur.executemany("UPDATE material SET updated_at=? WHERE id=?", [(now, m) for m in sorted(touched)])
+        report.add("material_property", len(inserts), len(updates))
+
+
+class _DryRun(Exception):
+    pass
+
+
+def backup_area(db: Database, tag: str) -> int:
+    """Snapshot del solo DB indicato nell'archivio backup. Ritorna l'id snapshot."""
+    store = BackupStore(get_backup_store_dir())
+    with store.exclusive():
+        tmp_dir = os.path.join(store.root, "tmp")
+        ensure_dir(tmp_dir)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        copy_path = os.path.join(tmp_dir, f"{stamp}_{tag}.db")
+        Database.backup_file(db.path, copy_path)
+        try:
+            stored = store.put_file(copy_path, file_name=os.path.basename(db.path))
+        finally:
+            os.remove(copy_path)
+        return store.add_snapshot(f"patch_{tag}", {db.db_profile.lower(): stored})
+
+
+def _patch_pass(db: Database, packs: Sequence[PatchPack], commit: bool) -> List[PatchReport]:
+    """Una passata dei pacchetti in una transazione: annullata se `commit` e' falso o non cambia nulla."""
+    reports: List[PatchReport] = []
+    try:
+        with db.transaction():
+            engine = PatchEngine(db)
+            reports = [engine.apply(pack) for pack in packs]
+            if not commit or not any(r.changed for r in reports):
+                raise _DryRun()
+    except _DryRun:
+        pass
+    return reports
+
+
+def run_patch(
+    db_path: str,
+    db_profile: str,
+    packs: Sequence[PatchPack],
+    apply_changes: bool = False,
+    backup_tag: str = "",
+) -> List[PatchReport]:
+    """
+    Applica i pacchetti a un DB in un'unica transazione. Senza `apply_changes` calcola
+    lo stesso report e annulla tutto (dry-run). Con `backup_tag` e modifiche da scrivere,
+    un solo snapshot del DB prima di applicarle.
+    """
+    db = Database(db_path, db_profile=db_profile)
+    try:
+        if apply_changes and backup_tag:
+            # Report in dry-run, poi snapshot senza transazioni aperte (il backup non blocca
+            # gli altri scrittori), infine la passata vera in una transazione nuova.
+            reports = _patch_pass(db, packs, commit=False)
+            if not any(r.changed for r in reports):
+                return reports
+            backup_area(db, backup_tag)
+        return _patch_pass(db, packs, commit=apply_changes)
+    finally:
+        db.close()
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import re
+from typing import Dict, List
+
+# Libreria sezioni: serie standard di travi e profilati trafilati.
+# Aree nominali da tabella (cm2), EN 10365 / DIN 1025; il peso nominale kg/m e'
+# riferito all'acciaio (7,85 g/cm3), il calcolo pesi usa la densita' del materiale.
+
+STEEL_DENSITY_G_CM3 = 7.85
+
+IPE_SERIES = [80, 100, 120, 140, 160, 180, 200, 220, 240, 270, 300, 330, 360, 400, 450, 500, 550, 600]
+HE_SERIES = [100, 120, 140, 160, 180, 200, 220, 240, 260, 280, 300, 320, 340, 360, 400, 450, 500, 550, 600, 650, 700, 800, 900, 1000]
+UPN_SERIES = [50, 65, 80, 100, 120, 140, 160, 180, 200, 220, 240, 260, 280, 300, 320, 350, 400]
+UPE_SERIES = [80, 100, 120, 140, 160, 180, 200, 220, 240, 270, 300, 330, 360, 400]
+IPN_SERIES = [80, 100, 120, 140, 160, 180, 200, 220, 240, 260, 280, 300, 320, 340, 360, 380, 400, 425, 450, 475, 500, 550, 600]
+
+L_TRAFILATO_DIMS = [
+    "L20X20X2",
+    "L20X20X3",
+    "L30X20X2",
+    "L30X30X2",
+    "L30X30X3",
+    "L35X35X3",
+    "L35X35X5",
+    "L40X20X2",
+    "L40X30X3",
+    "L40X40X3",
+    "L40X40X5",
+    "L50X30X3",
+    "L50X40X3",
+    "L50X50X3",
+    "L50X50X5",
+    "L60X40X3",
+    "L60X50X5",
+    "L60X60X3",
+    "L60X60X5",
+]
+
+U_TRAFILATO_DIMS = [
+    "U30X15X3",
+    "U40X20X3",
+    "U50X25X4",
+    "U60X30X5",
+    "U80X40X5",
+    "U100X50X6",
+    "U120X60X6",
+    "U140X60X6",
+]
+
+T_TRAFILATO_DIMS = [
+    "T20X20X3",
+    "T25X25X3.5",
+    "T30X30X4",
+    "T35X35X4.5",
+    "T40X40X5",
+    "T45X45X5.5",
+    "T50X50X6",
+    "T60X60X7",
+    "T70X70X8",
+    "T80X80X9",
+]
+
+# serie -> altezza nominale -> area cm2 (stesso ordine delle *_SERIES)
+BEAM_AREAS_CM2: Dict[str, Dict[int, float]] = {
+    "IPE": dict(zip(IPE_SERIES, [
+        7.64, 10.3, 13.2, 16.4, 20.1, 23.9, 28.5, 33.4, 39.1, 45.9,
+        53.8, 62.6, 72.7, 84.5, 98.8, 116.0, 134.0, 156.0,
+    ])),
+    "HEA": dict(zip(HE_SERIES, [
+        21.2, 25.3, 31.4, 38.8, 45.3, 53.8, 64.3, 76.8, 86.8, 97.3, 112.5, 124.4,
+        133.5, 142.8, 159.0, 178.0, 197.5, 211.8, 226.5, 241.6, 260.5, 285.8, 320.5, 346.8,
+    ])),
+    "HEB": dict(zip(HE_SERIES, [
+        26.0, 34.0, 43.0, 54.3, 65.3, 78.1, 91.0, 106.0, 118.4, 131.4, 149.1, 161.3,
+        170.9, 180.6, 197.8, 218.0, 238.6, 254.1, 270.0, 286.3, 306.4, 334.2, 371.3, 400.0,
+    ])),
+    "HEM": dict(zip(HE_SERIES, [
+        53.2, 66.4, 80.6, 97.1, 113.3, 131.3, 149.4, 199.6, 219.6, 240.2, 303.1, 312.0,
+        315.8, 318.8, 325.8, 335.4, 344.3, 354.4, 363.7, 372.9, 383.0, 404.3, 423.6, 444.2,
+    ])),
+    "UPN": dict(zip(UPN_SERIES, [
+        7.12, 9.03, 11.0, 13.5, 17.0, 20.4, 24.0, 28.0, 32.2, 37.4, 42.3, 48.3, 53.3, 58.8, 75.8, 77.3, 91.5,
+    ])),
+    "UPE": dict(zip(UPE_SERIES, [
+        10.1, 12.5, 15.4, 18.4, 21.7, 25.1, 29.0, 33.9, 38.5, 44.8, 56.6, 67.8, 77.9, 91.9,
+    ])),
+    "IPN": dict(zip(IPN_SERIES, [
+        7.57, 10.6, 14.2, 18.2, 22.8, 27.9, 33.4, 39.5, 46.1, 53.3, 61.0, 69.0,
+        77.7, 86.7, 97.0, 107.0, 118.0, 132.0, 147.0, 163.0, 179.0, 212.0, 254.0,
+    ])),
+}
+
+# UPS non risulta una serie EN indipendente: alias commerciale della serie UPE.
+BEAM_SERIES_ALIASES = {"UPS": "UPE"}
+
+_HE_SUFFIX_RE = re.compile(r"^HE(\d+)([ABM])$")
+
+
+def normalize_designation(text: str) -> str:
+    """Designazione in forma canonica: 'IPE 200' -> IPE200, 'HE 200 A' -> HEA200, 'L 40x40x4' -> L40X40X4."""
+    s = re.sub(r"\s+", "", (text or "").upper()).replace(",", ".").replace("*", "X")
+    m = _HE_SUFFIX_RE.match(s)
+    if m:
+        s = f"HE{m.group(2)}{m.group(1)}"
+    return s
+
+
+def fmt_int_series(prefix: str, values: List[int]) -> List[str]:
+    return [f"{prefix}{int(v)}" for v in values]
+
+
+def beam_section_areas_mm2() -> Dict[str, float]:
+    """Designazione normalizzata -> area mm2 per tutte le travi in tabella (alias inclusi)."""
+    out: Dict[str, float] = {}
+    for series, areas in BEAM_AREAS_CM2.items():
+        for size, area_cm2 in areas.items():
+            out[f"{series}{size}"] = area_cm2 * 100.0
+    for alias, series in BEAM_SERIES_ALIASES.items():
+        for size, area_cm2 in BEAM_AREAS_CM2[series].items():
+            out[f"{alias}{size}"] = area_cm2 * 100.0
+    return out
+
+
+def nominal_kg_m(area_mm2: float) -> float:
+    return (area_mm2 * STEEL_DENSITY_G_CM3) / 1000.0
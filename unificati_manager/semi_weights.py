@@ -0,0 +1,264 @@
+from __future__ import annotations
+
+import math
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from . import sections
+from .utils import normalize_upper
+
+try:  # NumPy opzionale: senza, stesso calcolo riga per riga.
+    import numpy as np
+except ImportError:
+    np = None
+
+HAS_NUMPY = np is not None
+
+# Motore pesi semilavorati.
+# Una dimensione viene interpretata una sola volta in (forma, numeri); le formule
+# sotto valgono sia su float sia su colonne NumPy, quindi il calcolo massivo
+# raggruppa per forma e calcola aree e pesi di tutte le righe in un solo passaggio.
+# Travi e profilati delle serie standard passano prima dalla libreria sezioni
+# (designazione normalizzata -> area mm2, caricata una volta).
+
+_NUM_RE = re.compile(r"\d+(?:[.,]\d+)?")
+
+PROFILE_TYPES = {
+    "PROFILATI",
+    "PROFILO L",
+    "PROFILO U",
+    "PROFILO T",
+    "PROFILO L TRAFILATO",
+    "PROFILO U TRAFILATO",
+    "PROFILO T TRAFILATO",
+}
+
+SHEET_TYPE = "LAMIERE"
+
+Columns = Sequence[Any]
+
+# forma -> (numero valori, condizione di validita', area mm2)
+_SHAPES: Dict[str, Tuple[int, Callable[[Columns], Any], Callable[[Columns], Any]]] = {
+    "TONDI": (1, lambda c: c[0] > 0, lambda c: math.pi * (c[0] ** 2) / 4.0),
+    "ESAGONI": (1, lambda c: c[0] > 0, lambda c: (math.sqrt(3.0) / 2.0) * (c[0] ** 2)),
+    "PIATTI": (2, lambda c: (c[0] > 0) & (c[1] > 0), lambda c: c[0] * c[1]),
+    "TUBI": (
+        2,
+        lambda c: (c[0] > 0) & (c[1] > 0) & ((c[0] - 2.0 * c[1]) > 0),
+        lambda c: (math.pi / 4.0) * ((c[0] ** 2) - ((c[0] - 2.0 * c[1]) ** 2)),
+    ),
+    "TUBOLARI": (
+        3,
+        lambda c: (c[0] > 0) & (c[1] > 0) & (c[2] > 0) & ((c[0] - 2.0 * c[2]) > 0) & ((c[1] - 2.0 * c[2]) > 0),
+        lambda c: (c[0] * c[1]) - ((c[0] - 2.0 * c[2]) * (c[1] - 2.0 * c[2])),
+    ),
+    # L AxBxS (AxS = ali uguali)
+    "L": (
+        3,
+        lambda c: (c[0] > 0) & (c[1] > 0) & (c[2] > 0) & (c[2] < c[0]) & (c[2] < c[1]),
+        lambda c: c[2] * (c[0] + c[1] - c[2]),
+    ),
+    # U HxBxS
+    "U": (
+        3,
+        lambda c: (c[0] > 0) & (c[1] > 0) & (c[2] > 0) & ((2.0 * c[2]) < c[0]) & (c[2] < c[1]),
+        lambda c: c[2] * (c[0] + 2.0 * c[1] - 2.0 * c[2]),
+    ),
+    # U HxBxTFxTW
+    "U4": (
+        4,
+        lambda c: (c[0] > 0) & (c[1] > 0) & (c[2] > 0) & (c[3] > 0) & ((2.0 * c[2]) < c[0]) & (c[3] < c[1]),
+        lambda c: (2.0 * c[1] * c[2]) + ((c[0] - 2.0 * c[2]) * c[3]),
+    ),
+    # T BxHxS
+    "T": (
+        3,
+        lambda c: (c[0] > 0) & (c[1] > 0) & (c[2] > 0) & (c[2] < c[1]) & (c[2] < c[0]),
+        lambda c: (c[0] * c[2]) + ((c[1] - c[2]) * c[2]),
+    ),
+    # T BxHxTFxTW
+    "T4": (
+        4,
+        lambda c: (c[0] > 0) & (c[1] > 0) & (c[2] > 0) & (c[3] > 0) & (c[2] < c[1]) & (c[3] < c[0]),
+        lambda c: (c[0] * c[2]) + ((c[1] - c[2]) * c[3]),
+    ),
+    # Spessore lamiera (ultimo valore): il "peso" e' in kg/m2.
+    SHEET_TYPE: (1, lambda c: c[0] > 0, lambda c: c[0]),
+    # Area gia' nota (libreria sezioni).
+    "AREA": (1, lambda c: c[0] > 0, lambda c: c[0]),
+}
+
+# designazione normalizzata -> area mm2 (riempite in fondo al modulo)
+BEAM_SECTIONS: Dict[str, float] = {}
+PROFILE_SECTIONS: Dict[str, float] = {}
+
+
+def extract_numbers(text: str) -> List[float]:
+    return [float(tok.replace(",", ".")) for tok in _NUM_RE.findall(text or "")]
+
+
+def is_dimension_ambiguous(text: str) -> bool:
+    s = normalize_upper(text or "")
+    if not s:
+        return True
+    if re.search(r"\d+\s*-\s*\d+", s):
+        return True
+    if "VARIE" in s:
+        return True
+    return False
+
+
+@lru_cache(maxsize=16384)
+def parse_section(type_desc: str, dimension: str) -> Optional[Tuple[str, Tuple[float, ...]]]:
+    """(forma, numeri) della dimensione per il tipo semilavorato, None se non calcolabile."""
+    t = normalize_upper(type_desc or "")
+    d = normalize_upper(dimension or "")
+    if is_dimension_ambiguous(d):
+        return None
+    nums = extract_numbers(d)
+    if not nums:
+        return None
+
+    library = BEAM_SECTIONS if t.startswith("TRAV") else PROFILE_SECTIONS if t in PROFILE_TYPES else None
+    if library is not None:
+        area = library.get(sections.normalize_designation(d))
+        if area is not None:
+            return "AREA", (area,)
+
+    if t == SHEET_TYPE:
+        # Convenzione: ultimo valore numerico = spessore (es. SP3, 1000X2000X3, 40X10).
+        return SHEET_TYPE, (nums[-1],)
+
+    if t in ("TONDI", "ESAGONI", "PIATTI", "TUBI", "TUBOLARI"):
+        n = _SHAPES[t][0]
+        return (t, tuple(nums[:n])) if len(nums) >= n else None
+
+    if t in PROFILE_TYPES:
+        s = d.replace(" ", "")
+        if s.startswith("L"):
+            if len(nums) < 2:
+                return None
+            if len(nums) == 2:
+                return "L", (nums[0], nums[0], nums[1])
+            return "L", tuple(nums[:3])
+        if s.startswith("U") or s.startswith("T"):
+            if len(nums) < 3:
+                return None
+            if len(nums) >= 4:
+                return s[0] + "4", tuple(nums[:4])
+            return s[0], tuple(nums[:3])
+        return None
+
+    # TRAVI fuori libreria (serie non in tabella): peso manuale.
+    return None
+
+
+# forma -> posizione dello spessore tra i numeri interpretati
+_THICKNESS_INDEX = {"PIATTI": 1, "TUBI": 1, "TUBOLARI": 2, "L": 2, "U": 2, "T": 2, "U4": 2, "T4": 2}
+
+_SHAPE_PREFIX_RE = re.compile(r"[A-Z]+")
+
+
+def dimension_columns(
+    type_desc: str, dimension: str
+) -> Tuple[str, Optional[float], Optional[float], Optional[float], Optional[float]]:
+    """
+    Colonne numeriche di una riga dimensionale: (forma, d1, d2, d3, spessore).
+    Forma "" = non interpretabile (restano comunque i primi numeri se la dimensione non e' ambigua).
+    """
+    d = normalize_upper(dimension or "")
+    if is_dimension_ambiguous(d):
+        return "", None, None, None, None
+    parsed = parse_section(type_desc, d)
+    thickness: Optional[float] = None
+    if parsed is None:
+        shape, nums = "", tuple(extract_numbers(d))
+    elif parsed[0] == "AREA":
+        # Da libreria: forma = serie della designazione (IPE, HEA, L...).
+        key = sections.normalize_designation(d)
+        m = _SHAPE_PREFIX_RE.match(key)
+        shape, nums = (m.group(0) if m else ""), tuple(extract_numbers(key))
+        if shape in ("L", "U", "T") and len(nums) >= 3:
+            thickness = nums[2]
+    elif parsed[0] == SHEET_TYPE:
+        shape, nums = SHEET_TYPE, tuple(extract_numbers(d))
+        thickness = parsed[1][0]
+    else:
+        shape, nums = parsed
+        if shape in _THICKNESS_INDEX:
+            thickness = nums[_THICKNESS_INDEX[shape]]
+    padded = list(nums[:3]) + [None] * (3 - min(3, len(nums)))
+    return shape, padded[0], padded[1], padded[2], thickness
+
+
+def _shape_value(parsed: Optional[Tuple[str, Tuple[float, ...]]]) -> Optional[float]:
+    if parsed is None:
+        return None
+    _n, valid, formula = _SHAPES[parsed[0]]
+    if not valid(parsed[1]):
+        return None
+    return float(formula(parsed[1]))
+
+
+def section_area_mm2(type_desc: str, dimension: str) -> Optional[float]:
+    if normalize_upper(type_desc or "") == SHEET_TYPE:
+        return None
+    return _shape_value(parse_section(type_desc, dimension))
+
+
+def lamiera_thickness_mm(dimension: str) -> Optional[float]:
+    return _shape_value(parse_section(SHEET_TYPE, dimension))
+
+
+def weights_per_m(items: Iterable[Tuple[str, Optional[float], str]]) -> List[Optional[float]]:
+    """
+    Pesi per molte righe (tipo, densita g/cm3, dimensione): kg/m, oppure kg/m2 per LAMIERE.
+    None dove la dimensione non e' calcolabile o manca la densita'.
+    """
+    out: List[Optional[float]] = []
+    groups: Dict[str, Tuple[List[int], List[Tuple[float, ...]], List[float]]] = {}
+    for i, (type_desc, density, dimension) in enumerate(items):
+        out.append(None)
+        if density is None or density <= 0:
+            continue
+        parsed = parse_section(type_desc, dimension)
+        if parsed is None:
+            continue
+        idx, nums, dens = groups.setdefault(parsed[0], ([], [], []))
+        idx.append(i)
+        nums.append(parsed[1])
+        dens.append(float(density))
+
+    for shape, (idx, nums, dens) in groups.items():
+        _n, valid, formula = _SHAPES[shape]
+        scale = 1.0 if shape == SHEET_TYPE else 1000.0
+        if np is None:
+            for i, values, density in zip(idx, nums, dens):
+                if valid(values):
+                    # kg/m = area_mm2 * densita_g/cm3 / 1000 ; kg/m2 = spessore_mm * densita_g/cm3
+                    out[i] = (formula(values) * density) / scale
+            continue
+        arr = np.asarray(nums, dtype=float)
+        cols = [arr[:, k] for k in range(arr.shape[1])]
+        with np.errstate(invalid="ignore", over="ignore"):
+            mask = valid(cols)
+            weights = (formula(cols) * np.asarray(dens, dtype=float)) / scale
+        for i, ok, w in zip(idx, mask.tolist(), weights.tolist()):
+            if ok:
+                out[i] = w
+    return out
+
+
+def _profile_section_areas() -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    for dim in sections.L_TRAFILATO_DIMS + sections.U_TRAFILATO_DIMS + sections.T_TRAFILATO_DIMS:
+        area = section_area_mm2("PROFILATI", dim)
+        if area is not None:
+            out[sections.normalize_designation(dim)] = area
+    return out
+
+
+BEAM_SECTIONS.update(sections.beam_section_areas_mm2())
+PROFILE_SECTIONS.update(_profile_section_areas())
+parse_section.cache_clear()
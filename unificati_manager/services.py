@@ -2,19 +2,32 @@ from __future__ import annotations
 
 import os
 import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import FIRST_EXCEPTION, Future, ThreadPoolExecutor
+from concurrent.futures import wait as wait_futures
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from functools import wraps
-from typing import Any, Dict, List, Optional, Set
+from functools import partial, wraps
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
 
 from .config import (
     AUTO_BACKUP_ON_CLOSE,
     AUTO_BACKUP_ON_STARTUP,
-    BACKUP_FILE_PREFIX,
     BACKUP_INTERVAL_HOURS,
     BACKUP_KEEP_LAST,
-    get_backup_dir,
+    CHANGE_LOG_KEEP_DAYS,
+    DATE_FMT,
+    QUERY_CACHE_MAX_ENTRIES,
+    QUERY_CACHE_MAX_ROWS_PER_ENTRY,
+    get_backup_store_dir,
+    get_commerciali_db_path,
+    get_materiali_db_path,
+    get_normati_db_path,
 )
+from .backup_store import BackupStore, StoredFile
 from .db import Database
+from .db_diff import diff_databases
 from .utils import ensure_dir
 
 _SCOPE_MAIN = "MAIN"
@@ -35,7 +48,10 @@ _METHOD_SCOPE_MAP: Dict[str, str] = {
     "fetch_standards": _SCOPE_NORMATI,
     "fetch_subcategories": _SCOPE_NORMATI,
     "get_next_seq": _SCOPE_NORMATI,
+    "reserve_item_seqs": _SCOPE_NORMATI,
     "search_items": _SCOPE_NORMATI,
+    "search_items_page": _SCOPE_NORMATI,
+    "item_matches_search": _SCOPE_NORMATI,
     "read_item": _SCOPE_NORMATI,
     "create_category": _SCOPE_NORMATI,
     "update_category": _SCOPE_NORMATI,
@@ -49,12 +65,16 @@ _METHOD_SCOPE_MAP: Dict[str, str] = {
     "create_item": _SCOPE_NORMATI,
     "update_item": _SCOPE_NORMATI,
     "delete_item": _SCOPE_NORMATI,
+    "refresh_item_attributes": _SCOPE_NORMATI,
     # Commerciali
     "fetch_comm_categories": _SCOPE_COMMERCIALI,
     "fetch_comm_subcategories": _SCOPE_COMMERCIALI,
     "fetch_suppliers": _SCOPE_COMMERCIALI,
     "get_next_comm_seq": _SCOPE_COMMERCIALI,
+    "reserve_comm_seqs": _SCOPE_COMMERCIALI,
     "search_comm_items": _SCOPE_COMMERCIALI,
+    "search_comm_items_page": _SCOPE_COMMERCIALI,
+    "comm_item_matches_search": _SCOPE_COMMERCIALI,
     "read_comm_item": _SCOPE_COMMERCIALI,
     "create_comm_category": _SCOPE_COMMERCIALI,
     "update_comm_category": _SCOPE_COMMERCIALI,
@@ -81,11 +101,14 @@ _METHOD_SCOPE_MAP: Dict[str, str] = {
     "ensure_default_material_properties_all": _SCOPE_MATERIALI,
     "ensure_material_taxonomy_entry": _SCOPE_MATERIALI,
     "search_materials": _SCOPE_MATERIALI,
+    "material_matches_search": _SCOPE_MATERIALI,
     "read_material": _SCOPE_MATERIALI,
     "create_material": _SCOPE_MATERIALI,
     "update_material": _SCOPE_MATERIALI,
     "delete_material": _SCOPE_MATERIALI,
     "fetch_material_properties": _SCOPE_MATERIALI,
+    "fetch_material_property_groups": _SCOPE_MATERIALI,
+    "fetch_material_property_summaries": _SCOPE_MATERIALI,
     "read_material_property_notes": _SCOPE_MATERIALI,
     "create_material_property": _SCOPE_MATERIALI,
     "update_material_property": _SCOPE_MATERIALI,
@@ -109,6 +132,7 @@ _METHOD_SCOPE_MAP: Dict[str, str] = {
     "update_semi_state": _SCOPE_MATERIALI,
     "delete_semi_state": _SCOPE_MATERIALI,
     "search_semi_items": _SCOPE_MATERIALI,
+    "search_semi_items_page": _SCOPE_MATERIALI,
     "fetch_semis_by_material": _SCOPE_MATERIALI,
     "read_semi_item": _SCOPE_MATERIALI,
     "create_semi_item": _SCOPE_MATERIALI,
@@ -120,7 +144,14 @@ _METHOD_SCOPE_MAP: Dict[str, str] = {
     "delete_semi_dimension": _SCOPE_MATERIALI,
     "clone_semi_dimensions": _SCOPE_MATERIALI,
     "read_material_density_g_cm3": _SCOPE_MATERIALI,
+    "read_material_densities_g_cm3": _SCOPE_MATERIALI,
     "calculate_semi_weight_per_m": _SCOPE_MATERIALI,
+    "calculate_semi_weights": _SCOPE_MATERIALI,
+    "calculate_semi_dimension_weights": _SCOPE_MATERIALI,
+    "update_semi_dimension_weights": _SCOPE_MATERIALI,
+    "refresh_semi_dimension_numbers": _SCOPE_MATERIALI,
+    "search_semi_dimensions_range": _SCOPE_MATERIALI,
+    "find_nearest_semi_dimensions": _SCOPE_MATERIALI,
     # Manuale (ospitato su DB Normati)
     "fetch_manual_versions": _SCOPE_NORMATI,
     "read_manual_version": _SCOPE_NORMATI,
@@ -140,9 +171,29 @@ _WRITE_METHODS.update(
         "ensure_default_material_properties_all",
         "ensure_material_taxonomy_entry",
         "clone_semi_dimensions",
+        "refresh_semi_dimension_numbers",
+        "refresh_item_attributes",
+        "reserve_item_seqs",
+        "reserve_comm_seqs",
     }
 )
 
+# Letture mai servite da cache: il progressivo deve sempre riflettere il DB.
+_UNCACHED_READ_METHODS: Set[str] = {
+    "get_next_seq",
+    "get_next_comm_seq",
+}
+
+# Funzione di apertura: accetta le opzioni di Database (es. check_same_thread per il prefetch).
+DatabaseSource = Union[Database, Callable[..., Database]]
+
+# Percorso di default del DB di ogni area (per backup ed elenchi senza aprire il DB).
+_SCOPE_DEFAULT_PATHS: Dict[str, Callable[[], str]] = {
+    _SCOPE_NORMATI: get_normati_db_path,
+    _SCOPE_COMMERCIALI: get_commerciali_db_path,
+    _SCOPE_MATERIALI: get_materiali_db_path,
+}
+
 
 def _normalize_scope(scope: Optional[str]) -> str:
     raw = (scope or _SCOPE_MAIN).strip().upper()
@@ -156,36 +207,160 @@ def _scope_label(scope: str) -> str:
     return _SCOPE_LABELS.get(key, key)
 
 
+class BackupJob:
+    """
+    Backup delle tre aree in corso su thread di lavoro (una copia per area, in parallelo).
+    `progress()` = frazione copiata 0..1; `result()` attende e ritorna l'id snapshot dell'archivio.
+    """
+
+    def __init__(self, reason: str, plan: List[Tuple[str, str, str]]) -> None:
+        # (area, DB sorgente, copia temporanea prima dell'archivio)
+        self.reason = reason
+        self.plan = plan
+        self.outputs = [out_path for _area, _src, out_path in plan]
+        self.future: Future = Future()
+        self._pages: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+
+    def _on_progress(self, area: str, remaining: int, total: int) -> None:
+        if self._cancelled.is_set():
+            raise RuntimeError("Backup annullato.")
+        with self._lock:
+            self._pages[area] = (remaining, total)
+
+    def progress(self) -> float:
+        if self.future.done():
+            return 1.0
+        with self._lock:
+            total = sum(t for _r, t in self._pages.values())
+            copied = sum(t - r for r, t in self._pages.values())
+        return (copied / total) if total > 0 else 0.0
+
+    def cancel(self) -> None:
+        """Interrompe le copie al passo successivo: nessun file parziale resta nei backup."""
+        self._cancelled.set()
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        wait_futures([self.future], timeout=timeout)
+        return self.future.done()
+
+    def result(self, timeout: Optional[float] = None) -> int:
+        return self.future.result(timeout)
+
+
 class AppService:
     """Service layer che instrada le chiamate verso il DB corretto per area."""
 
     def __init__(
         self,
-        db_normati: Database,
-        db_commerciali: Database,
-        db_materiali: Database,
+        db_normati: DatabaseSource,
+        db_commerciali: DatabaseSource,
+        db_materiali: DatabaseSource,
         editor_scope: Optional[str] = None,
+        db_paths: Optional[Dict[str, str]] = None,
     ) -> None:
-        self._db_normati = db_normati
-        self._db_commerciali = db_commerciali
-        self._db_materiali = db_materiali
-        self._db_by_scope = {
-            _SCOPE_NORMATI: self._db_normati,
-            _SCOPE_COMMERCIALI: self._db_commerciali,
-            _SCOPE_MATERIALI: self._db_materiali,
+        # Ogni area puo' arrivare gia' aperta oppure come funzione che apre il DB
+        # al primo utilizzo (apertura lazy: le aree mai visitate non vengono aperte).
+        # `db_paths`: file delle aree non ancora aperte, se diversi dalla configurazione.
+        self._db_sources: Dict[str, DatabaseSource] = {
+            _SCOPE_NORMATI: db_normati,
+            _SCOPE_COMMERCIALI: db_commerciali,
+            _SCOPE_MATERIALI: db_materiali,
+        }
+        self._db_by_scope: Dict[str, Database] = {
+            key: src for key, src in self._db_sources.items() if isinstance(src, Database)
         }
+        self._area_paths: Dict[str, str] = {_normalize_scope(k): v for k, v in (db_paths or {}).items()}
+        self._open_lock = threading.RLock()
         self._editor_scope = _normalize_scope(editor_scope)
-        self._active_db = self._db_by_scope.get(self._editor_scope, self._db_normati)
+        # Cache LRU letture: chiave (area, metodo, argomenti), invalidata per area
+        # quando cambia PRAGMA data_version (commit di altre sessioni) o dopo una scrittura.
+        self._cache: "OrderedDict[tuple, Any]" = OrderedDict()
+        self._cache_data_versions: Dict[str, int] = {}
+        self._cache_lock = threading.RLock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # DB con una transaction() aperta, per thread (le scritture del blocco vanno li').
+        self._tx_local = threading.local()
+        self._backup_jobs: Set[BackupJob] = set()
+        self._backup_lock = threading.Lock()
+        # Aperture di aree in corso su thread di lavoro (vedi open_area_async).
+        self._area_prefetches: Set[Future] = set()
 
     def _db_for_scope(self, scope: str) -> Database:
         key = _normalize_scope(scope)
-        if key == _SCOPE_NORMATI:
-            return self._db_normati
-        if key == _SCOPE_COMMERCIALI:
-            return self._db_commerciali
-        if key == _SCOPE_MATERIALI:
-            return self._db_materiali
-        return self._active_db
+        if key not in self._db_sources:
+            key = self._editor_scope if self._editor_scope in self._db_sources else _SCOPE_NORMATI
+        db = self._db_by_scope.get(key)
+        if db is not None:
+            return db
+        with self._open_lock:
+            db = self._db_by_scope.get(key)
+            if db is None:
+                db = self._db_sources[key]()
+                self._db_by_scope[key] = db
+            return db
+
+    @property
+    def _active_db(self) -> Database:
+        return self._db_for_scope(self._editor_scope)
+
+    def _area_path(self, scope: str) -> str:
+        """File del DB dell'area senza aprirlo (niente lock ne' migrazioni sulle aree non visitate)."""
+        key = _normalize_scope(scope)
+        db = self._db_by_scope.get(key)
+        if db is not None:
+            return db.path
+        path = os.path.abspath(self._area_paths.get(key) or _SCOPE_DEFAULT_PATHS[key]())
+        if not os.path.exists(path):
+            # Area mai creata: l'apertura crea il DB con lo schema completo.
+            return self._db_for_scope(key).path
+        return path
+
+    def is_area_open(self, scope: str) -> bool:
+        return _normalize_scope(scope) in self._db_by_scope
+
+    def open_area_async(self, scope: str, warm: Optional[Callable[["AppService"], Any]] = None) -> Future:
+        """
+        Prefetch dell'area su un thread di lavoro: apre il DB (migrazioni incluse) e con
+        `warm(service)` esegue le prime letture, che restano nella cache. La connessione
+        principale resta del thread di lavoro finche' il thread Tk, a Future concluso, non
+        chiama `adopt_area()`; nel frattempo le sue letture vanno sul pool dell'area.
+        Area gia' aperta: nessuna lettura anticipata. Il Future ritorna True se ha aperto.
+        """
+        key = _normalize_scope(scope)
+        future: Future = Future()
+
+        def _run() -> None:
+            try:
+                with self._open_lock:
+                    opened = key in self._db_sources and key not in self._db_by_scope
+                    if opened:
+                        self._db_by_scope[key] = self._db_sources[key](check_same_thread=False)
+                if opened and warm is not None:
+                    warm(self)
+            except BaseException as exc:
+                future.set_exception(exc)
+            else:
+                future.set_result(opened)
+            finally:
+                with self._backup_lock:
+                    self._area_prefetches.discard(future)
+
+        with self._backup_lock:
+            self._area_prefetches.add(future)
+        threading.Thread(target=_run, name=f"prefetch-{key.lower()}", daemon=True).start()
+        return future
+
+    def adopt_area(self, scope: str) -> None:
+        """Riporta al thread chiamante la connessione principale aperta da `open_area_async`."""
+        db = self._db_by_scope.get(_normalize_scope(scope))
+        if db is not None and not db.on_owner_thread():
+            db.adopt_owner_thread()
 
     def __getattr__(self, name: str) -> Any:
         target_scope = _METHOD_SCOPE_MAP.get(name)
@@ -195,15 +370,152 @@ class AppService:
             return target
 
         if name not in _WRITE_METHODS:
-            return target
+            if target_scope is not None and not target_db.on_owner_thread():
+                # Thread di lavoro: lettura su una connessione del pool dell'area, senza
+                # cache (PRAGMA data_version vale per la singola connessione).
+                @wraps(target)
+                def pooled(*args, **kwargs):
+                    with target_db.reader_pool().reader() as reader:
+                        return getattr(reader, name)(*args, **kwargs)
+
+                return pooled
+
+            if target_scope is None or name in _UNCACHED_READ_METHODS or QUERY_CACHE_MAX_ENTRIES <= 0:
+                return target
+
+            @wraps(target)
+            def cached(*args, **kwargs):
+                return self._cached_call(target_scope, name, target, args, kwargs)
+
+            return cached
 
         @wraps(target)
         def guarded(*args, **kwargs):
-            self._assert_scope_for_write(name, target_scope or _SCOPE_MAIN)
-            return target(*args, **kwargs)
+            # Forma bloccante per script e chiamanti fuori da Tk; la UI usa
+            # submit_write() con after() (ui_utils.submit_ui_write).
+            return self.submit_write(name, *args, **kwargs).result()
 
         return guarded
 
+    def submit_write(self, name: str, *args: Any, **kwargs: Any) -> Future:
+        """
+        Accoda la scrittura `name(*args, **kwargs)` sul thread di scrittura dell'area
+        e ritorna subito un Future (risolto dopo il commit del gruppo).
+        """
+        target_scope = _METHOD_SCOPE_MAP.get(name) or _SCOPE_MAIN
+        self._assert_scope_for_write(name, target_scope)
+        db = self._db_for_scope(target_scope)
+        if db in self._open_transactions():
+            # Dentro transaction(): esecuzione diretta, il commit lo fa il blocco.
+            future: Future = Future()
+            try:
+                future.set_result(getattr(db, name)(*args, **kwargs))
+            except Exception as exc:
+                future.set_exception(exc)
+            finally:
+                self.invalidate_cache(target_scope)
+            return future
+        future = db.write_executor().call(name, *args, **kwargs)
+        future.add_done_callback(lambda _f: self.invalidate_cache(target_scope))
+        return future
+
+    def _open_transactions(self) -> List[Database]:
+        stack = getattr(self._tx_local, "dbs", None)
+        if stack is None:
+            stack = self._tx_local.dbs = []
+        return stack
+
+    @contextmanager
+    def transaction(self, scope: str) -> Iterator[Database]:
+        """
+        Unita' di lavoro sull'area: le scritture chiamate nel blocco (dallo stesso
+        thread) girano sul DB dell'area senza commit per metodo; un solo commit
+        all'uscita, rollback se il blocco solleva. Blocchi annidati = SAVEPOINT.
+        Va aperta dal thread che ha aperto il DB (thread Tk o script).
+        """
+        key = _normalize_scope(scope)
+        self._assert_scope_for_write("transaction", key)
+        db = self._db_for_scope(key)
+        if not db.on_owner_thread():
+            raise RuntimeError("transaction() va usata dal thread che ha aperto il database.")
+        stack = self._open_transactions()
+        stack.append(db)
+        try:
+            with db.transaction():
+                yield db
+        finally:
+            stack.pop()
+            self.invalidate_cache(key)
+
+    def _cached_call(self, scope: str, name: str, target: Any, args: tuple, kwargs: Dict[str, Any]) -> Any:
+        key = (scope, name, args, tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            return target(*args, **kwargs)
+        with self._cache_lock:
+            self._check_data_version(scope)
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return self._cache_copy(self._cache[key])
+            self.cache_misses += 1
+        value = target(*args, **kwargs)
+        size = len(value["rows"]) if isinstance(value, dict) and "rows" in value else (
+            len(value) if isinstance(value, (list, tuple)) else 1
+        )
+        if size <= QUERY_CACHE_MAX_ROWS_PER_ENTRY:
+            with self._cache_lock:
+                self._cache[key] = value
+                while len(self._cache) > QUERY_CACHE_MAX_ENTRIES:
+                    self._cache.popitem(last=False)
+        return self._cache_copy(value)
+
+    @staticmethod
+    def _cache_copy(value: Any) -> Any:
+        # Copia superficiale: il chiamante puo' modificare liste/dict senza sporcare la cache.
+        if isinstance(value, list):
+            return list(value)
+        if isinstance(value, dict):
+            return dict(value)
+        return value
+
+    def _check_data_version(self, scope: str) -> None:
+        db = self._db_for_scope(scope)
+        try:
+            version = int(db.conn.execute("PRAGMA data_version").fetchone()[0])
+        except Exception:
+            self.invalidate_cache(scope)
+            return
+        if self._cache_data_versions.get(scope) != version:
+            self.invalidate_cache(scope)
+            self._cache_data_versions[scope] = version
+
+    def _scopes_sharing_db(self, scope: str) -> Set[str]:
+        key = _normalize_scope(scope)
+        db = self._db_by_scope.get(key)
+        if db is None:
+            return {key}
+        return {other_key for other_key, other in self._db_by_scope.items() if other is db} | {key}
+
+    def invalidate_cache(self, scope: Optional[str] = None) -> None:
+        """Svuota la cache letture (tutta o solo dell'area indicata e di quelle sullo stesso DB)."""
+        with self._cache_lock:
+            if scope is None or _normalize_scope(scope) == _SCOPE_MAIN:
+                self._cache.clear()
+                return
+            scopes = self._scopes_sharing_db(scope)
+            for key in [k for k in self._cache if k[0] in scopes]:
+                del self._cache[key]
+
+    def cache_stats(self) -> Dict[str, int]:
+        with self._cache_lock:
+            return {
+                "hits": self.cache_hits,
+                "misses": self.cache_misses,
+                "entries": len(self._cache),
+            }
+
     @property
     def db_path(self) -> str:
         return self._active_db.path
@@ -211,18 +523,70 @@ class AppService:
     @property
     def db_paths(self) -> Dict[str, str]:
         return {
-            _SCOPE_NORMATI: self._db_normati.path,
-            _SCOPE_COMMERCIALI: self._db_commerciali.path,
-            _SCOPE_MATERIALI: self._db_materiali.path,
+            key: self._area_path(key)
+            for key in (_SCOPE_NORMATI, _SCOPE_COMMERCIALI, _SCOPE_MATERIALI)
         }
 
     @property
     def editor_scope(self) -> str:
         return self._editor_scope
 
+    def open_reader(self, method_name: str) -> Database:
+        """
+        Connessione di sola lettura (dal pool) sul DB dell'area del metodo indicato,
+        da usare in un thread di lavoro (es. ricerca in background). close() la
+        restituisce al pool.
+        """
+        db = self._db_for_scope(_METHOD_SCOPE_MAP.get(method_name) or _SCOPE_MAIN)
+        return db.reader_pool().acquire()
+
+    def last_change_seq(self, scope: str) -> int:
+        return self._db_for_scope(scope).last_change_seq()
+
+    def changes_since(
+        self,
+        scope: str,
+        since_seq: int,
+        tables: Optional[List[str]] = None,
+        limit: int = 0,
+    ) -> List[Dict[str, Any]]:
+        """Modifiche dell'area dopo `since_seq` dal journal del suo DB (vedi Database.changes_since)."""
+        db = self._db_for_scope(scope)
+        if not db.on_owner_thread():
+            with db.reader_pool().reader() as reader:
+                return reader.changes_since(since_seq, tables=tables, limit=limit)
+        return db.changes_since(since_seq, tables=tables, limit=limit)
+
+    def compact_change_logs(self, keep_days: int = CHANGE_LOG_KEEP_DAYS) -> List[Future]:
+        """
+        Compatta il journal modifiche delle aree aperte e scrivibili da questa sessione,
+        sul thread di scrittura di ogni area. Ritorna i Future (voci eliminate).
+        """
+        futures: List[Future] = []
+        seen: Set[int] = set()
+        for scope in (_SCOPE_NORMATI, _SCOPE_COMMERCIALI, _SCOPE_MATERIALI):
+            db = self._db_by_scope.get(scope)
+            if db is None or id(db) in seen:
+                continue
+            seen.add(id(db))
+            try:
+                self._assert_scope_for_write("compact_change_log", scope)
+            except PermissionError:
+                continue
+            futures.append(db.write_executor().call("compact_change_log", keep_days))
+        return futures
+
     def close(self) -> None:
+        # Un backup in corso viene completato: i file restano coerenti anche in chiusura.
+        with self._backup_lock:
+            jobs = list(self._backup_jobs)
+            prefetches = list(self._area_prefetches)
+        for job in jobs:
+            job.wait()
+        # Prima di chiudere, le aperture in corso (il DB aperto finisce in _db_by_scope).
+        wait_futures(prefetches)
         seen: Set[int] = set()
-        for db in (self._db_normati, self._db_commerciali, self._db_materiali):
+        for db in list(self._db_by_scope.values()):
             if id(db) in seen:
                 continue
             seen.add(id(db))
@@ -240,69 +604,106 @@ class AppService:
             f"Operazione {method_name} consentita solo su {_scope_label(required_scope)}."
         )
 
-    def create_periodic_backup(self, reason: str, force: bool = False) -> Optional[str]:
+    def create_periodic_backup(self, reason: str, force: bool = False) -> Optional[int]:
+        job = self.start_periodic_backup(reason, force=force)
+        return job.result() if job is not None else None
+
+    def start_periodic_backup(self, reason: str, force: bool = False) -> Optional[BackupJob]:
+        """Come `create_periodic_backup`, ma non bloccante: ritorna il job (None se non dovuto)."""
         reason_key = (reason or "").strip().lower()
         if not force:
             if reason_key == "startup" and not AUTO_BACKUP_ON_STARTUP:
                 return None
             if reason_key in {"close", "shutdown"} and not AUTO_BACKUP_ON_CLOSE:
                 return None
+            with self._backup_lock:
+                running = next(iter(self._backup_jobs), None)
+            if running is not None:
+                return running
 
-            last = self._latest_backup_path()
+            # Ultimo snapshot completo dal manifest (non quelli di una sola area, es. patch dati).
+            last = BackupStore(get_backup_store_dir()).latest(min_files=3)
             if last:
                 min_hours = max(1, int(BACKUP_INTERVAL_HOURS))
-                age = datetime.now() - datetime.fromtimestamp(os.path.getmtime(last))
+                age = datetime.now() - datetime.strptime(last["created_at"], DATE_FMT)
                 if age < timedelta(hours=min_hours):
                     return None
 
-        return self.create_backup(reason_key or "auto")
+        return self.start_backup(reason_key or "auto")
 
-    def create_backup(self, reason: str = "manual") -> str:
-        ensure_dir(get_backup_dir())
+    def create_backup(self, reason: str = "manual") -> int:
+        return self.start_backup(reason).result()
+
+    def start_backup(self, reason: str = "manual") -> BackupJob:
+        """Avvia il backup delle tre aree su thread di lavoro e ritorna subito il job."""
+        tmp_dir = os.path.join(get_backup_store_dir(), "tmp")
+        ensure_dir(tmp_dir)
         stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         tag = re.sub(r"[^a-z0-9_-]+", "_", (reason or "manual").lower()).strip("_") or "manual"
 
-        outputs: List[str] = []
-        plan = [
-            ("normati", self._db_normati),
-            ("commerciali", self._db_commerciali),
-            ("materiali", self._db_materiali),
-        ]
-        for suffix, db in plan:
-            filename = f"{BACKUP_FILE_PREFIX}_{stamp}_{tag}_{suffix}.db"
-            out_path = os.path.join(get_backup_dir(), filename)
-            db.backup_to_path(out_path)
-            outputs.append(out_path)
-
-        self._prune_backups()
-        return ";".join(outputs)
-
-    def _list_backup_paths(self) -> List[str]:
-        bdir = get_backup_dir()
-        if not os.path.isdir(bdir):
-            return []
-        names = [
-            n for n in os.listdir(bdir)
-            if n.startswith(BACKUP_FILE_PREFIX + "_") and n.endswith(".db")
-        ]
-        return [os.path.join(bdir, n) for n in names]
-
-    def _latest_backup_path(self) -> Optional[str]:
-        paths = self._list_backup_paths()
-        if not paths:
-            return None
-        paths.sort(key=lambda p: os.path.getmtime(p), reverse=True)
-        return paths[0]
-
-    def _prune_backups(self) -> None:
-        # Ogni backup logico produce 3 file (normati/commerciali/materiali).
-        keep = max(1, int(BACKUP_KEEP_LAST)) * 3
-        paths = self._list_backup_paths()
-        if len(paths) <= keep:
-            return
-        paths.sort(key=lambda p: os.path.getmtime(p), reverse=True)
-        for old_path in paths[keep:]:
-            try:
-                os.remove(old_path)
-            except OSError:
-                pass
+        plan: List[Tuple[str, str, str]] = []
+        for suffix, scope in (
+            ("normati", _SCOPE_NORMATI),
+            ("commerciali", _SCOPE_COMMERCIALI),
+            ("materiali", _SCOPE_MATERIALI),
+        ):
+            filename = f"{stamp}_{tag}_{suffix}.db"
+            plan.append((suffix, self._area_path(scope), os.path.join(tmp_dir, filename)))
+
+        job = BackupJob(tag, plan)
+        with self._backup_lock:
+            self._backup_jobs.add(job)
+        threading.Thread(target=self._run_backup, args=(job,), name="backup", daemon=True).start()
+        return job
+
+    def _run_backup(self, job: BackupJob) -> None:
+        snapshot_id: Optional[int] = None
+        error: Optional[BaseException] = None
+        try:
+            # Un backup alla volta sull'archivio (anche fra piu' postazioni/processi).
+            store = BackupStore(get_backup_store_dir())
+            with store.exclusive():
+                with ThreadPoolExecutor(max_workers=len(job.plan), thread_name_prefix="backup") as pool:
+                    futures = {
+                        area: pool.submit(self._backup_area, store, job, area, src_path, out_path)
+                        for area, src_path, out_path in job.plan
+                    }
+                    wait_futures(list(futures.values()), return_when=FIRST_EXCEPTION)
+                    if any(f.done() and f.exception() is not None for f in futures.values()):
+                        job.cancel()
+                # Snapshot valido solo con tutte e tre le aree.
+                files = {area: f.result() for area, f in futures.items()}
+                snapshot_id = store.add_snapshot(job.reason, files)
+                store.prune(BACKUP_KEEP_LAST)
+        except BaseException as exc:
+            error = exc
+        finally:
+            for out_path in job.outputs:
+                try:
+                    os.remove(out_path)
+                except OSError:
+                    pass
+            with self._backup_lock:
+                self._backup_jobs.discard(job)
+        # Esito pubblicato dopo l'uscita dai job in corso (il controllo periodico non lo vede piu').
+        if error is not None:
+            job.future.set_exception(error)
+        else:
+            job.future.set_result(snapshot_id)
+
+    @staticmethod
+    def _backup_area(store: BackupStore, job: BackupJob, area: str, src_path: str, out_path: str) -> StoredFile:
+        # Copia consistente del DB, poi blocchi nell'archivio (solo quelli nuovi vengono scritti).
+        Database.backup_file(src_path, out_path, progress=partial(job._on_progress, area))
+        return store.put_file(out_path, file_name=os.path.basename(src_path))
+
+    def list_backups(self) -> List[Dict[str, Any]]:
+        return BackupStore(get_backup_store_dir()).list_snapshots()
+
+    def restore_backup(self, snapshot_id: int, target_dir: str) -> Dict[str, str]:
+        """Ricostruisce uno snapshot in `target_dir` (i DB in uso non vengono toccati)."""
+        return BackupStore(get_backup_store_dir()).restore(snapshot_id, target_dir)
+
+    def diff_area(self, scope: str, other_path: str, tables: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Differenze tra il DB dell'area (lato A) e un altro DB, es. snapshot ricostruito o copia di un'altra sede."""
+        return diff_databases(self._db_for_scope(scope).path, other_path, tables)
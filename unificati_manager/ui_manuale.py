@@ -7,7 +7,7 @@ import customtkinter as ctk
 from tkinter import messagebox, ttk
 
 from .services import AppService
-from .ui_utils import make_treeview_sortable
+from .ui_utils import make_treeview_sortable, show_write_error, submit_ui_write
 
 
 def _row_str(r: Any, key: str, default: str = "") -> str:
@@ -115,6 +115,11 @@ class ManualeTab(ctk.CTkFrame):
         outer.add(left, weight=2)
         outer.add(right, weight=3)
 
+    @staticmethod
+    def prefetch(db: AppService) -> None:
+        """Elenco iniziale (ricerca vuota), letto dal thread di prefetch dell'area."""
+        db.fetch_manual_versions("")
+
     def refresh_list(self) -> None:
         for k in self.tree.get_children(""):
             self.tree.delete(k)
@@ -185,26 +190,39 @@ class ManualeTab(ctk.CTkFrame):
         if not updates:
             messagebox.showwarning("Manuale", "Compila AGGIORNAMENTI.")
             return
-        try:
-            if self.entry_id is None:
-                self.entry_id = self.db.create_manual_version(version, release_date, updates)
+        entry_id = self.entry_id
+
+        def saved(new_id) -> None:
+            if entry_id is None:
+                if self.entry_id is None:
+                    self.entry_id = new_id
                 messagebox.showinfo("Manuale", "Versione creata.")
             else:
-                self.db.update_manual_version(self.entry_id, version, release_date, updates)
                 messagebox.showinfo("Manuale", "Versione aggiornata.")
             self.refresh_list()
-            self._select_item_row_if_present(self.entry_id)
-        except Exception as e:
-            messagebox.showerror("Manuale", f"Errore salvataggio: {e}")
+            self._select_item_row_if_present(entry_id if entry_id is not None else new_id)
+
+        if entry_id is None:
+            write = ("create_manual_version", version, release_date, updates)
+        else:
+            write = ("update_manual_version", entry_id, version, release_date, updates)
+        submit_ui_write(self, self.db, *write, on_done=saved, on_error=show_write_error("Manuale", "Errore salvataggio: {e}"))
 
     def delete_entry(self) -> None:
         if self.entry_id is None:
             return
         if not messagebox.askyesno("Manuale", "Eliminare la versione selezionata?"):
             return
-        try:
-            self.db.delete_manual_version(self.entry_id)
+
+        def deleted(_r) -> None:
             self.new_entry()
             self.refresh_list()
-        except Exception as e:
-            messagebox.showerror("Manuale", f"Errore eliminazione: {e}")
+
+        submit_ui_write(
+            self,
+            self.db,
+            "delete_manual_version",
+            self.entry_id,
+            on_done=deleted,
+            on_error=show_write_error("Manuale", "Errore eliminazione: {e}"),
+        )
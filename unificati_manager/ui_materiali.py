@@ -6,7 +6,15 @@ import customtkinter as ctk
 from tkinter import ttk, messagebox
 
 from .services import AppService
-from .ui_utils import bind_uppercase, make_treeview_sortable
+from .ui_utils import (
+    BackgroundSearch,
+    PagedTreeLoader,
+    TreeSync,
+    bind_uppercase,
+    make_treeview_sortable,
+    show_write_error,
+    submit_ui_write,
+)
 from .utils import normalize_upper
 
 
@@ -113,17 +121,25 @@ class MaterialPropertyBox(ctk.CTkFrame):
         # Proprieta materiale senza legame a stati: no-op.
         return
 
-    def set_material(self, material_id: Optional[int]) -> None:
+    def set_material(self, material_id: Optional[int], rows: Optional[List[Any]] = None) -> None:
         self.material_id = material_id
         self.new_prop()
-        self.refresh()
+        self.refresh(rows)
 
-    def refresh(self) -> None:
+    @staticmethod
+    def set_material_all(db: AppService, material_id: Optional[int], boxes: List["MaterialPropertyBox"]) -> None:
+        """Carica tutti i gruppi (CHEM/PHYS/MECH) delle box con una sola query."""
+        groups = db.fetch_material_property_groups(material_id) if material_id else {}
+        for box in boxes:
+            box.set_material(material_id, rows=groups.get(box.group_code, []))
+
+    def refresh(self, rows: Optional[List[Any]] = None) -> None:
         for k in self.tree.get_children(""):
             self.tree.delete(k)
         if not self.material_id:
             return
-        rows = self.db.fetch_material_properties(self.material_id, self.group_code)
+        if rows is None:
+            rows = self.db.fetch_material_properties(self.material_id, self.group_code)
         for r in rows:
             self.tree.insert(
                 "",
@@ -187,47 +203,63 @@ class MaterialPropertyBox(ctk.CTkFrame):
         except Exception:
             ordv = 0
 
-        try:
-            if self.prop_id is None:
-                self.db.create_material_property(
-                    self.material_id,
-                    self.group_code,
-                    state_code,
-                    name,
-                    self.var_unit.get(),
-                    self.var_value.get(),
-                    self.var_min.get(),
-                    self.var_max.get(),
-                    self.var_notes.get(),
-                    ordv,
-                )
-            else:
-                self.db.update_material_property(
-                    self.prop_id,
-                    state_code,
-                    self.var_unit.get(),
-                    self.var_value.get(),
-                    self.var_min.get(),
-                    self.var_max.get(),
-                    self.var_notes.get(),
-                    ordv,
-                )
+        if self.prop_id is None:
+            write = (
+                "create_material_property",
+                self.material_id,
+                self.group_code,
+                state_code,
+                name,
+                self.var_unit.get(),
+                self.var_value.get(),
+                self.var_min.get(),
+                self.var_max.get(),
+                self.var_notes.get(),
+                ordv,
+            )
+        else:
+            write = (
+                "update_material_property",
+                self.prop_id,
+                state_code,
+                self.var_unit.get(),
+                self.var_value.get(),
+                self.var_min.get(),
+                self.var_max.get(),
+                self.var_notes.get(),
+                ordv,
+            )
+
+        def saved(_r) -> None:
             self.refresh()
             messagebox.showinfo("Proprietà", "Salvato.")
-        except Exception as e:
-            messagebox.showerror("Proprietà", f"Errore salvataggio: {e}")
+
+        submit_ui_write(
+            self,
+            self.db,
+            *write,
+            on_done=saved,
+            on_error=show_write_error("Proprietà", "Errore salvataggio: {e}"),
+        )
 
     def delete_prop(self) -> None:
         if self.prop_id is None:
             return
         if not messagebox.askyesno("Proprietà", "Eliminare la proprietà selezionata?"):
             return
-        try:
-            self.db.delete_material_property(self.prop_id)
+
+        def deleted(_r) -> None:
             self.new_prop()
             self.refresh()
-        except Exception as e:
-            messagebox.showerror("Proprietà", f"Errore eliminazione: {e}")
+
+        submit_ui_write(
+            self,
+            self.db,
+            "delete_material_property",
+            self.prop_id,
+            on_done=deleted,
+            on_error=show_write_error("Proprietà", "Errore eliminazione: {e}"),
+        )
 
 
 class LinkedSemisBox(ctk.CTkFrame):
@@ -490,28 +522,42 @@ class MaterialTaxonomyDialog(ctk.CTkToplevel):
         if not desc:
             messagebox.showwarning("Materiali", "Inserisci la descrizione famiglia.")
             return
-        try:
-            if self.family_id is None:
-                new_id = self.db.create_material_family(desc)
-                self.refresh_all(preserve_family_id=new_id)
-            else:
-                self.db.update_material_family(self.family_id, desc)
-                self.refresh_all(preserve_family_id=self.family_id)
+        family_id = self.family_id
+
+        def saved(new_id) -> None:
+            self.refresh_all(preserve_family_id=new_id if family_id is None else family_id)
             self._notify_changed()
-        except Exception as e:
-            messagebox.showerror("Materiali", f"Errore salvataggio famiglia: {e}")
+
+        if family_id is None:
+            write = ("create_material_family", desc)
+        else:
+            write = ("update_material_family", family_id, desc)
+        submit_ui_write(
+            self,
+            self.db,
+            *write,
+            on_done=saved,
+            on_error=show_write_error("Materiali", "Errore salvataggio famiglia: {e}"),
+        )
 
     def delete_family(self):
         if self.family_id is None:
             return
         if not messagebox.askyesno("Materiali", "Eliminare la famiglia selezionata?"):
             return
-        try:
-            self.db.delete_material_family(self.family_id)
+
+        def deleted(_r) -> None:
             self.refresh_all()
             self._notify_changed()
-        except Exception as e:
-            messagebox.showerror("Materiali", f"Errore eliminazione famiglia: {e}")
+
+        submit_ui_write(
+            self,
+            self.db,
+            "delete_material_family",
+            self.family_id,
+            on_done=deleted,
+            on_error=show_write_error("Materiali", "Errore eliminazione famiglia: {e}"),
+        )
 
     def new_subfamily(self):
         self.subfamily_id = None
@@ -527,28 +573,44 @@ class MaterialTaxonomyDialog(ctk.CTkToplevel):
         if not desc:
             messagebox.showwarning("Materiali", "Inserisci la descrizione sottofamiglia.")
             return
-        try:
-            if self.subfamily_id is None:
-                new_id = self.db.create_material_subfamily(self.family_id, desc)
-                self.refresh_subfamilies(self.family_id, preserve_subfamily_id=new_id)
-            else:
-                self.db.update_material_subfamily(self.subfamily_id, desc)
-                self.refresh_subfamilies(self.family_id, preserve_subfamily_id=self.subfamily_id)
+        family_id, subfamily_id = self.family_id, self.subfamily_id
+
+        def saved(new_id) -> None:
+            keep = new_id if subfamily_id is None else subfamily_id
+            self.refresh_subfamilies(family_id, preserve_subfamily_id=keep)
             self._notify_changed()
-        except Exception as e:
-            messagebox.showerror("Materiali", f"Errore salvataggio sottofamiglia: {e}")
+
+        if subfamily_id is None:
+            write = ("create_material_subfamily", family_id, desc)
+        else:
+            write = ("update_material_subfamily", subfamily_id, desc)
+        submit_ui_write(
+            self,
+            self.db,
+            *write,
+            on_done=saved,
+            on_error=show_write_error("Materiali", "Errore salvataggio sottofamiglia: {e}"),
+        )
 
     def delete_subfamily(self):
         if self.subfamily_id is None:
             return
         if not messagebox.askyesno("Materiali", "Eliminare la sottofamiglia selezionata?"):
             return
-        try:
-            self.db.delete_material_subfamily(self.subfamily_id)
-            self.refresh_subfamilies(self.family_id)
+        family_id = self.family_id
+
+        def deleted(_r) -> None:
+            self.refresh_subfamilies(family_id)
             self._notify_changed()
-        except Exception as e:
-            messagebox.showerror("Materiali", f"Errore eliminazione sottofamiglia: {e}")
+
+        submit_ui_write(
+            self,
+            self.db,
+            "delete_material_subfamily",
+            self.subfamily_id,
+            on_done=deleted,
+            on_error=show_write_error("Materiali", "Errore eliminazione sottofamiglia: {e}"),
+        )
 
 
 class MaterialDetailsDialog(ctk.CTkToplevel):
@@ -600,9 +662,7 @@ class MaterialDetailsDialog(ctk.CTkToplevel):
 
     def set_material(self, material_id: Optional[int]):
         self.material_id = material_id
-        self.box_chem.set_material(material_id)
-        self.box_phys.set_material(material_id)
-        self.box_mech.set_material(material_id)
+        MaterialPropertyBox.set_material_all(self.db, material_id, [self.box_chem, self.box_phys, self.box_mech])
         self.box_link.set_material(material_id)
 
 
@@ -679,6 +739,9 @@ class MaterialsTab(ctk.CTkFrame):
         self.tree.configure(yscrollcommand=sb.set)
         sb.grid(row=0, column=1, sticky="ns")
         self.tree.bind("<<TreeviewSelect>>", self._on_select_material)
+        self._tree_sync = TreeSync(self.tree)
+        self._list_search = BackgroundSearch(self.tree, lambda: self.db.open_reader("search_materials"))
+        self._list_search.bind_var(self.var_search, self.search_list)
 
         # Right detail
         right = ctk.CTkFrame(outer)
@@ -762,6 +825,14 @@ class MaterialsTab(ctk.CTkFrame):
             self.tree.focus(iid)
             self._on_select_material()
 
+    @staticmethod
+    def prefetch(db: AppService) -> None:
+        """Letture del costruttore con gli stessi argomenti, dal thread di prefetch: il tab poi le trova in cache."""
+        families = db.fetch_material_families()
+        if families:
+            db.fetch_material_subfamilies(int(families[0]["id"]))
+        MaterialsTab._load_material_values(db, "")
+
     def refresh_lists(self, selected_family: Optional[str] = None, selected_subfamily: Optional[str] = None):
         # Proprieta materiale senza legame con gli stati semilavorato.
         self._refresh_material_taxonomy(selected_family, selected_subfamily)
@@ -811,53 +882,61 @@ class MaterialsTab(ctk.CTkFrame):
     def _on_family_changed(self, value: str):
         self._refresh_subfamilies_for_family(value)
 
-    def _property_summary(self, material_id: int, group_code: str, max_items: int = 3) -> str:
-        rows = self.db.fetch_material_properties(int(material_id), group_code)
-        parts: List[str] = []
-        for r in rows:
-            name = _row_str(r, "name").strip()
-            if not name:
-                continue
-            value = _row_str(r, "value").strip()
-            token = name if not value else f"{name}={value}"
-            parts.append(token)
-            if len(parts) >= max_items:
-                break
-        if not parts:
-            return ""
-        out = " | ".join(parts)
-        if len(rows) > max_items:
-            out += " | ..."
-        return out
+    def _set_property_boxes(self, material_id: Optional[int]):
+        MaterialPropertyBox.set_material_all(self.db, material_id, [self.box_chem, self.box_phys, self.box_mech])
 
     def refresh_materials(self):
-        for k in self.tree.get_children(""):
-            self.tree.delete(k)
+        self._list_search.cancel()
         q = (self.var_search.get() or "").strip()
-        rows = self.db.search_materials(q)
-        for r in rows:
-            self.tree.insert(
-                "",
-                "end",
-                iid=str(r["id"]),
-                values=(
-                    _row_str(r, "family"),
-                    _row_str(r, "description"),
-                    self._property_summary(int(r["id"]), "CHEM"),
-                    self._property_summary(int(r["id"]), "PHYS"),
-                    self._property_summary(int(r["id"]), "MECH"),
-                    _row_str(r, "updated_at"),
-                ),
-            )
+        self._show_materials(self._load_material_values(self.db, q))
+
+    def search_list(self):
+        """Ricerca in background (digitazione): la finestra resta reattiva."""
+        q = (self.var_search.get() or "").strip()
+        self._list_search.submit(lambda reader: self._load_material_values(reader, q), self._show_materials)
+
+    @staticmethod
+    def _load_material_values(db, q: str) -> List[Tuple[str, tuple]]:
+        # Solo query (nessun widget): eseguibile anche sul thread di ricerca.
+        rows = db.search_materials(q)
+        summaries = db.fetch_material_property_summaries([int(r["id"]) for r in rows] if q else None)
+        return [MaterialsTab._material_row_values(r, summaries.get(int(r["id"]), {})) for r in rows]
+
+    @staticmethod
+    def _material_row_values(r, summary: Dict[str, str]) -> Tuple[str, tuple]:
+        return (
+            str(r["id"]),
+            (
+                _row_str(r, "family"),
+                _row_str(r, "description"),
+                summary.get("CHEM", ""),
+                summary.get("PHYS", ""),
+                summary.get("MECH", ""),
+                _row_str(r, "updated_at"),
+            ),
+        )
+
+    def _patch_material_row(self, material_id: int) -> None:
+        """Dopo un salvataggio aggiorna solo la riga del materiale (senza rileggere l'elenco)."""
+        iid = str(material_id)
+        if not self.db.material_matches_search(material_id, (self.var_search.get() or "").strip()):
+            # Non piu' tra i risultati della ricerca: via dall'elenco.
+            self._tree_sync.remove(iid)
+            return
+        row = self.db.read_material(material_id)
+        summary = self.db.fetch_material_property_summaries([int(material_id)]).get(int(material_id), {})
+        # Elenco per data di aggiornamento decrescente: il materiale appena salvato va in testa.
+        self._tree_sync.patch(*self._material_row_values(row, summary), index=0)
+
+    def _show_materials(self, rows: List[Tuple[str, tuple]]):
+        self._tree_sync.sync(rows)
 
     def new_material(self):
         self.material_id = None
         self.var_std.set("")
         self.var_notes.set("")
         self._refresh_material_taxonomy()
-        self.box_chem.set_material(None)
-        self.box_phys.set_material(None)
-        self.box_mech.set_material(None)
+        self._set_property_boxes(None)
 
     def _on_select_material(self, _evt=None):
         sel = self.tree.selection()
@@ -870,9 +949,7 @@ class MaterialsTab(ctk.CTkFrame):
         self.refresh_lists(selected_family=family, selected_subfamily=subfamily)
         self.var_std.set(_row_str(row, "standard"))
         self.var_notes.set(_row_str(row, "notes"))
-        self.box_chem.set_material(self.material_id)
-        self.box_phys.set_material(self.material_id)
-        self.box_mech.set_material(self.material_id)
+        self._set_property_boxes(self.material_id)
 
     def save_material(self):
         family = (self.var_family.get() or "").strip()
@@ -880,33 +957,52 @@ class MaterialsTab(ctk.CTkFrame):
         if not family or family == self.EMPTY_CHOICE or not desc or desc == self.EMPTY_CHOICE:
             messagebox.showwarning("Materiali", "Seleziona FAMIGLIA e SOTTOFAMIGLIA/STATO.")
             return
-        try:
-            if self.material_id is None:
-                # codice interno auto-generato dal DB (non visibile in UI)
-                self.material_id = self.db.create_material(None, family, desc, self.var_std.get(), self.var_notes.get())
+        material_id = self.material_id
+
+        def saved(new_id) -> None:
+            if material_id is None:
+                if self.material_id is None:
+                    self.material_id = int(new_id)
                 messagebox.showinfo("Materiali", "Creato.")
             else:
-                self.db.update_material(self.material_id, family, desc, self.var_std.get(), self.var_notes.get())
                 messagebox.showinfo("Materiali", "Aggiornato.")
-            self.refresh_materials()
+            self._patch_material_row(int(new_id) if material_id is None else material_id)
             self._select_material_row_if_present(self.material_id)
-            self.box_chem.set_material(self.material_id)
-            self.box_phys.set_material(self.material_id)
-            self.box_mech.set_material(self.material_id)
-        except Exception as e:
-            messagebox.showerror("Materiali", f"Errore salvataggio: {e}")
+            self._set_property_boxes(self.material_id)
+
+        if material_id is None:
+            # codice interno auto-generato dal DB (non visibile in UI)
+            write = ("create_material", None, family, desc, self.var_std.get(), self.var_notes.get())
+        else:
+            write = ("update_material", material_id, family, desc, self.var_std.get(), self.var_notes.get())
+        submit_ui_write(
+            self,
+            self.db,
+            *write,
+            on_done=saved,
+            on_error=show_write_error("Materiali", "Errore salvataggio: {e}"),
+        )
 
     def delete_material(self):
         if self.material_id is None:
             return
         if not messagebox.askyesno("Materiali", "Eliminare il materiale selezionato?"):
             return
-        try:
-            self.db.delete_material(self.material_id)
-            self.new_material()
-            self.refresh_materials()
-        except Exception as e:
-            messagebox.showerror("Materiali", f"Errore eliminazione: {e}")
+        material_id = self.material_id
+
+        def deleted(_r) -> None:
+            if self.material_id == material_id:
+                self.new_material()
+            self._tree_sync.remove(str(material_id))
+
+        submit_ui_write(
+            self,
+            self.db,
+            "delete_material",
+            material_id,
+            on_done=deleted,
+            on_error=show_write_error("Materiali", "Errore eliminazione: {e}"),
+        )
 
 
 class _TreatmentBox(ctk.CTkFrame):
@@ -1016,38 +1112,49 @@ class _TreatmentBox(ctk.CTkFrame):
             messagebox.showwarning("Trattamenti", "Compila almeno DESCRIZIONE.")
             return
         chars = self.txt_char.get("1.0", "end").strip()
-        try:
-            if self.kind == "heat":
-                if self.tid is None:
-                    # codice interno auto-generato dal DB (non visibile in UI)
-                    self.tid = self.db.create_heat_treatment(None, desc, chars, self.var_std.get(), self.var_notes.get())
-                else:
-                    self.db.update_heat_treatment(self.tid, desc, chars, self.var_std.get(), self.var_notes.get())
-            else:
-                if self.tid is None:
-                    # codice interno auto-generato dal DB (non visibile in UI)
-                    self.tid = self.db.create_surface_treatment(None, desc, chars, self.var_std.get(), self.var_notes.get())
-                else:
-                    self.db.update_surface_treatment(self.tid, desc, chars, self.var_std.get(), self.var_notes.get())
+        kind = "heat_treatment" if self.kind == "heat" else "surface_treatment"
+        tid = self.tid
+
+        def saved(new_id) -> None:
+            if tid is None and self.tid is None:
+                self.tid = int(new_id)
             self.refresh()
             messagebox.showinfo("Trattamenti", "Salvato.")
-        except Exception as e:
-            messagebox.showerror("Trattamenti", f"Errore salvataggio: {e}")
+
+        if tid is None:
+            # codice interno auto-generato dal DB (non visibile in UI)
+            write = (f"create_{kind}", None, desc, chars, self.var_std.get(), self.var_notes.get())
+        else:
+            write = (f"update_{kind}", tid, desc, chars, self.var_std.get(), self.var_notes.get())
+        submit_ui_write(
+            self,
+            self.db,
+            *write,
+            on_done=saved,
+            on_error=show_write_error("Trattamenti", "Errore salvataggio: {e}"),
+        )
 
     def delete(self):
         if self.tid is None:
             return
         if not messagebox.askyesno("Trattamenti", "Eliminare il trattamento selezionato?"):
             return
-        try:
-            if self.kind == "heat":
-                self.db.delete_heat_treatment(self.tid)
-            else:
-                self.db.delete_surface_treatment(self.tid)
-            self.new()
+        kind = "heat_treatment" if self.kind == "heat" else "surface_treatment"
+        tid = self.tid
+
+        def deleted(_r) -> None:
+            if self.tid == tid:
+                self.new()
             self.refresh()
-        except Exception as e:
-            messagebox.showerror("Trattamenti", f"Errore eliminazione: {e}")
+
+        submit_ui_write(
+            self,
+            self.db,
+            f"delete_{kind}",
+            tid,
+            on_done=deleted,
+            on_error=show_write_error("Trattamenti", "Errore eliminazione: {e}"),
+        )
 
 
 class TreatmentsTab(ctk.CTkFrame):
@@ -1065,6 +1172,12 @@ class TreatmentsTab(ctk.CTkFrame):
         paned.add(self.box_heat, weight=1)
         paned.add(self.box_surf, weight=1)
 
+    @staticmethod
+    def prefetch(db: AppService) -> None:
+        """Come il costruttore dei due elenchi trattamenti."""
+        db.fetch_heat_treatments()
+        db.fetch_surface_treatments()
+
 
 class _SimpleCodeBox(ctk.CTkFrame):
     """Gestione elenco descrizioni (semi_type / semi_state), con codice interno automatico."""
@@ -1144,38 +1257,49 @@ class _SimpleCodeBox(ctk.CTkFrame):
         if not desc:
             messagebox.showwarning("Semilavorati", "Compila DESCRIZIONE.")
             return
-        try:
-            if self.kind == "type":
-                if self.item_id is None:
-                    # codice interno auto-generato dal DB (non visibile in UI)
-                    self.item_id = self.db.create_semi_type(None, desc)
-                else:
-                    self.db.update_semi_type(self.item_id, desc)
-            else:
-                if self.item_id is None:
-                    # codice interno auto-generato dal DB (non visibile in UI)
-                    self.item_id = self.db.create_semi_state(None, desc)
-                else:
-                    self.db.update_semi_state(self.item_id, desc)
+        kind = "semi_type" if self.kind == "type" else "semi_state"
+        item_id = self.item_id
+
+        def saved(new_id) -> None:
+            if item_id is None and self.item_id is None:
+                self.item_id = int(new_id)
             self.refresh()
             messagebox.showinfo("Semilavorati", "Salvato.")
-        except Exception as e:
-            messagebox.showerror("Semilavorati", f"Errore salvataggio: {e}")
+
+        if item_id is None:
+            # codice interno auto-generato dal DB (non visibile in UI)
+            write = (f"create_{kind}", None, desc)
+        else:
+            write = (f"update_{kind}", item_id, desc)
+        submit_ui_write(
+            self,
+            self.db,
+            *write,
+            on_done=saved,
+            on_error=show_write_error("Semilavorati", "Errore salvataggio: {e}"),
+        )
 
     def delete(self):
         if self.item_id is None:
             return
         if not messagebox.askyesno("Semilavorati", "Eliminare la voce selezionata?"):
             return
-        try:
-            if self.kind == "type":
-                self.db.delete_semi_type(self.item_id)
-            else:
-                self.db.delete_semi_state(self.item_id)
-            self.new()
+        kind = "semi_type" if self.kind == "type" else "semi_state"
+        item_id = self.item_id
+
+        def deleted(_r) -> None:
+            if self.item_id == item_id:
+                self.new()
             self.refresh()
-        except Exception as e:
-            messagebox.showerror("Semilavorati", f"Errore eliminazione: {e}")
+
+        submit_ui_write(
+            self,
+            self.db,
+            f"delete_{kind}",
+            item_id,
+            on_done=deleted,
+            on_error=show_write_error("Semilavorati", "Errore eliminazione: {e}"),
+        )
 
 
 class SemiTypeDialog(ctk.CTkToplevel):
@@ -1280,29 +1404,48 @@ class SemiTypeDialog(ctk.CTkToplevel):
         if not desc:
             messagebox.showwarning("Semilavorati", "Compila DESCRIZIONE.")
             return
-        try:
-            if self.type_id is None:
-                self.type_id = self.db.create_semi_type(None, desc)
-            else:
-                self.db.update_semi_type(self.type_id, desc)
+        type_id = self.type_id
+
+        def saved(new_id) -> None:
+            if type_id is None and self.type_id is None:
+                self.type_id = int(new_id)
             self.refresh()
             self._notify_changed()
             messagebox.showinfo("Semilavorati", "Salvato.")
-        except Exception as e:
-            messagebox.showerror("Semilavorati", f"Errore salvataggio: {e}")
+
+        if type_id is None:
+            write = ("create_semi_type", None, desc)
+        else:
+            write = ("update_semi_type", type_id, desc)
+        submit_ui_write(
+            self,
+            self.db,
+            *write,
+            on_done=saved,
+            on_error=show_write_error("Semilavorati", "Errore salvataggio: {e}"),
+        )
 
     def delete_type(self):
         if self.type_id is None:
             return
         if not messagebox.askyesno("Semilavorati", "Eliminare la famiglia selezionata?"):
             return
-        try:
-            self.db.delete_semi_type(self.type_id)
-            self.new_type()
+        type_id = self.type_id
+
+        def deleted(_r) -> None:
+            if self.type_id == type_id:
+                self.new_type()
             self.refresh()
             self._notify_changed()
-        except Exception as e:
-            messagebox.showerror("Semilavorati", f"Errore eliminazione: {e}")
+
+        submit_ui_write(
+            self,
+            self.db,
+            "delete_semi_type",
+            type_id,
+            on_done=deleted,
+            on_error=show_write_error("Semilavorati", "Errore eliminazione: {e}"),
+        )
 
 
 class SemiStateDialog(ctk.CTkToplevel):
@@ -1407,29 +1550,48 @@ class SemiStateDialog(ctk.CTkToplevel):
         if not desc:
             messagebox.showwarning("Semilavorati", "Compila DESCRIZIONE.")
             return
-        try:
-            if self.state_id is None:
-                self.state_id = self.db.create_semi_state(None, desc)
-            else:
-                self.db.update_semi_state(self.state_id, desc)
+        state_id = self.state_id
+
+        def saved(new_id) -> None:
+            if state_id is None and self.state_id is None:
+                self.state_id = int(new_id)
             self.refresh()
             self._notify_changed()
             messagebox.showinfo("Semilavorati", "Salvato.")
-        except Exception as e:
-            messagebox.showerror("Semilavorati", f"Errore salvataggio: {e}")
+
+        if state_id is None:
+            write = ("create_semi_state", None, desc)
+        else:
+            write = ("update_semi_state", state_id, desc)
+        submit_ui_write(
+            self,
+            self.db,
+            *write,
+            on_done=saved,
+            on_error=show_write_error("Semilavorati", "Errore salvataggio: {e}"),
+        )
 
     def delete_state(self):
         if self.state_id is None:
             return
         if not messagebox.askyesno("Semilavorati", "Eliminare lo stato selezionato?"):
             return
-        try:
-            self.db.delete_semi_state(self.state_id)
-            self.new_state()
+        state_id = self.state_id
+
+        def deleted(_r) -> None:
+            if self.state_id == state_id:
+                self.new_state()
             self.refresh()
             self._notify_changed()
-        except Exception as e:
-            messagebox.showerror("Semilavorati", f"Errore eliminazione: {e}")
+
+        submit_ui_write(
+            self,
+            self.db,
+            "delete_semi_state",
+            state_id,
+            on_done=deleted,
+            on_error=show_write_error("Semilavorati", "Errore eliminazione: {e}"),
+        )
 
 
 class SemiTaxonomyDialog(ctk.CTkToplevel):
@@ -1521,6 +1683,7 @@ class SemiDimensionsBox(ctk.CTkFrame):
         self.tree.configure(yscrollcommand=sb.set)
         sb.grid(row=0, column=1, sticky="ns")
         self.tree.bind("<<TreeviewSelect>>", self._on_select)
+        self._tree_sync = TreeSync(self.tree)
 
         form = ctk.CTkFrame(self)
         form.grid(row=2, column=0, sticky="ew", padx=8, pady=(0, 8))
@@ -1546,6 +1709,8 @@ class SemiDimensionsBox(ctk.CTkFrame):
         self.btn_save.pack(side="left", padx=4)
         self.btn_delete = ctk.CTkButton(btns, text="Elimina", width=90, command=self.delete_dimension)
         self.btn_delete.pack(side="left", padx=4)
+        self.btn_recalc = ctk.CTkButton(btns, text="Ricalcola pesi", width=110, command=self.recalculate_weights)
+        self.btn_recalc.pack(side="left", padx=4)
         self.btn_help = ctk.CTkButton(btns, text="Guida", width=90, command=self._open_hint_popup)
         self.btn_help.pack(side="left", padx=4)
 
@@ -1555,7 +1720,7 @@ class SemiDimensionsBox(ctk.CTkFrame):
             w.configure(state=state)
         self.chk_preferred.configure(state=state)
         btn_state = "normal" if enabled else "disabled"
-        for b in (self.btn_new, self.btn_save, self.btn_delete):
+        for b in (self.btn_new, self.btn_save, self.btn_delete, self.btn_recalc):
             b.configure(state=btn_state)
 
     def set_semi_item(self, semi_item_id: Optional[int]):
@@ -1601,12 +1766,14 @@ class SemiDimensionsBox(ctk.CTkFrame):
             "- U: U80X45X6 oppure U80X45X8X6 (TFxTW)",
             "- T: T80X60X8 oppure T80X60X8X6 (TFxTW)",
             "",
-            "Nota: TRAVI (IPE/HEA/IPN/UPN...) peso/m manuale per ora.",
+            "Travi (peso automatico da tabella EN 10365 / DIN 1025):",
+            "- IPE200, HEA200 (anche HE200A), HEB/HEM, IPN, UPN, UPE/UPS",
+            "- serie non in tabella: peso/m manuale",
         ]
         if t == "PROFILATI":
             lines.extend(["", "Tipo corrente: PROFILATI."])
         if t == "TRAVI":
-            lines.extend(["", "Tipo corrente: TRAVI (inserimento peso/m manuale)."])
+            lines.extend(["", "Tipo corrente: TRAVI (peso da tabella se la designazione e' standard)."])
         if t == "LAMIERE":
             lines.extend(["", "Tipo corrente: LAMIERE (peso automatico in kg/m2)."])
         return "\n".join(lines)
@@ -1646,19 +1813,22 @@ class SemiDimensionsBox(ctk.CTkFrame):
         ctk.CTkButton(btns, text="Chiudi", width=100, command=popup.destroy).pack(side="left")
 
     def refresh(self):
-        for k in self.tree.get_children(""):
-            self.tree.delete(k)
-        if not self.semi_item_id:
-            return
-        rows = self.db.fetch_semi_dimensions(self.semi_item_id)
-        for r in rows:
-            pref = "X" if int(r["preferred"] or 0) else ""
-            self.tree.insert(
-                "",
-                "end",
-                iid=str(r["id"]),
-                values=(pref, _row_str(r, "dimension"), _row_str(r, "weight_per_m")),
-            )
+        rows = self.db.fetch_semi_dimensions(self.semi_item_id) if self.semi_item_id else []
+        self._tree_sync.sync(
+            (str(r["id"]), ("X" if int(r["preferred"] or 0) else "", _row_str(r, "dimension"), _row_str(r, "weight_per_m")))
+            for r in rows
+        )
+
+    def _patch_row(self, dim_id: int, values: Tuple[str, str, str]) -> None:
+        """Dopo un salvataggio aggiorna solo la riga (una dimensione nuova va in coda, come il suo sort_order)."""
+        iid = str(dim_id)
+        if values[0]:
+            # Una sola dimensione preferita per semilavorato: la X sparisce dalle altre righe.
+            for other in self.tree.get_children(""):
+                old = tuple(self.tree.item(other, "values") or ())
+                if other != iid and old and old[0]:
+                    self._tree_sync.patch(other, ("",) + old[1:])
+        self._tree_sync.patch(iid, values)
 
     def new_dimension(self):
         self.dim_id = None
@@ -1701,39 +1871,78 @@ class SemiDimensionsBox(ctk.CTkFrame):
                     "Per LAMIERE il calcolo e in kg/m2. Apri 'Guida' per i formati supportati oppure inseriscilo manualmente.",
                 )
                 return
-        try:
-            if self.dim_id is None:
-                self.dim_id = self.db.create_semi_dimension(
-                    self.semi_item_id,
-                    dimension,
-                    weight_value,
-                    preferred=1 if self.var_preferred.get() else 0,
-                )
-            else:
-                self.db.update_semi_dimension(
-                    self.dim_id,
-                    dimension,
-                    weight_value,
-                    preferred=1 if self.var_preferred.get() else 0,
-                )
-            self.refresh()
+        dim_id = self.dim_id
+        preferred = bool(self.var_preferred.get())
+        values = ("X" if preferred else "", normalize_upper(dimension), normalize_upper(weight_value))
+
+        def saved(new_id) -> None:
+            if dim_id is None and self.dim_id is None:
+                self.dim_id = int(new_id)
+            self._patch_row(int(new_id) if dim_id is None else dim_id, values)
             if self.dim_id is not None and self.tree.exists(str(self.dim_id)):
                 self.tree.selection_set(str(self.dim_id))
                 self.tree.focus(str(self.dim_id))
+
+        if dim_id is None:
+            write = ("create_semi_dimension", self.semi_item_id, dimension, weight_value)
+        else:
+            write = ("update_semi_dimension", dim_id, dimension, weight_value)
+        submit_ui_write(
+            self,
+            self.db,
+            *write,
+            preferred=1 if preferred else 0,
+            on_done=saved,
+            on_error=show_write_error("Semilavorati", "Errore salvataggio dimensione: {e}"),
+        )
+
+    def recalculate_weights(self):
+        if not self.semi_item_id:
+            return
+        try:
+            # Scrittura sul thread dedicato: la finestra resta reattiva durante il ricalcolo.
+            future = self.db.submit_write("update_semi_dimension_weights", semi_item_id=self.semi_item_id)
         except Exception as e:
-            messagebox.showerror("Semilavorati", f"Errore salvataggio dimensione: {e}")
+            messagebox.showerror("Semilavorati", f"Errore ricalcolo pesi: {e}")
+            return
+        self.btn_recalc.configure(state="disabled")
+        self._wait_recalculate(future)
 
-    def delete_dimension(self):
-        if self.dim_id is None:
+    def _wait_recalculate(self, future):
+        if not future.done():
+            self.after(50, lambda: self._wait_recalculate(future))
             return
-        if not messagebox.askyesno("Semilavorati", "Eliminare la dimensione selezionata?"):
+        if not self.winfo_exists():
             return
+        self.btn_recalc.configure(state="normal" if self.semi_item_id else "disabled")
         try:
-            self.db.delete_semi_dimension(self.dim_id)
-            self.new_dimension()
+            updated = future.result()
             self.refresh()
         except Exception as e:
-            messagebox.showerror("Semilavorati", f"Errore eliminazione dimensione: {e}")
+            messagebox.showerror("Semilavorati", f"Errore ricalcolo pesi: {e}")
+            return
+        messagebox.showinfo("Semilavorati", f"Pesi automatici aggiornati: {updated}.")
+
+    def delete_dimension(self):
+        if self.dim_id is None:
+            return
+        if not messagebox.askyesno("Semilavorati", "Eliminare la dimensione selezionata?"):
+            return
+        dim_id = self.dim_id
+
+        def deleted(_r) -> None:
+            if self.dim_id == dim_id:
+                self.new_dimension()
+            self._tree_sync.remove(str(dim_id))
+
+        submit_ui_write(
+            self,
+            self.db,
+            "delete_semi_dimension",
+            dim_id,
+            on_done=deleted,
+            on_error=show_write_error("Semilavorati", "Errore eliminazione dimensione: {e}"),
+        )
 
 
 class SemilavoratiTab(ctk.CTkFrame):
@@ -1820,10 +2029,24 @@ class SemilavoratiTab(ctk.CTkFrame):
             self.tree.heading(c, text=c)
             width, anchor, stretch = col_cfg.get(c, (140, "w", True))
             self.tree.column(c, width=width, anchor=anchor, stretch=stretch)
-        make_treeview_sortable(self.tree)
         self.tree.grid(row=0, column=0, sticky="nsew")
         sb = ttk.Scrollbar(lf, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscrollcommand=sb.set)
+        self._list_loader = PagedTreeLoader(
+            self.tree,
+            sb,
+            sort_columns={
+                "PREF": "has_preferred_dimension",
+                "FAMIGLIA": "type_desc",
+                "STATO": "state_desc",
+                "MATERIALE": "mat_label",
+                "DESCRIZIONE": "description",
+                "DIM": "dim_display",
+                "AGG": "updated_at",
+            },
+        )
+        make_treeview_sortable(self.tree, loader=self._list_loader, reload=self.search_list)
+        self._list_search = BackgroundSearch(self.tree, lambda: self.db.open_reader("search_semi_items_page"))
+        self._list_search.bind_var(self.var_search, self.search_list)
         sb.grid(row=0, column=1, sticky="ns")
         self.tree.bind("<<TreeviewSelect>>", self._on_select_item)
 
@@ -1896,6 +2119,14 @@ class SemilavoratiTab(ctk.CTkFrame):
         self._taxonomy_dialog = SemiTaxonomyDialog(self, self.db, on_close=self._on_taxonomy_dialog_closed)
         self._taxonomy_dialog.focus_set()
 
+    @staticmethod
+    def prefetch(db: AppService) -> None:
+        """Come il costruttore: famiglie, stati, materiali e prima pagina dell'elenco."""
+        db.fetch_semi_types()
+        db.fetch_semi_states()
+        db.search_materials("")
+        db.search_semi_items_page("", only_preferred_dimension=False, cursor=None)
+
     def refresh_ref_lists(self):
         self._types = [(int(r["id"]), str(r["description"])) for r in self.db.fetch_semi_types()]
         self._states = [(int(r["id"]), str(r["description"])) for r in self.db.fetch_semi_states()]
@@ -1925,30 +2156,43 @@ class SemilavoratiTab(ctk.CTkFrame):
         if self.var_mat.get() not in mat_vals:
             self.var_mat.set("—")
 
-    def refresh_items(self):
-        for k in self.tree.get_children(""):
-            self.tree.delete(k)
+    def _items_page_query(self):
         q = (self.var_search.get() or "").strip()
-        rows = self.db.search_semi_items(
+        only_preferred_dimension = bool(self.var_only_preferred_dim.get())
+        sort_args = self._list_loader.sort_args()
+        return lambda db, cursor: db.search_semi_items_page(
             q,
-            only_preferred_dimension=bool(self.var_only_preferred_dim.get()),
+            only_preferred_dimension=only_preferred_dimension,
+            cursor=cursor,
+            **sort_args,
+        )
+
+    def refresh_items(self):
+        self._list_search.cancel()
+        self._show_items_page(self._items_page_query())
+
+    def search_list(self):
+        """Ricerca in background (digitazione): la finestra resta reattiva."""
+        query = self._items_page_query()
+        self._list_search.submit(lambda reader: query(reader, None), lambda page: self._show_items_page(query, page))
+
+    def _show_items_page(self, query, first_page: Optional[Dict[str, Any]] = None):
+        self._list_loader.start(lambda cursor: query(self.db, cursor), self._item_row_values, first_page=first_page)
+
+    def _item_row_values(self, r):
+        pref = "X" if int(r["has_preferred_dimension"] or 0) else ""
+        return (
+            str(r["id"]),
+            (
+                pref,
+                _row_str(r, "type_desc"),
+                _row_str(r, "state_desc"),
+                _row_str(r, "mat_label"),
+                _row_str(r, "description"),
+                _row_str(r, "dim_display") or _row_str(r, "dimensions"),
+                _row_str(r, "updated_at"),
+            ),
         )
-        for r in rows:
-            pref = "X" if int(r["has_preferred_dimension"] or 0) else ""
-            self.tree.insert(
-                "",
-                "end",
-                iid=str(r["id"]),
-                values=(
-                    pref,
-                    _row_str(r, "type_desc"),
-                    _row_str(r, "state_desc"),
-                    _row_str(r, "mat_label"),
-                    _row_str(r, "description"),
-                    _row_str(r, "dim_display") or _row_str(r, "dimensions"),
-                    _row_str(r, "updated_at"),
-                ),
-            )
 
     def new_item(self):
         self.item_id = None
@@ -2048,31 +2292,63 @@ class SemilavoratiTab(ctk.CTkFrame):
             "notes": self.var_notes.get(),
             "is_active": 1,
         }
-        try:
-            if self.item_id is None:
-                self.item_id = self.db.create_semi_item(payload)
-                if self._copy_from_item_id is not None:
-                    self.db.clone_semi_dimensions(self._copy_from_item_id, self.item_id)
-                self._copy_from_item_id = None
-                messagebox.showinfo("Semilavorati", "Creato.")
-            else:
-                self.db.update_semi_item(self.item_id, payload)
-                messagebox.showinfo("Semilavorati", "Aggiornato.")
+        on_error = show_write_error("Semilavorati", "Errore salvataggio: {e}")
+
+        def saved(message: str) -> None:
+            messagebox.showinfo("Semilavorati", message)
             self.refresh_items()
             self._select_item_row_if_present(self.item_id)
             self.box_dims.set_semi_item(self.item_id)
-        except Exception as e:
-            messagebox.showerror("Semilavorati", f"Errore salvataggio: {e}")
+
+        if self.item_id is not None:
+            submit_ui_write(
+                self,
+                self.db,
+                "update_semi_item",
+                self.item_id,
+                payload,
+                on_done=lambda _r: saved("Aggiornato."),
+                on_error=on_error,
+            )
+            return
+        copy_from = self._copy_from_item_id
+
+        def created(new_id) -> None:
+            if self.item_id is None:
+                self.item_id = int(new_id)
+            self._copy_from_item_id = None
+            if copy_from is None:
+                saved("Creato.")
+                return
+            submit_ui_write(
+                self,
+                self.db,
+                "clone_semi_dimensions",
+                copy_from,
+                int(new_id),
+                on_done=lambda _r: saved("Creato."),
+                on_error=on_error,
+            )
+
+        submit_ui_write(self, self.db, "create_semi_item", payload, on_done=created, on_error=on_error)
 
     def delete_item(self):
         if self.item_id is None:
             return
         if not messagebox.askyesno("Semilavorati", "Eliminare il semilavorato selezionato?"):
             return
-        try:
-            self.db.delete_semi_item(self.item_id)
-            self.new_item()
+        item_id = self.item_id
+
+        def deleted(_r) -> None:
+            if self.item_id == item_id:
+                self.new_item()
             self.refresh_items()
-            self.box_dims.set_semi_item(None)
-        except Exception as e:
-            messagebox.showerror("Semilavorati", f"Errore eliminazione: {e}")
+
+        submit_ui_write(
+            self,
+            self.db,
+            "delete_semi_item",
+            item_id,
+            on_done=deleted,
+            on_error=show_write_error("Semilavorati", "Errore eliminazione: {e}"),
+        )
@@ -2,14 +2,22 @@
 
 import re
 import sqlite3
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import customtkinter as ctk
 from tkinter import ttk, messagebox
 
 from .config import APP_NAME
 from .services import AppService
-from .ui_utils import bind_uppercase, make_treeview_sortable
+from .ui_utils import (
+    BackgroundSearch,
+    PagedTreeLoader,
+    VirtualTreeview,
+    bind_uppercase,
+    make_treeview_sortable,
+    show_write_error,
+    submit_ui_write,
+)
 from .codifica import normalize_mmm, normalize_gggg_normati, is_valid_mmm, is_valid_gggg_normati
 
 
@@ -19,6 +27,10 @@ class NormatiArticlesTab(ctk.CTkFrame):
         self.db = db
         self.current_item_id: Optional[int] = None
         self.current_seq: Optional[int] = None
+        # (categoria, sotto-categoria) e codice generato in anteprima per l'articolo nuovo in form.
+        self._code_preview: Optional[Tuple[Tuple[int, int], str]] = None
+        # Progressivi riservati sul DB e non ancora usati: riusati al salvataggio successivo.
+        self._held_seqs: Dict[Tuple[int, int], int] = {}
         self._suspend_template_fill: bool = False
 
         self.grid_columnconfigure(0, weight=1)
@@ -50,10 +62,10 @@ class NormatiArticlesTab(ctk.CTkFrame):
         search = ctk.CTkEntry(
             left,
             textvariable=self.q_var,
-            placeholder_text='Cerca (AND). Es: m5x5 inox oppure "m5x5"...',
+            placeholder_text='Cerca (AND). Es: m5x5 inox, "m5x5", d=8 l=16..40 cl=8.8...',
         )
         search.grid(row=0, column=0, sticky="ew", padx=14, pady=(14, 8))
-        search.bind("<Return>", lambda _e: self.refresh_list())
+        search.bind("<Return>", lambda _e: self.search_list())
 
         filters = ctk.CTkFrame(left, fg_color="transparent")
         filters.grid(row=1, column=0, sticky="ew", padx=14, pady=(0, 8))
@@ -71,7 +83,7 @@ class NormatiArticlesTab(ctk.CTkFrame):
         tree_wrap.grid_columnconfigure(0, weight=1)
         tree_wrap.grid_rowconfigure(0, weight=1)
 
-        self.tree = ttk.Treeview(tree_wrap, columns=("pref", "code", "cat", "sub", "desc"), show="headings", selectmode="browse")
+        self.tree = VirtualTreeview(tree_wrap, columns=("pref", "code", "cat", "sub", "desc"), show="headings")
         for col, title, w, anch in [
             ("pref", "PREF", 50, "center"),
             ("code", "CODICE", 170, "w"),
@@ -83,10 +95,16 @@ class NormatiArticlesTab(ctk.CTkFrame):
             self.tree.column(col, width=w, anchor=anch)
         self.tree.grid(row=0, column=0, sticky="nsew")
         tree_scroll = ttk.Scrollbar(tree_wrap, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscrollcommand=tree_scroll.set)
+        self._list_loader = PagedTreeLoader(
+            self.tree,
+            tree_scroll,
+            sort_columns={"pref": "preferred", "code": "code", "cat": "cat_code", "sub": "sub_code", "desc": "description"},
+        )
+        self._list_search = BackgroundSearch(self.tree, lambda: self.db.open_reader("search_items_page"))
+        self._list_search.bind_var(self.q_var, self.search_list)
         tree_scroll.grid(row=0, column=1, sticky="ns")
         self.tree.bind("<<TreeviewSelect>>", self.on_select)
-        make_treeview_sortable(self.tree)
+        make_treeview_sortable(self.tree, loader=self._list_loader, reload=self.search_list)
 
         right = ctk.CTkScrollableFrame(right_wrap, corner_radius=0, fg_color="transparent")
         right.pack(fill="both", expand=True, padx=(7, 14), pady=14)
@@ -147,6 +165,14 @@ class NormatiArticlesTab(ctk.CTkFrame):
         self.refresh_list()
         self.new_item()
 
+    @staticmethod
+    def prefetch(db: AppService) -> None:
+        """Letture del costruttore con gli stessi argomenti, dal thread di prefetch: il tab poi le trova in cache."""
+        cats = db.fetch_categories()
+        if cats:
+            db.fetch_subcategories(int(cats[0]["id"]))
+        db.search_items_page(cursor=None, q="", category_id=None, subcategory_id=None, only_preferred=False)
+
     def refresh_reference_data(self) -> None:
         self._cats = self.db.fetch_categories()
         cat_values = [f"{c['code']} — {c['description']}" for c in self._cats] or ["—"]
@@ -240,27 +266,65 @@ class NormatiArticlesTab(ctk.CTkFrame):
         if tpl:
             self.var_desc.set(tpl)
 
-    def refresh_list(self) -> None:
+    def _list_filters(self) -> Dict[str, Any]:
+        """Testo e filtri correnti dell'elenco (stessi per la ricerca e per l'aggiornamento di una riga)."""
         cat = self._list_filter_cat_by_label.get(self.var_filter_cat.get())
         sc = self._list_filter_sub_by_label.get(self.var_filter_sub.get())
-        rows = self.db.search_items(
-            self.q_var.get(),
-            category_id=int(cat["id"]) if cat is not None else None,
-            subcategory_id=int(sc["id"]) if sc is not None else None,
-            only_preferred=bool(self.var_only_preferred.get()),
-        )
-        for i in self.tree.get_children():
-            self.tree.delete(i)
+        return {
+            "q": self.q_var.get(),
+            "category_id": int(cat["id"]) if cat is not None else None,
+            "subcategory_id": int(sc["id"]) if sc is not None else None,
+            "only_preferred": bool(self.var_only_preferred.get()),
+        }
+
+    def _list_page_query(self):
+        filters = dict(self._list_filters(), **self._list_loader.sort_args())
+        return lambda db, cursor: db.search_items_page(cursor=cursor, **filters)
+
+    def refresh_list(self) -> None:
+        self._list_search.cancel()
+        self._show_list_page(self._list_page_query())
+
+    def search_list(self) -> None:
+        """Ricerca in background (digitazione / Invio): la finestra resta reattiva."""
+        query = self._list_page_query()
+        self._list_search.submit(lambda reader: query(reader, None), lambda page: self._show_list_page(query, page))
+
+    def _show_list_page(self, query, first_page: Optional[Dict[str, Any]] = None) -> None:
         self._rows_by_iid = {}
-        for r in rows:
-            iid = str(r["id"])
-            self._rows_by_iid[iid] = r
-            pref = "X" if int(r["preferred"] or 0) else ""
-            self.tree.insert("", "end", iid=iid, values=(pref, r["code"], r["cat_code"], r["sub_code"], r["description"]))
+        self._list_loader.start(lambda cursor: query(self.db, cursor), self._list_row_values, first_page=first_page)
+
+    def _list_row_values(self, r: sqlite3.Row):
+        iid = str(r["id"])
+        self._rows_by_iid[iid] = r
+        pref = "X" if int(r["preferred"] or 0) else ""
+        return iid, (pref, r["code"], r["cat_code"], r["sub_code"], r["description"])
+
+    def _patch_list_row(self, item_id: int) -> None:
+        """Dopo un salvataggio aggiorna solo la riga dell'articolo (senza rileggere l'elenco)."""
+        iid = str(item_id)
+        full = self.db.read_item(item_id)
+        preferred = bool(int(full["preferred"] or 0))
+        if not self.db.item_matches_search(item_id, **self._list_filters()):
+            # Non piu' tra i risultati (testo di ricerca o filtri): via dall'elenco.
+            self._rows_by_iid.pop(iid, None)
+            self._list_loader.sync.remove(iid)
+            return
+        index = None
+        moved = not self.tree.exists(iid) or bool(int(self._rows_by_iid[iid]["preferred"] or 0)) != preferred
+        if moved and self._list_loader.sort is None:
+            # Riga nuova o preferito cambiato: in testa al proprio gruppo (ordinamento preferiti/aggiornati).
+            # Con un ordinamento per colonna la posizione resta quella della lista.
+            others = [k for k in self.tree.get_children("") if k != iid]
+            index = 0 if preferred else sum(1 for k in others if int(self._rows_by_iid[k]["preferred"] or 0))
+        self._list_loader.sync.patch(*self._list_row_values(full), index=index)
+        self.tree.selection_set(iid)
+        self.tree.see(iid)
 
     def new_item(self) -> None:
         self.current_item_id = None
         self.current_seq = None
+        self._code_preview = None
         self.var_code.set("—")
         self.var_desc.set("")
         self.var_preferred.set(False)
@@ -279,6 +343,7 @@ class NormatiArticlesTab(ctk.CTkFrame):
 
     def _load_item_to_form(self, full: sqlite3.Row, as_new: bool) -> None:
         self._suspend_template_fill = True
+        self._code_preview = None
         try:
             if as_new:
                 self.current_item_id = None
@@ -325,9 +390,40 @@ class NormatiArticlesTab(ctk.CTkFrame):
         if not sc:
             messagebox.showerror(APP_NAME, "Seleziona una sotto-categoria (4 numeri).")
             return
-        next_seq = self.db.get_next_seq(int(cat["id"]), int(sc["id"]))
-        self.current_seq = next_seq
-        self.var_code.set(f"{cat['code']}-{sc['code']}-{next_seq:04d}")
+        key = (int(cat["id"]), int(sc["id"]))
+        # Solo anteprima (nessuna scrittura): il progressivo viene riservato al salvataggio.
+        held = self._held_seqs.get(key)
+        self.current_seq = held if held is not None else self.db.get_next_seq(*key)
+        code = f"{cat['code']}-{sc['code']}-{self.current_seq:04d}"
+        self._code_preview = (key, code)
+        self.var_code.set(code)
+
+    def _reserve_previewed_seq(self, payload: Dict[str, Any], then) -> None:
+        """
+        Articolo nuovo con il codice generato in anteprima: riserva il progressivo sul DB
+        (due postazioni non salvano lo stesso codice), aggiorna il codice se nel frattempo
+        e' cambiato e poi chiama `then()`.
+        """
+        key = (int(payload["category_id"]), int(payload["subcategory_id"]))
+        if self._code_preview != (key, payload["code"]):
+            then()
+            return
+        seq = self._held_seqs.get(key)
+        if seq is None:
+
+            def reserved(seqs: List[int]) -> None:
+                self._held_seqs[key] = seqs[0]
+                self._reserve_previewed_seq(payload, then)
+
+            submit_ui_write(self, self.db, "reserve_item_seqs", *key, on_done=reserved, on_error=self._on_save_error)
+            return
+        if seq != int(payload["seq"]):
+            code = f"{payload['code'].rsplit('-', 1)[0]}-{seq:04d}"
+            payload["code"], payload["seq"] = code, seq
+            self.current_seq = seq
+            self._code_preview = (key, code)
+            self.var_code.set(code)
+        then()
 
     def _collect_payload(self) -> Dict[str, Any]:
         cat = self._get_selected_cat()
@@ -365,26 +461,67 @@ class NormatiArticlesTab(ctk.CTkFrame):
         }
 
     def save_item(self) -> None:
+        # Scritture sul thread dell'area: la finestra non attende il commit.
         try:
             payload = self._collect_payload()
-            if self.current_item_id:
-                self.db.update_item(self.current_item_id, payload)
-            else:
-                self.current_item_id = self.db.create_item(payload)
-            self.refresh_list()
-        except sqlite3.IntegrityError as e:
-            messagebox.showerror(APP_NAME, f"Codice duplicato o vincolo violato.\n\n{e}")
         except Exception as e:
             messagebox.showerror(APP_NAME, f"Errore salvataggio.\n\n{e}")
+            return
+        if self.current_item_id:
+            item_id = self.current_item_id
+            submit_ui_write(
+                self,
+                self.db,
+                "update_item",
+                item_id,
+                payload,
+                on_done=lambda _r: self._patch_list_row(item_id),
+                on_error=self._on_save_error,
+            )
+            return
+
+        def created(item_id: int) -> None:
+            self._held_seqs.pop((payload["category_id"], payload["subcategory_id"]), None)
+            if self.current_item_id is None:
+                self.current_item_id = item_id
+                self._code_preview = None
+            self._patch_list_row(item_id)
+
+        self._reserve_previewed_seq(
+            payload,
+            lambda: submit_ui_write(self, self.db, "create_item", payload, on_done=created, on_error=self._on_save_error),
+        )
+
+    def _on_save_error(self, e: Exception) -> None:
+        if isinstance(e, sqlite3.IntegrityError):
+            if not self.current_item_id and self._code_preview is not None:
+                # Codice gia' usato: al prossimo salvataggio si riserva un progressivo nuovo.
+                self._held_seqs.pop(self._code_preview[0], None)
+            messagebox.showerror(APP_NAME, f"Codice duplicato o vincolo violato.\n\n{e}")
+            return
+        messagebox.showerror(APP_NAME, f"Errore salvataggio.\n\n{e}")
 
     def delete_item(self) -> None:
         if not self.current_item_id:
             return
         if not messagebox.askyesno(APP_NAME, "Eliminare definitivamente l'articolo selezionato?"):
             return
-        self.db.delete_item(self.current_item_id)
-        self.new_item()
-        self.refresh_list()
+        iid = str(self.current_item_id)
+
+        def deleted(_r) -> None:
+            self._rows_by_iid.pop(iid, None)
+            self._list_loader.sync.remove(iid)
+            if str(self.current_item_id) == iid:
+                self.new_item()
+
+        submit_ui_write(
+            self,
+            self.db,
+            "delete_item",
+            self.current_item_id,
+            on_done=deleted,
+            on_error=lambda e: messagebox.showerror(APP_NAME, f"Errore eliminazione.\n\n{e}"),
+        )
 
 
 
@@ -576,6 +713,14 @@ class NormatiCodingTab(ctk.CTkFrame):
 
         self.refresh_all()
 
+    @staticmethod
+    def prefetch(db: AppService) -> None:
+        """Come il costruttore: categorie, norme e sottocategorie della prima categoria."""
+        cats = db.fetch_categories()
+        if cats:
+            db.fetch_standards(int(cats[0]["id"]))
+            db.fetch_subcategories(int(cats[0]["id"]))
+
     def refresh_all(self) -> None:
         self.refresh_categories()
         if self._cats:
@@ -682,6 +827,11 @@ class NormatiCodingTab(ctk.CTkFrame):
         self.var_cat_desc.set("")
         self.ent_cat_code.configure(state="normal")
 
+    def _refs_saved(self, *refreshers) -> None:
+        for refresh in refreshers:
+            refresh()
+        self.refs_changed_callback()
+
     def cat_save(self) -> None:
         try:
             code = normalize_mmm(self.var_cat_code.get())
@@ -689,32 +839,35 @@ class NormatiCodingTab(ctk.CTkFrame):
             if not desc:
                 raise ValueError("Descrizione mancante.")
             if self.selected_category_id:
-                self.db.update_category(self.selected_category_id, desc)
+                write = ("update_category", self.selected_category_id, desc)
             else:
                 if not is_valid_mmm(code):
                     raise ValueError("CODICE categoria non valido: servono 3 numeri.")
-                self.db.create_category(code, desc)
-            self.refresh_categories()
-            self.refs_changed_callback()
-        except sqlite3.IntegrityError:
-            messagebox.showerror(APP_NAME, "Codice categoria già esistente.")
+                write = ("create_category", code, desc)
         except Exception as e:
             messagebox.showerror(APP_NAME, f"Errore.\n\n{e}")
+            return
+        submit_ui_write(
+            self,
+            self.db,
+            *write,
+            on_done=lambda _r: self._refs_saved(self.refresh_categories),
+            on_error=show_write_error(APP_NAME, "Errore.\n\n{e}", "Codice categoria già esistente."),
+        )
 
     def cat_delete(self) -> None:
         if not self.selected_category_id:
             return
         if not messagebox.askyesno(APP_NAME, "Eliminare la categoria selezionata?\n\nSe è collegata a norme/sotto-categorie/articoli, l'operazione può fallire."):
             return
-        try:
-            self.db.delete_category(self.selected_category_id)
-            self.cat_new()
-            self.refresh_all()
-            self.refs_changed_callback()
-        except sqlite3.IntegrityError:
-            messagebox.showerror(APP_NAME, "Impossibile eliminare: ci sono record collegati.")
-        except Exception as e:
-            messagebox.showerror(APP_NAME, f"Errore.\n\n{e}")
+        submit_ui_write(
+            self,
+            self.db,
+            "delete_category",
+            self.selected_category_id,
+            on_done=lambda _r: self._refs_saved(self.cat_new, self.refresh_all),
+            on_error=show_write_error(APP_NAME, "Errore.\n\n{e}", "Impossibile eliminare: ci sono record collegati."),
+        )
 
     def std_new(self) -> None:
         self.tree_std.selection_remove(self.tree_std.selection())
@@ -735,32 +888,33 @@ class NormatiCodingTab(ctk.CTkFrame):
             if not desc:
                 raise ValueError("Descrizione norma mancante.")
             if self.selected_standard_id:
-                self.db.update_standard(self.selected_standard_id, desc)
+                write = ("update_standard", self.selected_standard_id, desc)
             else:
-                self.db.create_standard(self.selected_category_id, code, desc)
-            self.refresh_standards()
-            self.refresh_subcategories()
-            self.refs_changed_callback()
-        except sqlite3.IntegrityError:
-            messagebox.showerror(APP_NAME, "Codice norma già esistente per questa categoria.")
+                write = ("create_standard", self.selected_category_id, code, desc)
         except Exception as e:
             messagebox.showerror(APP_NAME, f"Errore.\n\n{e}")
+            return
+        submit_ui_write(
+            self,
+            self.db,
+            *write,
+            on_done=lambda _r: self._refs_saved(self.refresh_standards, self.refresh_subcategories),
+            on_error=show_write_error(APP_NAME, "Errore.\n\n{e}", "Codice norma già esistente per questa categoria."),
+        )
 
     def std_delete(self) -> None:
         if not self.selected_standard_id:
             return
         if not messagebox.askyesno(APP_NAME, "Eliminare la norma selezionata?\n\nSe è collegata a sotto-categorie/articoli, l'operazione può fallire."):
             return
-        try:
-            self.db.delete_standard(self.selected_standard_id)
-            self.std_new()
-            self.refresh_standards()
-            self.refresh_subcategories()
-            self.refs_changed_callback()
-        except sqlite3.IntegrityError:
-            messagebox.showerror(APP_NAME, "Impossibile eliminare: ci sono record collegati.")
-        except Exception as e:
-            messagebox.showerror(APP_NAME, f"Errore.\n\n{e}")
+        submit_ui_write(
+            self,
+            self.db,
+            "delete_standard",
+            self.selected_standard_id,
+            on_done=lambda _r: self._refs_saved(self.std_new, self.refresh_standards, self.refresh_subcategories),
+            on_error=show_write_error(APP_NAME, "Errore.\n\n{e}", "Impossibile eliminare: ci sono record collegati."),
+        )
 
     def sub_new(self) -> None:
         self.tree_sub.selection_remove(self.tree_sub.selection())
@@ -785,32 +939,35 @@ class NormatiCodingTab(ctk.CTkFrame):
             tpl = self.txt_sub_tpl.get("1.0", "end").strip()
 
             if self.selected_subcategory_id:
-                self.db.update_subcategory(self.selected_subcategory_id, desc, standard_id, tpl)
+                write = ("update_subcategory", self.selected_subcategory_id, desc, standard_id, tpl)
             else:
                 if not is_valid_gggg_normati(code):
                     raise ValueError("CODICE sotto-categoria non valido: servono 4 numeri.")
-                self.db.create_subcategory(self.selected_category_id, code, desc, standard_id, tpl)
-            self.refresh_subcategories()
-            self.refs_changed_callback()
-        except sqlite3.IntegrityError:
-            messagebox.showerror(APP_NAME, "Codice sotto-categoria già esistente per questa categoria.")
+                write = ("create_subcategory", self.selected_category_id, code, desc, standard_id, tpl)
         except Exception as e:
             messagebox.showerror(APP_NAME, f"Errore.\n\n{e}")
+            return
+        submit_ui_write(
+            self,
+            self.db,
+            *write,
+            on_done=lambda _r: self._refs_saved(self.refresh_subcategories),
+            on_error=show_write_error(APP_NAME, "Errore.\n\n{e}", "Codice sotto-categoria già esistente per questa categoria."),
+        )
 
     def sub_delete(self) -> None:
         if not self.selected_subcategory_id:
             return
         if not messagebox.askyesno(APP_NAME, "Eliminare la sotto-categoria selezionata?\n\nSe è collegata ad articoli, l'operazione può fallire."):
             return
-        try:
-            self.db.delete_subcategory(self.selected_subcategory_id)
-            self.sub_new()
-            self.refresh_subcategories()
-            self.refs_changed_callback()
-        except sqlite3.IntegrityError:
-            messagebox.showerror(APP_NAME, "Impossibile eliminare: ci sono record collegati.")
-        except Exception as e:
-            messagebox.showerror(APP_NAME, f"Errore.\n\n{e}")
+        submit_ui_write(
+            self,
+            self.db,
+            "delete_subcategory",
+            self.selected_subcategory_id,
+            on_done=lambda _r: self._refs_saved(self.sub_new, self.refresh_subcategories),
+            on_error=show_write_error(APP_NAME, "Errore.\n\n{e}", "Impossibile eliminare: ci sono record collegati."),
+        )
 
 
 # ---------------- UI Commerciali (non normati) ----------------
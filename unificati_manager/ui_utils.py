@@ -1,10 +1,15 @@
 from __future__ import annotations
 
+import bisect
+import queue
 import re
-from typing import Iterable, Optional
+import sqlite3
+import threading
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
 import customtkinter as ctk
-from tkinter import ttk
+from tkinter import messagebox, ttk
 
 
 def bind_uppercase(var: ctk.StringVar) -> None:
@@ -25,29 +30,832 @@ def bind_uppercase(var: ctk.StringVar) -> None:
     var.trace_add("write", _on_change)
 
 
-def make_treeview_sortable(tree: ttk.Treeview, numeric_cols: Optional[Iterable[str]] = None) -> None:
+_NATURAL_NUM_RE = re.compile(r"(\d+(?:[.,]\d+)?)")
+_NUMBER_RE = re.compile(r"-?\d+([.,]\d+)?")
+
+
+@lru_cache(maxsize=65536)
+def natural_sort_key(value: str) -> Tuple[Tuple[int, Any], ...]:
+    """
+    Chiave di ordinamento "naturale": i numeri dentro il testo si confrontano per valore
+    (001-0002-0010, M8X20 < M10X20, 1,5 < 10). Coppie (0, numero) / (1, testo):
+    numeri e testo non vengono mai confrontati tra loro.
+    """
+    v = (value or "").strip().lower()
+    if _NUMBER_RE.fullmatch(v):
+        return ((0, float(v.replace(",", "."))),)
+    key = []
+    for i, part in enumerate(_NATURAL_NUM_RE.split(v)):
+        if i % 2:
+            key.append((0, float(part.replace(",", "."))))
+        elif part:
+            key.append((1, part))
+    return tuple(key)
+
+
+def _numeric_sort_key(value: str) -> Tuple[Tuple[int, Any], ...]:
+    try:
+        return ((0, float((value or "").strip().replace(",", "."))),)
+    except ValueError:
+        return natural_sort_key(value)
+
+
+def make_treeview_sortable(
+    tree: ttk.Treeview,
+    numeric_cols: Optional[Iterable[str]] = None,
+    loader: Optional[PagedTreeLoader] = None,
+    reload: Optional[Callable[[], None]] = None,
+) -> None:
+    """
+    Ordinamento al clic sull'intestazione. Con `loader` (elenco a pagine) la colonna
+    scelta passa alla query: se restano pagine da leggere si ricarica dalla prima
+    con `reload()`, altrimenti basta ordinare le righe gia' in memoria.
+    """
     numeric_cols = set(numeric_cols or [])
 
-    def _convert(v: str, col: str):
-        v = (v or "").strip()
-        if col in numeric_cols:
+    def _sort(col: str, reverse: bool):
+        key = _numeric_sort_key if col in numeric_cols else natural_sort_key
+        if loader is not None:
+            loader.sort = (col, reverse) if col in loader.sort_columns else None
+            if loader.sort is not None and loader.has_more and reload is not None:
+                reload()
+                tree.heading(col, command=lambda: _sort(col, not reverse))
+                return
+        if isinstance(tree, VirtualTreeview):
+            # Righe in memoria con chiavi in cache: un solo sort e un solo ridisegno.
+            tree.sort_rows(col, key=key, reverse=reverse)
+        else:
+            data = [(key(tree.set(k, col)), k) for k in tree.get_children("")]
+            data.sort(key=lambda t: t[0], reverse=reverse)
+            tree.set_children("", *[k for _, k in data])
+        tree.heading(col, command=lambda: _sort(col, not reverse))
+
+    for col in tree["columns"]:
+        tree.heading(col, command=lambda c=col: _sort(c, False))
+
+
+def _increasing_run_length(seq: List[int]) -> int:
+    """Lunghezza della sottosequenza crescente piu' lunga: le righe che non cambiano posto relativo."""
+    tails: List[int] = []
+    for x in seq:
+        i = bisect.bisect_left(tails, x)
+        if i == len(tails):
+            tails.append(x)
+        else:
+            tails[i] = x
+    return len(tails)
+
+
+class TreeSync:
+    """
+    Allinea una Treeview (lista piatta) a un nuovo elenco di righe per differenza:
+    chiave = iid, impronta = valori. Inserisce, aggiorna, sposta o elimina solo le
+    righe cambiate, cosi' selezione e posizione di scroll restano dove sono.
+    """
+
+    def __init__(self, tree: ttk.Treeview) -> None:
+        self.tree = tree
+        self._values: Dict[str, Tuple[str, ...]] = {}
+
+    @staticmethod
+    def _fingerprint(values: Iterable[Any]) -> Tuple[str, ...]:
+        # Tk restituisce i valori come stringhe: si confronta nella stessa forma.
+        return tuple("" if v is None else str(v) for v in values)
+
+    def sync(self, rows: Iterable[Tuple[str, Iterable[Any]]]) -> Dict[str, int]:
+        """`rows` = (iid, valori) nell'ordine voluto. Ritorna i conteggi delle modifiche."""
+        new_rows = [(str(iid), self._fingerprint(values)) for iid, values in rows]
+        new_ids = {iid for iid, _ in new_rows}
+        stats = {"inserted": 0, "updated": 0, "moved": 0, "deleted": 0}
+
+        current = list(self.tree.get_children(""))
+        stale = [iid for iid in current if iid not in new_ids]
+        if stale:
+            self.tree.delete(*stale)
+            for iid in stale:
+                self._values.pop(iid, None)
+            stats["deleted"] = len(stale)
+        kept = [iid for iid in current if iid in new_ids]
+        present = set(kept)
+
+        # Righe nuove in coda, poi (se serve) un solo riordino con set_children:
+        # costo lineare anche per rotazioni o inversioni dell'elenco.
+        order = list(kept)
+        for iid, values in new_rows:
+            if iid not in present:
+                self.tree.insert("", "end", iid=iid, values=values)
+                order.append(iid)
+                present.add(iid)
+                stats["inserted"] += 1
+            elif self._values.get(iid) != values:
+                self.tree.item(iid, values=values)
+                stats["updated"] += 1
+            self._values[iid] = values
+
+        target = [iid for iid, _ in new_rows]
+        if order != target:
+            self.tree.set_children("", *target)
+            pos = {iid: i for i, iid in enumerate(target)}
+            stats["moved"] = len(kept) - _increasing_run_length([pos[iid] for iid in kept])
+        return stats
+
+    def append(self, rows: Iterable[Tuple[str, Iterable[Any]]]) -> None:
+        """Aggiunge righe in coda (pagine successive); iid gia' presenti vengono aggiornati."""
+        for iid, values in rows:
+            iid = str(iid)
+            values = self._fingerprint(values)
+            if self.tree.exists(iid):
+                if self._values.get(iid) != values:
+                    self.tree.item(iid, values=values)
+            else:
+                self.tree.insert("", "end", iid=iid, values=values)
+            self._values[iid] = values
+
+    def patch(self, iid: str, values: Iterable[Any], index: Optional[int] = None) -> None:
+        """Aggiorna (o inserisce) una sola riga dopo una scrittura, senza rileggere la lista."""
+        iid = str(iid)
+        values = self._fingerprint(values)
+        if self.tree.exists(iid):
+            if self._values.get(iid) != values:
+                self.tree.item(iid, values=values)
+            if index is not None and self.tree.index(iid) != index:
+                self.tree.move(iid, "", index)
+        else:
+            self.tree.insert("", "end" if index is None else index, iid=iid, values=values)
+        self._values[iid] = values
+
+    def remove(self, iid: str) -> None:
+        iid = str(iid)
+        if self.tree.exists(iid):
+            self.tree.delete(iid)
+        self._values.pop(iid, None)
+
+    def clear(self) -> None:
+        children = self.tree.get_children("")
+        if children:
+            self.tree.delete(*children)
+        self._values = {}
+
+
+class VirtualTreeview(ttk.Treeview):
+    """
+    Treeview "virtuale" per cataloghi molto grandi (lista piatta).
+    Le righe stanno in memoria ((iid, valori) in ordine); nel widget Tk vengono
+    materializzate solo quelle della finestra visibile, quindi inserimento,
+    scroll e ordinamento non dipendono dal numero di righe.
+    Espone le stesse API usate sulle Treeview (insert/delete/move/set_children/item/exists/
+    index/get_children/selection/selection_set/see/yview, yscrollcommand, <<TreeviewSelect>>),
+    quindi TreeSync e PagedTreeLoader funzionano senza modifiche.
+    Solo selectmode "browse": la selezione e' del modello ed e' evidenziata con un tag.
+    Dopo `sort_rows` l'ordinamento resta attivo: righe aggiunte o modificate vengono
+    ricollocate al ridisegno (chiavi in cache per riga, ricalcolate solo se cambiano i valori).
+    """
+
+    _SEL_TAG = "_vsel"
+
+    def __init__(self, master=None, **kw) -> None:
+        kw.pop("selectmode", None)
+        yscroll = kw.pop("yscrollcommand", None)
+        super().__init__(master, selectmode="none", **kw)
+        self._ids: list = []
+        self._values: Dict[str, Tuple[str, ...]] = {}
+        self._pos: Optional[Dict[str, int]] = None
+        self._selected: Optional[str] = None
+        self._offset = 0
+        self._shown: Dict[str, Tuple[Tuple[str, ...], bool]] = {}
+        self._yscroll: Optional[Callable[[str, str], Any]] = yscroll
+        self._row_h = 0
+        self._head_h = 0
+        self._render_job: Optional[str] = None
+        self._auto_iid = 0
+        self._sort_spec: Optional[Tuple[int, Callable[[str], Any], bool]] = None
+        self._sort_keys: Dict[str, Any] = {}
+        self._sort_dirty = False
+
+        style = ttk.Style(self)
+        name = kw.get("style") or "Treeview"
+        self.tag_configure(
+            self._SEL_TAG,
+            background=style.lookup(name, "background", ["selected"]) or "#1f6aa5",
+            foreground=style.lookup(name, "foreground", ["selected"]) or "#ffffff",
+        )
+        self.bind("<Button-1>", self._on_click, add="+")
+        self.bind("<MouseWheel>", self._on_wheel, add="+")
+        self.bind("<Button-4>", lambda _e: self._scroll_units(-3), add="+")
+        self.bind("<Button-5>", lambda _e: self._scroll_units(3), add="+")
+        self.bind("<Configure>", lambda _e: self._schedule_render(), add="+")
+        for key, step in (("<Up>", -1), ("<Down>", 1), ("<Prior>", "-page"), ("<Next>", "page"), ("<Home>", "home"), ("<End>", "end")):
+            self.bind(key, lambda _e, s=step: self._on_key(s), add="+")
+
+    # --- modello (API Treeview) ---
+    def configure(self, cnf=None, **kw):
+        if "yscrollcommand" in kw:
+            self._yscroll = kw.pop("yscrollcommand")
+            self._notify_scroll()
+        if cnf is None and not kw:
+            return super().configure()
+        return super().configure(cnf, **kw)
+
+    config = configure
+
+    def get_children(self, item: Optional[str] = None) -> Tuple[str, ...]:
+        self._ensure_sorted()
+        return tuple(self._ids) if not item else ()
+
+    def exists(self, item: str) -> bool:
+        return str(item) in self._values
+
+    def index(self, item: str) -> int:
+        self._ensure_sorted()
+        if self._pos is None:
+            self._pos = {iid: i for i, iid in enumerate(self._ids)}
+        return self._pos[str(item)]
+
+    def insert(self, parent: str, index, iid: Optional[str] = None, **kw) -> str:
+        if iid is None:
+            self._auto_iid += 1
+            iid = f"V{self._auto_iid:06d}"
+        iid = str(iid)
+        if iid in self._values:
+            raise ValueError(f"Item {iid} already exists")
+        self._values[iid] = tuple(kw.get("values") or ())
+        self._sort_dirty = self._sort_spec is not None
+        if index == "end":
+            self._ids.append(iid)
+            if self._pos is not None:
+                self._pos[iid] = len(self._ids) - 1
+        else:
+            self._ids.insert(int(index), iid)
+            self._pos = None
+        self._schedule_render()
+        return iid
+
+    def delete(self, *items) -> None:
+        gone = {str(i) for i in items if str(i) in self._values}
+        if not gone:
+            return
+        self._ids = [iid for iid in self._ids if iid not in gone]
+        for iid in gone:
+            del self._values[iid]
+            self._sort_keys.pop(iid, None)
+        if self._selected in gone:
+            self._selected = None
+        self._pos = None
+        self._schedule_render()
+
+    def set_children(self, item: str, *newchildren) -> None:
+        """Nuovo ordine delle righe in un solo passaggio; quelle non elencate vengono eliminate."""
+        keep = [str(i) for i in newchildren if str(i) in self._values]
+        gone = set(self._values).difference(keep)
+        if gone:
+            self.delete(*gone)
+        self._ids = keep
+        self._pos = None
+        self._sort_dirty = self._sort_spec is not None
+        self._schedule_render()
+
+    def move(self, item: str, parent: str, index) -> None:
+        item = str(item)
+        self._ids.remove(item)
+        self._ids.insert(len(self._ids) if index == "end" else int(index), item)
+        self._pos = None
+        self._sort_dirty = self._sort_spec is not None
+        self._schedule_render()
+
+    def item(self, item: str, option: Optional[str] = None, **kw):
+        item = str(item)
+        if "values" in kw:
+            self._set_values(item, tuple(kw["values"] or ()))
+            self._schedule_render()
+            return None
+        info = {"text": "", "image": "", "values": list(self._values[item]), "open": 0, "tags": ""}
+        return info[option] if option is not None else info
+
+    def set(self, item: str, column=None, value=None):
+        values = self._values[str(item)]
+        cols = list(self["columns"])
+        if column is None:
+            return {c: (values[i] if i < len(values) else "") for i, c in enumerate(cols)}
+        i = cols.index(column) if column in cols else int(str(column).lstrip("#")) - 1
+        if value is None:
+            return values[i] if i < len(values) else ""
+        values = list(values) + [""] * max(0, i + 1 - len(values))
+        values[i] = value
+        self._set_values(str(item), tuple(values))
+        self._schedule_render()
+        return None
+
+    def selection(self) -> Tuple[str, ...]:
+        return (self._selected,) if self._selected is not None else ()
+
+    def selection_set(self, *items) -> None:
+        if len(items) == 1 and isinstance(items[0], (list, tuple)):
+            items = tuple(items[0])
+        iid = str(items[0]) if items else None
+        self._select(iid if iid in self._values else None)
+
+    def see(self, item: str) -> None:
+        i = self.index(item)
+        n = self._visible_rows()
+        if i < self._offset:
+            self._offset = i
+        elif i >= self._offset + n:
+            self._offset = i - n + 1
+        self._render()
+
+    def sort_rows(self, column, key: Callable[[str], Any], reverse: bool = False) -> None:
+        """Ordina per colonna e mantiene l'ordinamento attivo anche per le righe caricate dopo."""
+        i = list(self["columns"]).index(column)
+        if self._sort_spec is None or self._sort_spec[:2] != (i, key):
+            self._sort_keys = {}
+        self._sort_spec = (i, key, reverse)
+        self._sort_dirty = True
+        self._render()
+
+    def clear_sort(self) -> None:
+        self._sort_spec = None
+        self._sort_keys = {}
+        self._sort_dirty = False
+
+    def _set_values(self, iid: str, values: Tuple[str, ...]) -> None:
+        if self._values.get(iid) != values:
+            self._values[iid] = values
+            if self._sort_spec is not None:
+                self._sort_keys.pop(iid, None)
+                self._sort_dirty = True
+
+    def _ensure_sorted(self) -> None:
+        if not self._sort_dirty or self._sort_spec is None:
+            return
+        i, key, reverse = self._sort_spec
+        keys = self._sort_keys
+        for iid in self._ids:
+            if iid not in keys:
+                values = self._values[iid]
+                keys[iid] = key(values[i] if i < len(values) else "")
+        self._ids.sort(key=keys.__getitem__, reverse=reverse)
+        self._pos = None
+        self._sort_dirty = False
+
+    def set_rows(self, rows: Iterable[Tuple[str, Iterable[Any]]]) -> None:
+        """Sostituisce l'intero contenuto (archivio in memoria): costo lineare solo in Python."""
+        self._values = {str(iid): tuple(values) for iid, values in rows}
+        self._ids = list(self._values)
+        self._pos = None
+        self._sort_keys = {}
+        self._sort_dirty = self._sort_spec is not None
+        if self._selected not in self._values:
+            self._selected = None
+        self._offset = 0
+        self._render()
+
+    def destroy(self) -> None:
+        if self._render_job is not None:
             try:
-                return float(v.replace(",", "."))
+                self.after_cancel(self._render_job)
             except Exception:
-                return v.lower()
-        if re.fullmatch(r"-?\d+([.,]\d+)?", v):
+                pass
+            self._render_job = None
+        super().destroy()
+
+    # --- scroll ---
+    def yview(self, *args):
+        total = len(self._ids)
+        n = self._visible_rows()
+        if not args:
+            if not total:
+                return (0.0, 1.0)
+            return (self._offset / total, min(1.0, (self._offset + n) / total))
+        if args[0] == "moveto":
+            self._offset = int(float(args[1]) * total)
+        elif args[0] == "scroll":
+            step = int(float(args[1]))
+            self._offset += step * (max(1, n - 1) if str(args[2]).startswith("page") else 1)
+        self._render()
+        return None
+
+    def _scroll_units(self, units: int) -> str:
+        self._offset += units
+        self._render()
+        return "break"
+
+    def _on_wheel(self, event) -> str:
+        delta = int(event.delta or 0)
+        if not delta:
+            return "break"
+        units = -delta // 120 if abs(delta) >= 120 else (-1 if delta > 0 else 1)
+        return self._scroll_units(units * 3)
+
+    # --- selezione ---
+    def _select(self, iid: Optional[str]) -> None:
+        if iid == self._selected:
+            return
+        self._selected = iid
+        if iid is not None:
+            self.see(iid)
+        else:
+            self._render()
+        self.event_generate("<<TreeviewSelect>>")
+
+    def _on_click(self, event) -> None:
+        if self.identify_region(event.x, event.y) not in ("cell", "tree"):
+            return
+        iid = self.identify_row(event.y)
+        if iid:
+            self.focus_set()
+            self._select(iid)
+
+    def _on_key(self, step) -> str:
+        self._ensure_sorted()
+        if not self._ids:
+            return "break"
+        n = self._visible_rows()
+        cur = self.index(self._selected) if self._selected is not None else -1
+        if step == "home":
+            target = 0
+        elif step == "end":
+            target = len(self._ids) - 1
+        elif step == "page":
+            target = cur + n
+        elif step == "-page":
+            target = cur - n
+        else:
+            target = cur + step
+        target = max(0, min(len(self._ids) - 1, target))
+        self._select(self._ids[target])
+        return "break"
+
+    # --- rendering della finestra visibile ---
+    def _visible_rows(self) -> int:
+        if not self._row_h:
+            try:
+                self._row_h = int(ttk.Style(self).lookup(self.cget("style") or "Treeview", "rowheight") or 0)
+            except Exception:
+                self._row_h = 0
+            self._row_h = self._row_h or 20
+            self._head_h = self._head_h or self._row_h + 4
+        height = self.winfo_height()
+        if height <= 1:
+            return max(1, int(self.cget("height") or 10))
+        return max(1, (height - self._head_h) // self._row_h)
+
+    def _schedule_render(self) -> None:
+        if self._render_job is None:
+            self._render_job = self.after_idle(self._render)
+
+    def _render(self) -> None:
+        if self._render_job is not None:
             try:
-                return float(v.replace(",", "."))
+                self.after_cancel(self._render_job)
             except Exception:
                 pass
-        return v.lower()
+            self._render_job = None
+        self._ensure_sorted()
+        n = self._visible_rows()
+        total = len(self._ids)
+        self._offset = max(0, min(self._offset, total - n))
+        # Una riga in piu': l'ultima puo' essere parzialmente visibile.
+        window = self._ids[self._offset:self._offset + n + 1]
+        wanted = set(window)
 
-    def _sort(col: str, reverse: bool):
-        data = [(tree.set(k, col), k) for k in tree.get_children("")]
-        data.sort(key=lambda t: _convert(t[0], col), reverse=reverse)
-        for idx, (_, k) in enumerate(data):
-            tree.move(k, "", idx)
-        tree.heading(col, command=lambda: _sort(col, not reverse))
+        base = ttk.Treeview
+        stale = [iid for iid in base.get_children(self, "") if iid not in wanted]
+        if stale:
+            base.delete(self, *stale)
+            for iid in stale:
+                self._shown.pop(iid, None)
+        for pos, iid in enumerate(window):
+            state = (self._values[iid], iid == self._selected)
+            tags = (self._SEL_TAG,) if state[1] else ()
+            if iid not in self._shown:
+                base.insert(self, "", pos, iid=iid, values=state[0], tags=tags)
+            else:
+                if base.index(self, iid) != pos:
+                    base.move(self, iid, "", pos)
+                if self._shown[iid] != state:
+                    base.item(self, iid, values=state[0], tags=tags)
+            self._shown[iid] = state
+        if window:
+            bbox = base.bbox(self, window[0])
+            if bbox:
+                self._row_h = int(bbox[3]) or self._row_h
+                self._head_h = int(bbox[1])
+            base.yview(self, "moveto", 0)
+        self._notify_scroll()
 
-    for col in tree["columns"]:
-        tree.heading(col, command=lambda c=col: _sort(c, False))
+    def _notify_scroll(self) -> None:
+        if self._yscroll is not None:
+            first, last = self.yview()
+            self._yscroll(str(first), str(last))
+
+
+class PagedTreeLoader:
+    """
+    Riempie una Treeview a pagine: la prima pagina subito, le successive quando
+    lo scroll arriva vicino al fondo.
+    `fetch_page(cursor)` ritorna il dict delle API `*_page` ({rows, next_cursor, total, ...}),
+    `row_values(row)` ritorna (iid, valori) della riga. La prima pagina viene
+    applicata per differenza (TreeSync), quindi un refresh non perde selezione/scroll.
+    `sort_columns` = colonna della Treeview -> `order_by` della query (vedi `sort_args`).
+    """
+
+    def __init__(
+        self,
+        tree: ttk.Treeview,
+        scrollbar: ttk.Scrollbar,
+        threshold: float = 0.9,
+        sort_columns: Optional[Dict[str, str]] = None,
+    ) -> None:
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.threshold = threshold
+        self.sync = TreeSync(tree)
+        self.sort_columns = dict(sort_columns or {})
+        self.sort: Optional[Tuple[str, bool]] = None
+        self.total: Optional[int] = None
+        self.total_capped = False
+        self._fetch_page: Optional[Callable[[Optional[str]], Dict[str, Any]]] = None
+        self._row_values: Optional[Callable[[Any], Tuple[str, Iterable[Any]]]] = None
+        self._next_cursor: Optional[str] = None
+        self._pending = False
+        self._generation = 0
+        tree.configure(yscrollcommand=self._on_yscroll)
+
+    @property
+    def has_more(self) -> bool:
+        return self._next_cursor is not None
+
+    def sort_args(self) -> Dict[str, Any]:
+        """order_by/descending per la query `*_page`; vuoto = ordine predefinito."""
+        if self.sort is None:
+            return {}
+        col, reverse = self.sort
+        return {"order_by": self.sort_columns[col], "descending": reverse}
+
+    def start(
+        self,
+        fetch_page: Callable[[Optional[str]], Dict[str, Any]],
+        row_values: Callable[[Any], Tuple[str, Iterable[Any]]],
+        first_page: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """Allinea la Treeview alla prima pagina (gia' letta se `first_page`)."""
+        self._generation += 1
+        self._fetch_page = fetch_page
+        self._row_values = row_values
+        self._pending = False
+        page = first_page if first_page is not None else fetch_page(None)
+        self.total = page.get("total")
+        self.total_capped = bool(page.get("total_capped"))
+        self._next_cursor = page.get("next_cursor")
+        if self._next_cursor is not None and isinstance(self.tree, VirtualTreeview):
+            # Elenco incompleto: vale l'ordine della query, un sort in memoria
+            # riordinerebbe solo le righe lette finora.
+            self.tree.clear_sort()
+        self.sync.sync(row_values(r) for r in page.get("rows") or [])
+
+    def load_more(self) -> None:
+        self._pending = False
+        if self._fetch_page is None or self._next_cursor is None:
+            return
+        page = self._fetch_page(self._next_cursor)
+        self.sync.append(self._row_values(r) for r in page.get("rows") or [])
+        self._next_cursor = page.get("next_cursor")
+
+    def _on_yscroll(self, first: str, last: str) -> None:
+        self.scrollbar.set(first, last)
+        if self._next_cursor is None or self._pending:
+            return
+        if float(last) >= self.threshold:
+            # Rimandato a idle: la callback arriva durante il ridisegno della Treeview.
+            self._pending = True
+            generation = self._generation
+            self.tree.after_idle(lambda: self._generation == generation and self.load_more())
+
+
+class BackgroundSearch:
+    """
+    Ricerca durante la digitazione: i tasti vengono raggruppati (debounce), la
+    query gira su un thread dedicato con una propria connessione di sola lettura
+    e una nuova richiesta interrompe quella in corso (Connection.interrupt()).
+    I risultati tornano al thread Tk tramite after(): vale solo l'ultima richiesta.
+    """
+
+    def __init__(
+        self,
+        widget,
+        open_reader: Callable[[], Any],
+        delay_ms: int = 250,
+        poll_ms: int = 30,
+        on_error: Optional[Callable[[Exception], None]] = None,
+    ) -> None:
+        self.widget = widget
+        self.delay_ms = delay_ms
+        self.poll_ms = poll_ms
+        self._open_reader = open_reader
+        self._on_error = on_error
+        self._lock = threading.Condition()
+        self._results: "queue.Queue[Tuple[int, Any, Optional[Exception]]]" = queue.Queue()
+        self._callbacks: Dict[int, Callable[[Any], None]] = {}
+        self._job: Optional[Tuple[int, Callable[[Any], Any]]] = None
+        self._job_id = 0
+        self._running_id: Optional[int] = None
+        self._reader: Any = None
+        self._debounce_after: Optional[str] = None
+        self._poll_after: Optional[str] = None
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        widget.bind("<Destroy>", lambda e: e.widget is widget and self.close(), add="+")
+
+    def bind_var(self, var, callback: Callable[[], None]) -> None:
+        """Richiama `callback` (con debounce) a ogni modifica della variabile."""
+        var.trace_add("write", lambda *_: self.schedule(callback))
+
+    def schedule(self, callback: Callable[[], None]) -> None:
+        """Esegue `callback` sul thread Tk dopo `delay_ms` senza ulteriori tasti."""
+        if self._debounce_after is not None:
+            self.widget.after_cancel(self._debounce_after)
+        self._debounce_after = self.widget.after(self.delay_ms, lambda: self._fire(callback))
+
+    def _fire(self, callback: Callable[[], None]) -> None:
+        self._debounce_after = None
+        callback()
+
+    def submit(self, query: Callable[[Any], Any], on_result: Callable[[Any], None]) -> None:
+        """
+        Accoda `query(reader)` sul thread di ricerca; `on_result(risultato)` viene
+        chiamato sul thread Tk solo se nel frattempo non e' arrivata una richiesta piu' recente.
+        """
+        if self._closed:
+            return
+        with self._lock:
+            self._job_id += 1
+            self._job = (self._job_id, query)
+            self._callbacks = {self._job_id: on_result}
+            self._interrupt_running()
+            self._lock.notify()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._worker, name="background-search", daemon=True)
+            self._thread.start()
+        if self._poll_after is None:
+            self._poll_after = self.widget.after(self.poll_ms, self._poll)
+
+    def cancel(self) -> None:
+        """Scarta ricerche in attesa o in corso (es. refresh sincrono della lista)."""
+        if self._debounce_after is not None:
+            self.widget.after_cancel(self._debounce_after)
+            self._debounce_after = None
+        with self._lock:
+            self._job_id += 1
+            self._job = None
+            self._callbacks = {}
+            self._interrupt_running()
+
+    def close(self) -> None:
+        self.cancel()
+        with self._lock:
+            self._closed = True
+            self._lock.notify()
+        if self._poll_after is not None:
+            try:
+                self.widget.after_cancel(self._poll_after)
+            except Exception:
+                pass
+            self._poll_after = None
+
+    def _interrupt_running(self) -> None:
+        # Chiamato con il lock acquisito.
+        if self._running_id is not None and self._reader is not None:
+            try:
+                self._reader.conn.interrupt()
+            except Exception:
+                pass
+
+    def _worker(self) -> None:
+        while True:
+            with self._lock:
+                while self._job is None and not self._closed:
+                    self._lock.wait()
+                if self._closed:
+                    break
+                job_id, query = self._job
+                self._job = None
+                self._running_id = job_id
+            result: Any = None
+            error: Optional[Exception] = None
+            try:
+                if self._reader is None:
+                    self._reader = self._open_reader()
+                result = query(self._reader)
+            except sqlite3.OperationalError as exc:
+                if "interrupt" not in str(exc).lower():
+                    error = exc
+                else:
+                    # Query superata da una richiesta piu' recente: si scarta.
+                    # Se invece e' ancora l'ultima (interrupt arrivato in ritardo) si ripete.
+                    with self._lock:
+                        if self._job is None and job_id == self._job_id:
+                            self._job = (job_id, query)
+                        self._running_id = None
+                    continue
+            except Exception as exc:
+                error = exc
+            with self._lock:
+                self._running_id = None
+            self._results.put((job_id, result, error))
+        if self._reader is not None:
+            try:
+                self._reader.close()
+            except Exception:
+                pass
+            self._reader = None
+
+    def _poll(self) -> None:
+        self._poll_after = None
+        if self._closed:
+            return
+        while True:
+            try:
+                job_id, result, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            with self._lock:
+                callback = self._callbacks.pop(job_id, None)
+            if callback is None:
+                continue
+            if error is not None:
+                if self._on_error is not None:
+                    self._on_error(error)
+                continue
+            callback(result)
+        with self._lock:
+            busy = bool(self._callbacks)
+        if busy:
+            self._poll_after = self.widget.after(self.poll_ms, self._poll)
+
+
+def submit_ui_write(
+    widget,
+    db: Any,
+    name: str,
+    *args: Any,
+    on_done: Optional[Callable[[Any], None]] = None,
+    on_error: Optional[Callable[[Exception], None]] = None,
+    poll_ms: int = 30,
+    **kwargs: Any,
+) -> bool:
+    """
+    Scrittura dal thread Tk senza attendere il commit: `db.submit_write(name, ...)` sul
+    thread di scrittura dell'area, esito raccolto con after() (scritture di clic vicini
+    finiscono nello stesso commit di gruppo). `on_done(risultato)` / `on_error(errore)`
+    girano sul thread Tk. Una scrittura alla volta per widget: False se ce n'e' gia' una
+    in corso (es. doppio clic su Salva) e la richiesta viene ignorata.
+    """
+    if getattr(widget, "_ui_write_pending", False):
+        return False
+    try:
+        future = db.submit_write(name, *args, **kwargs)
+    except Exception as exc:
+        # Rifiutata subito (es. sessione in sola lettura).
+        if on_error is None:
+            raise
+        on_error(exc)
+        return True
+    widget._ui_write_pending = True
+
+    def _poll() -> None:
+        if not future.done():
+            widget.after(poll_ms, _poll)
+            return
+        widget._ui_write_pending = False
+        try:
+            if not widget.winfo_exists():
+                return
+        except Exception:
+            return
+        error = future.exception()
+        if error is not None:
+            if on_error is not None:
+                on_error(error)
+            return
+        if on_done is not None:
+            on_done(future.result())
+
+    widget.after(poll_ms, _poll)
+    return True
+
+
+def show_write_error(
+    title: str, message: str, integrity_message: Optional[str] = None
+) -> Callable[[Exception], None]:
+    """
+    `on_error` per `submit_ui_write`: `message` con il dettaglio al posto di {e};
+    `integrity_message` (se indicato) per i vincoli violati (codice doppio, record collegati).
+    """
+
+    def _show(e: Exception) -> None:
+        if integrity_message is not None and isinstance(e, sqlite3.IntegrityError):
+            messagebox.showerror(title, integrity_message)
+        else:
+            messagebox.showerror(title, message.format(e=e))
+
+    return _show